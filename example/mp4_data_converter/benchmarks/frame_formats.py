@@ -0,0 +1,122 @@
+import argparse
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from example.mp4_data_converter.benchmarks.segmented_ffmpeg import count_frames, create_synthetic_video
+from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
+
+DEFAULT_FRAME_FORMATS = ["png", "png:0", "png:1", "png:3", "png:9", "jpg:2", "jpg:5"]
+
+
+def run_benchmark(
+    video_file: Path, frame_format: str, number_of_files_in_tar: int, working_directory: Path
+) -> Dict[str, Any]:
+    directories = {
+        name: working_directory / frame_format.replace(":", "_") / name
+        for name in ("frames", "tar_files", "anonymized_frames", "output")
+    }
+    for directory in directories.values():
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+
+    parsed_frame_format = FrameFormat.from_settings(settings={"frame_format": frame_format})
+    ffmpeg_executor = FFMPEGExecutor(file_name_format="%08d", frame_format=parsed_frame_format)
+    tar_executor = TarExecutor(image_extenstion=parsed_frame_format.extension)
+
+    timings = {}
+
+    start = time.perf_counter()
+    video_metadata = ffmpeg_executor.extract_frames(file_path=video_file, output_directory=directories["frames"])
+    timings["encode_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tar_executor.archive_files(
+        images_paths=sorted(directories["frames"].iterdir()),
+        out_directory_path=directories["tar_files"],
+        num_files=number_of_files_in_tar,
+    )
+    timings["archive_seconds"] = time.perf_counter() - start
+
+    # the Redactor uploads the tar files as they are, so their size is the amount of bytes sent to Redact
+    tar_files = sorted(directories["tar_files"].iterdir())
+    uploaded_bytes = sum(tar_file.stat().st_size for tar_file in tar_files)
+
+    start = time.perf_counter()
+    tar_executor.extract_files(archives_paths=tar_files, out_directory_path=directories["anonymized_frames"])
+    timings["extract_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ffmpeg_executor.create_video(
+        frames_directory=directories["anonymized_frames"],
+        output_directory=directories["output"],
+        video_metadata=video_metadata,
+    )
+    timings["create_video_seconds"] = time.perf_counter() - start
+
+    return {
+        "frame_format": frame_format,
+        **timings,
+        "end_to_end_seconds": sum(timings.values()),
+        "uploaded_bytes": uploaded_bytes,
+        "frames": count_frames(video_file=directories["output"] / video_metadata["name"]),
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'format':>8} {'encode, s':>10} {'archive, s':>11} {'extract, s':>11} {'video, s':>9} "
+        f"{'end-to-end, s':>14} {'uploaded, MB':>13} {'frames':>7}"
+    )
+    for result in results:
+        print(
+            f"{result['frame_format']:>8} {result['encode_seconds']:>10.2f} {result['archive_seconds']:>11.2f} "
+            f"{result['extract_seconds']:>11.2f} {result['create_video_seconds']:>9.2f} "
+            f"{result['end_to_end_seconds']:>14.2f} {result['uploaded_bytes'] / 2**20:>13.1f} {result['frames']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares the frame formats of the frame round trip without Redact.")
+    parser.add_argument("--video", type=Path, help="video to benchmark, a synthetic one is generated if it is unset")
+    parser.add_argument("--frame-formats", nargs="+", default=DEFAULT_FRAME_FORMATS)
+    parser.add_argument("--number-of-files-in-tar", type=int, default=100)
+    parser.add_argument("--duration", type=int, default=20, help="duration of the synthetic video in seconds")
+    parser.add_argument("--size", default="1280x720", help="frame size of the synthetic video")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with tempfile.TemporaryDirectory() as working_directory:
+        working_directory = Path(working_directory)
+
+        video_file = arguments.video
+        if video_file is None:
+            video_file = working_directory / "synthetic.mp4"
+            logging.info(f"generating a {arguments.duration}s {arguments.size} synthetic video")
+            create_synthetic_video(
+                output_file=video_file, duration=arguments.duration, size=arguments.size, frame_rate=25, gop_size=50
+            )
+
+        results = []
+        for frame_format in arguments.frame_formats:
+            logging.info(f"benchmarking the {frame_format} frame format")
+            results.append(
+                run_benchmark(
+                    video_file=video_file,
+                    frame_format=frame_format,
+                    number_of_files_in_tar=arguments.number_of_files_in_tar,
+                    working_directory=working_directory,
+                )
+            )
+
+        print_results(results=results)
+
+
+if __name__ == "__main__":
+    main()
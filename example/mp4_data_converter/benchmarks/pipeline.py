@@ -0,0 +1,417 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+
+from example.mp4_data_converter.benchmarks.segmented_ffmpeg import create_synthetic_video
+from example.mp4_data_converter.integration_pipeline.data_reader import DataReader
+from example.mp4_data_converter.integration_pipeline.data_writer import DataWriter
+from example.mp4_data_converter.integration_pipeline.tar_archiver import TarArchiver
+from example.mp4_data_converter.integration_pipeline.tar_extractor import TarExtractor
+from example.mp4_data_converter.utils.video_utils import retrieve_video_metadata_from_video_file
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.pipeline_modules import PipelineModules
+from src.orchestrator.workspace import RunWorkspace
+from src.orchestrator.yaml_parser import YAMLParser
+from src.utils.settings import IN_MEMORY_VARIABLE, NAME, OUTPUTS, SETTINGS, ExecutionMode
+
+ROOT_DIRECTORY = Path(__file__).resolve().parents[3]
+MODULES_PATH = ROOT_DIRECTORY / "example" / "mp4_data_converter" / "integration_pipeline"
+PIPELINE_DEFINITION_FILE = MODULES_PATH / "pipeline_definition.yml"
+
+DEFAULT_VIDEOS = ["640x360:10", "1280x720:10", "1920x1080:5"]
+DISK_USAGE_INTERVAL = 0.05
+
+
+class PassThroughRedactor(StreamingPipelineElement):
+    # stands in for the Redactor, returning the archives as they are after the configured latency of a Redact job
+    def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+        output_directory = Path(outputs["anonymized_tar_files_directory"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+
+        for tar_file in sorted(Path(inputs["tar_files_directory"]).glob("*.tar")):
+            self._anonymize_tar_file(tar_file=tar_file, output_directory=output_directory)
+
+        return {"anonymized_tar_files_directory": output_directory}
+
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        output_directory = Path(outputs["anonymized_tar_files_directory"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        stream.publish({"anonymized_tar_files_directory": output_directory})
+
+        for tar_file in stream.receive():
+            stream.send(self._anonymize_tar_file(tar_file=tar_file, output_directory=output_directory))
+
+        return {"anonymized_tar_files_directory": output_directory}
+
+    def _anonymize_tar_file(self, tar_file: Path, output_directory: Path) -> Path:
+        time.sleep(self._settings.get("latency_seconds", 0))
+
+        anonymized_tar_file = output_directory / tar_file.name
+        anonymized_tar_file.unlink(missing_ok=True)
+        os.link(tar_file, anonymized_tar_file)
+
+        return anonymized_tar_file
+
+    def cleanup(self, outputs: Dict[str, Any]) -> None:
+        shutil.rmtree(Path(outputs["anonymized_tar_files_directory"]), ignore_errors=True)
+
+
+class BenchmarkPipelineModules(PipelineModules):
+    def get_pipeline_element_class(self, modules: Dict[str, str], class_name: str) -> Any:
+        if class_name == "Redactor":
+            return PassThroughRedactor
+
+        return super().get_pipeline_element_class(modules=modules, class_name=class_name)
+
+
+def get_disk_usage(directory: Path) -> int:
+    # hard links are counted once, as some elements link frames and archives instead of copying them
+    inodes = set()
+    disk_usage = 0
+    for root, _, files in os.walk(directory):
+        for file in files:
+            try:
+                file_stat = os.lstat(os.path.join(root, file))
+            except FileNotFoundError:
+                continue
+
+            if (file_stat.st_dev, file_stat.st_ino) not in inodes:
+                inodes.add((file_stat.st_dev, file_stat.st_ino))
+                disk_usage += file_stat.st_size
+
+    return disk_usage
+
+
+def measure(run: Callable[[], Any], directory: Path) -> Tuple[float, int]:
+    peak_disk_usage = get_disk_usage(directory=directory)
+    finished = threading.Event()
+
+    def sample_disk_usage() -> None:
+        nonlocal peak_disk_usage
+        while not finished.wait(timeout=DISK_USAGE_INTERVAL):
+            peak_disk_usage = max(peak_disk_usage, get_disk_usage(directory=directory))
+
+    sampler = threading.Thread(target=sample_disk_usage, daemon=True)
+    sampler.start()
+
+    start = time.perf_counter()
+    try:
+        run()
+    finally:
+        seconds = time.perf_counter() - start
+        finished.set()
+        sampler.join()
+
+    return seconds, max(peak_disk_usage, get_disk_usage(directory=directory))
+
+
+def summarize(
+    video: str, element: str, frames: int, measurements: List[Tuple[float, int]], input_bytes: int, output_bytes: int
+) -> Dict[str, Any]:
+    seconds = statistics.median(seconds for seconds, _ in measurements)
+
+    return {
+        "video": video,
+        "element": element,
+        "frames": frames,
+        "seconds": seconds,
+        "frames_per_second": frames / seconds,
+        "input_mb_per_second": input_bytes / 2**20 / seconds,
+        "output_mb_per_second": output_bytes / 2**20 / seconds,
+        "peak_disk_mb": max(peak_disk_usage for _, peak_disk_usage in measurements) / 2**20,
+    }
+
+
+def get_elements_settings() -> Dict[str, Optional[Dict[str, Any]]]:
+    pipeline_definition = YAMLParser().get_pipeline_definition(pipeline_definition_file=PIPELINE_DEFINITION_FILE)
+
+    return {element[NAME]: element.get(SETTINGS) for element in pipeline_definition}
+
+
+def benchmark_elements(video: str, video_file: Path, working_directory: Path, repeat: int) -> List[Dict[str, Any]]:
+    elements_settings = get_elements_settings()
+    directories = {name: working_directory / name for name in ("frames", "tar_files", "anonymized_frames", "output")}
+    video_metadata = retrieve_video_metadata_from_video_file(video_file_path=video_file)
+
+    # every element reads the outputs of the previous one, the archives stand for the anonymized ones
+    steps = [
+        (
+            DataReader(settings=elements_settings["DataReader"]),
+            {"directory_data_video": video_file.parent},
+            {"directory_extracted_frames": directories["frames"], "video_metadata": IN_MEMORY_VARIABLE},
+        ),
+        (
+            TarArchiver(settings=elements_settings["TarArchiver"]),
+            {"directory_extracted_frames": directories["frames"]},
+            {"tar_files_directory": directories["tar_files"]},
+        ),
+        (
+            TarExtractor(settings=elements_settings["TarExtractor"]),
+            {"anonymized_tar_files_directory": directories["tar_files"]},
+            {"directory_anonymized_frames": directories["anonymized_frames"]},
+        ),
+        (
+            DataWriter(settings=elements_settings["DataWriter"]),
+            {"directory_anonymized_frames": directories["anonymized_frames"], "video_metadata": video_metadata},
+            {"directory_anonymized_data_video": directories["output"]},
+        ),
+    ]
+
+    results = []
+    for element, inputs, outputs in steps:
+        element_name = type(element).__name__
+        logging.info(f"benchmarking the {element_name} on the {video} video")
+
+        measurements = []
+        for _ in range(repeat):
+            element.cleanup(outputs=outputs)
+            measurements.append(
+                measure(
+                    run=functools.partial(element.run, inputs=inputs, outputs=outputs), directory=working_directory
+                )
+            )
+
+        results.append(
+            summarize(
+                video=video,
+                element=element_name,
+                frames=len(list(directories["frames"].iterdir())),
+                measurements=measurements,
+                input_bytes=sum(get_disk_usage(Path(value)) for value in inputs.values() if isinstance(value, Path)),
+                output_bytes=get_disk_usage(next(iter(outputs.values()))),
+            )
+        )
+
+    for element, _, outputs in steps:
+        element.cleanup(outputs=outputs)
+
+    return results
+
+
+def benchmark_pipeline(
+    video: str,
+    video_directory: Path,
+    working_directory: Path,
+    frames: int,
+    execution_mode: ExecutionMode,
+    redact_latency: float,
+    redact_url: Optional[str],
+    repeat: int,
+) -> Dict[str, Any]:
+    pipeline_definition = YAMLParser().get_pipeline_definition(pipeline_definition_file=PIPELINE_DEFINITION_FILE)
+    # the Validator checks that the Redact service is online, which the stand-in does not need
+    pipeline_definition = [element for element in pipeline_definition if element[NAME] != "Validator"]
+
+    workspace = RunWorkspace(root_directory=working_directory, run_id="pipeline")
+    workspace.create()
+    scoped_pipeline_definition = workspace.scope_pipeline_definition(
+        pipeline_definition=pipeline_definition, inputs={"directory_data_video": str(video_directory)}
+    )
+
+    output_directory = working_directory / "pipeline_output"
+    for element in scoped_pipeline_definition:
+        if element[NAME] == "Redactor" and redact_url is not None:
+            # every run goes to the Redact service, so the cache of the anonymized archives is not used
+            element[SETTINGS] = {**element[SETTINGS], "redact_url": redact_url, "cache_directory": None}
+        elif element[NAME] == "Redactor":
+            element[SETTINGS] = {"latency_seconds": redact_latency}
+
+        for key, value in (element.get(OUTPUTS) or {}).items():
+            if value != IN_MEMORY_VARIABLE and not value.startswith(str(workspace.directory)):
+                element[OUTPUTS][key] = str(output_directory)
+
+    pipeline_definition_file = working_directory / "pipeline_definition.yml"
+    with pipeline_definition_file.open("w") as f:
+        yaml.safe_dump({"elements": scoped_pipeline_definition}, f, sort_keys=False)
+
+    logging.info(f"benchmarking the pipeline in the {execution_mode} mode on the {video} video")
+    pipeline_modules_class = PipelineModules if redact_url is not None else BenchmarkPipelineModules
+    measurements = []
+    for _ in range(repeat):
+        orchestrator = Orchestrator(
+            yaml_parser=YAMLParser(),
+            pipeline_modules=pipeline_modules_class(modules_path=MODULES_PATH, working_directory=ROOT_DIRECTORY),
+            execution_mode=execution_mode,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=pipeline_definition_file)
+        try:
+            measurements.append(measure(run=orchestrator.run_pipeline_element, directory=working_directory))
+            output_bytes = get_disk_usage(output_directory)
+        finally:
+            orchestrator.cleanup()
+            shutil.rmtree(output_directory, ignore_errors=True)
+
+    return summarize(
+        video=video,
+        element="pipeline",
+        frames=frames,
+        measurements=measurements,
+        input_bytes=get_disk_usage(video_directory),
+        output_bytes=output_bytes,
+    )
+
+
+def get_environment() -> Dict[str, Any]:
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+    for key, command in (("ffmpeg", ["ffmpeg", "-version"]), ("commit", ["git", "rev-parse", "HEAD"])):
+        try:
+            environment[key] = subprocess.check_output(command, cwd=ROOT_DIRECTORY, text=True).splitlines()[0]
+        except (OSError, subprocess.CalledProcessError):
+            environment[key] = None
+
+    return environment
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    print(
+        f"{'video':>14} {'element':>12} {'frames':>7} {'seconds':>8} {'frames/s':>9} {'in, MB/s':>9} "
+        f"{'out, MB/s':>10} {'peak disk, MB':>14}"
+    )
+    for result in results:
+        print(
+            f"{result['video']:>14} {result['element']:>12} {result['frames']:>7} {result['seconds']:>8.2f} "
+            f"{result['frames_per_second']:>9.1f} {result['input_mb_per_second']:>9.1f} "
+            f"{result['output_mb_per_second']:>10.1f} {result['peak_disk_mb']:>14.1f}"
+        )
+
+
+def compare_results(results: List[Dict[str, Any]], baseline_results: List[Dict[str, Any]], threshold: float) -> bool:
+    baseline = {(result["video"], result["element"]): result for result in baseline_results}
+
+    regressed = False
+    print(f"{'video':>14} {'element':>12} {'baseline, frames/s':>19} {'frames/s':>9} {'change':>8}")
+    for result in results:
+        baseline_result = baseline.get((result["video"], result["element"]))
+        if baseline_result is None:
+            continue
+
+        change = result["frames_per_second"] / baseline_result["frames_per_second"] - 1
+        is_regression = change < -threshold
+        regressed = regressed or is_regression
+        print(
+            f"{result['video']:>14} {result['element']:>12} {baseline_result['frames_per_second']:>19.1f} "
+            f"{result['frames_per_second']:>9.1f} {change:>+8.1%}{'  regression' if is_regression else ''}"
+        )
+
+    return regressed
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive number")
+
+    return number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measures the throughput of the mp4 pipeline elements and of the whole pipeline."
+    )
+    parser.add_argument(
+        "--videos",
+        nargs="+",
+        default=DEFAULT_VIDEOS,
+        help="synthetic videos to generate as <width>x<height>:<duration in seconds>",
+    )
+    parser.add_argument(
+        "--repeat", type=positive_int, default=3, help="runs of every measurement, the median is reported"
+    )
+    parser.add_argument("--execution-mode", type=ExecutionMode, default=ExecutionMode.sequential)
+    parser.add_argument("--redact-latency", type=float, default=0.0, help="seconds the Redact stand-in takes per job")
+    parser.add_argument(
+        "--redact-url",
+        help="Redact service, e.g. the one of redact_stand_in.py, to run the Redactor against instead of the stand-in",
+    )
+    parser.add_argument("--working-directory", type=Path, default=ROOT_DIRECTORY / "data" / "benchmarks")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--compare", type=Path, help="results of an earlier run to compare the frames/s with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="frames/s drop reported as a regression")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = []
+    for video in arguments.videos:
+        size, duration = video.split(":")
+        video_working_directory = arguments.working_directory / video.replace(":", "_")
+        shutil.rmtree(video_working_directory, ignore_errors=True)
+
+        video_file = video_working_directory / "input" / "synthetic.mp4"
+        video_file.parent.mkdir(parents=True)
+        logging.info(f"generating a {duration}s {size} synthetic video")
+        create_synthetic_video(output_file=video_file, duration=int(duration), size=size, frame_rate=25, gop_size=50)
+
+        video_results = benchmark_elements(
+            video=video, video_file=video_file, working_directory=video_working_directory, repeat=arguments.repeat
+        )
+        video_results.append(
+            benchmark_pipeline(
+                video=video,
+                video_directory=video_file.parent,
+                working_directory=video_working_directory,
+                frames=video_results[0]["frames"],
+                execution_mode=arguments.execution_mode,
+                redact_latency=arguments.redact_latency,
+                redact_url=arguments.redact_url,
+                repeat=arguments.repeat,
+            )
+        )
+        results.extend(video_results)
+
+        shutil.rmtree(video_working_directory, ignore_errors=True)
+
+    parameters = {
+        "repeat": arguments.repeat,
+        "execution_mode": arguments.execution_mode,
+        "redact_latency": arguments.redact_latency,
+        "redact_url": arguments.redact_url,
+    }
+    with arguments.output.open("w") as f:
+        json.dump(
+            {
+                "environment": get_environment(),
+                "parameters": parameters,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+
+    print_results(results=results)
+    logging.info(f"the results are written to {arguments.output}")
+
+    if arguments.compare is not None:
+        with arguments.compare.open() as f:
+            baseline = json.load(f)
+
+        if baseline["parameters"] != parameters:
+            logging.warning(f"the baseline results were measured with other parameters: {baseline['parameters']}")
+
+        if compare_results(results=results, baseline_results=baseline["results"], threshold=arguments.threshold):
+            sys.exit("The throughput regressed compared to the baseline results")
+
+
+if __name__ == "__main__":
+    main()
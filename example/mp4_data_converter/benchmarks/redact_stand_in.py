@@ -0,0 +1,345 @@
+import argparse
+import email.parser
+import email.policy
+import json
+import logging
+import queue
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CHUNK_SIZE = 1 << 20
+JOB_PATH_PATTERN = re.compile(
+    r"^/v4/(?P<service>[^/]+)/(?P<out_type>[^/]+)(?:/(?P<output_id>[0-9a-f-]+)(?P<status>/status)?)?$"
+)
+
+
+class StandInJob:
+    def __init__(self, output_id: str, input_file: Path, size_bytes: int) -> None:
+        self.output_id = output_id
+        self.input_file = input_file
+        self.size_bytes = size_bytes
+        self.state = "pending"
+        self.error = None
+        self.start_timestamp = None
+        self.end_timestamp = None
+        self.processing_seconds = None
+
+    def get_status(self) -> Dict[str, Any]:
+        progress = 0.0
+        estimated_time_to_completion = None
+        if self.state in ("completed", "failed"):
+            progress = 1.0
+            estimated_time_to_completion = 0.0
+        elif self.state == "active" and self.processing_seconds is not None:
+            elapsed_seconds = time.time() - self.start_timestamp
+            progress = min(elapsed_seconds / self.processing_seconds, 0.99) if self.processing_seconds else 0.99
+            estimated_time_to_completion = max(self.processing_seconds - elapsed_seconds, 0.0)
+
+        return {
+            "output_id": self.output_id,
+            "state": self.state,
+            "start_timestamp": self._format_timestamp(self.start_timestamp),
+            "end_timestamp": self._format_timestamp(self.end_timestamp),
+            "estimated_time_to_completion": estimated_time_to_completion,
+            "progress": progress,
+            "error": self.error,
+            "warnings": [],
+        }
+
+    @staticmethod
+    def _format_timestamp(timestamp: Optional[float]) -> Optional[str]:
+        return None if timestamp is None else datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class RedactStandIn:
+    # serves the part of the Redact v4 API used by the Validator and the Redactor: the health check, starting a job,
+    # polling its status, downloading its result, which is the uploaded file itself, and deleting it
+    def __init__(
+        self,
+        directory: Path,
+        max_concurrent_jobs: int = 1,
+        max_queued_jobs: Optional[int] = None,
+        base_latency: float = 0.0,
+        latency_per_mb: float = 0.0,
+        failure_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self._directory = directory
+        self._max_queued_jobs = max_queued_jobs
+        self._base_latency = base_latency
+        self._latency_per_mb = latency_per_mb
+        self._failure_rate = failure_rate
+        self._stall_rate = stall_rate
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self._jobs: Dict[str, StandInJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._workers = [
+            threading.Thread(target=self._process_jobs, name=f"redact-stand-in-{idx}", daemon=True)
+            for idx in range(max_concurrent_jobs)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def is_request_failed(self) -> bool:
+        return self._draw(rate=self._error_rate)
+
+    def start_job(self, content: bytes) -> Optional[StandInJob]:
+        with self._jobs_lock:
+            queued_jobs = sum(job.state == "pending" for job in self._jobs.values())
+            if self._max_queued_jobs is not None and queued_jobs >= self._max_queued_jobs:
+                return None
+
+            output_id = str(uuid.uuid4())
+            input_file = self._directory / output_id
+            input_file.write_bytes(content)
+            job = StandInJob(output_id=output_id, input_file=input_file, size_bytes=len(content))
+            self._jobs[output_id] = job
+
+        self._queue.put(job)
+        logging.debug(f"queued the job {output_id} of {len(content)} bytes")
+
+        return job
+
+    def get_job(self, output_id: str) -> Optional[StandInJob]:
+        with self._jobs_lock:
+            return self._jobs.get(output_id)
+
+    def delete_job(self, output_id: str) -> bool:
+        with self._jobs_lock:
+            job = self._jobs.pop(output_id, None)
+
+        if job is None:
+            return False
+
+        job.input_file.unlink(missing_ok=True)
+        return True
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _draw(self, rate: float) -> bool:
+        with self._random_lock:
+            return self._random.random() < rate
+
+    def _process_jobs(self) -> None:
+        while (job := self._queue.get()) is not None:
+            if self.get_job(output_id=job.output_id) is None:
+                continue
+
+            job.processing_seconds = self._base_latency + self._latency_per_mb * job.size_bytes / 2**20
+            job.start_timestamp = time.time()
+            job.state = "active"
+
+            if self._draw(rate=self._stall_rate):
+                # a stalled job keeps its worker busy until the server stops, like a hung Redact worker
+                logging.debug(f"stalling the job {job.output_id}")
+                self._stopped.wait()
+                return
+
+            if self._stopped.wait(timeout=job.processing_seconds):
+                return
+
+            if self._draw(rate=self._failure_rate):
+                job.error = "the failure injected by the Redact stand-in"
+                job.state = "failed"
+            else:
+                job.state = "completed"
+
+            job.end_timestamp = time.time()
+            logging.debug(f"the job {job.output_id} is {job.state}")
+
+
+class RedactStandInRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "RedactStandInServer"
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/v4/health":
+            self._send_json(status=HTTPStatus.OK, body={"status": "operational"})
+            return
+
+        match = JOB_PATH_PATTERN.match(path)
+        if match is None or match["output_id"] is None:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": "Not Found"})
+            return
+
+        if self._is_request_failed():
+            return
+
+        job = self.server.redact_stand_in.get_job(output_id=match["output_id"])
+        if job is None:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": f"Output {match['output_id']} not found"})
+        elif match["status"]:
+            self._send_json(status=HTTPStatus.OK, body=job.get_status())
+        elif job.state != "completed":
+            self._send_json(status=HTTPStatus.UNPROCESSABLE_ENTITY, body={"detail": f"Job is {job.state}"})
+        else:
+            self._send_file(file_path=job.input_file)
+
+    def do_POST(self) -> None:
+        match = JOB_PATH_PATTERN.match(self.path.split("?", 1)[0])
+        body = self._read_body()
+        if match is None or match["output_id"] is not None:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": "Not Found"})
+            return
+
+        if self._is_request_failed():
+            return
+
+        content = self._get_uploaded_file(body=body)
+        if content is None:
+            self._send_json(status=HTTPStatus.UNPROCESSABLE_ENTITY, body={"detail": "The file is missing"})
+            return
+
+        job = self.server.redact_stand_in.start_job(content=content)
+        if job is None:
+            self._send_json(status=HTTPStatus.TOO_MANY_REQUESTS, body={"detail": "The job queue is full"})
+            return
+
+        self._send_json(status=HTTPStatus.OK, body={"output_id": job.output_id})
+
+    def do_DELETE(self) -> None:
+        match = JOB_PATH_PATTERN.match(self.path.split("?", 1)[0])
+        if match is None or match["output_id"] is None or match["status"]:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": "Not Found"})
+        elif self.server.redact_stand_in.delete_job(output_id=match["output_id"]):
+            self._send_json(status=HTTPStatus.OK, body={"output_id": match["output_id"]})
+        else:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": f"Output {match['output_id']} not found"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _is_request_failed(self) -> bool:
+        if not self.server.redact_stand_in.is_request_failed():
+            return False
+
+        self._send_json(status=HTTPStatus.INTERNAL_SERVER_ERROR, body={"detail": "The error injected by the stand-in"})
+        return True
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        chunks = []
+        while chunk_size := int(self.rfile.readline().split(b";", 1)[0], 16):
+            chunks.append(self.rfile.read(chunk_size))
+            self.rfile.readline()
+
+        # the trailer section ends with an empty line
+        while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        return b"".join(chunks)
+
+    def _get_uploaded_file(self, body: bytes) -> Optional[bytes]:
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode("latin-1") + body
+        )
+        if not message.is_multipart():
+            return None
+
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                return part.get_payload(decode=True)
+
+        return None
+
+    def _send_json(self, status: HTTPStatus, body: Dict[str, Any]) -> None:
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_file(self, file_path: Path) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-tar")
+        self.send_header("Content-Disposition", f'attachment; filename="{file_path.name}.tar"')
+        self.send_header("Content-Length", str(file_path.stat().st_size))
+        self.end_headers()
+        with file_path.open("rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+
+class RedactStandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], redact_stand_in: RedactStandIn) -> None:
+        super().__init__(server_address, RedactStandInRequestHandler)
+        self.redact_stand_in = redact_stand_in
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.redact_stand_in.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Serves the part of the Redact v4 API used by the pipeline, returning the uploaded archives as "
+        "the anonymized ones, to load-test the pipeline without a Redact deployment."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--max-concurrent-jobs", type=int, default=1, help="jobs processed at the same time")
+    parser.add_argument(
+        "--max-queued-jobs",
+        type=int,
+        help="pending jobs above which new jobs are rejected with 429, unlimited if unset",
+    )
+    parser.add_argument("--base-latency", type=float, default=0.0, help="seconds every job takes")
+    parser.add_argument("--latency-per-mb", type=float, default=0.0, help="seconds every job takes per uploaded MB")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of the jobs which end as failed")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of the jobs which never finish")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of the job requests answered with 500")
+    parser.add_argument("--seed", type=int, help="seed of the injected failures, to reproduce a run")
+    parser.add_argument("--verbose", action="store_true")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if arguments.verbose else logging.INFO)
+
+    with tempfile.TemporaryDirectory(prefix="redact-stand-in-") as directory:
+        redact_stand_in = RedactStandIn(
+            directory=Path(directory),
+            max_concurrent_jobs=arguments.max_concurrent_jobs,
+            max_queued_jobs=arguments.max_queued_jobs,
+            base_latency=arguments.base_latency,
+            latency_per_mb=arguments.latency_per_mb,
+            failure_rate=arguments.failure_rate,
+            stall_rate=arguments.stall_rate,
+            error_rate=arguments.error_rate,
+            seed=arguments.seed,
+        )
+        with RedactStandInServer((arguments.host, arguments.port), redact_stand_in=redact_stand_in) as server:
+            logging.info(f"the Redact stand-in is listening on http://{arguments.host}:{server.server_port}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
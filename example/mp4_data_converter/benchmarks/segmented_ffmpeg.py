@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
+
+
+def create_synthetic_video(output_file: Path, duration: int, size: str, frame_rate: int, gop_size: int) -> None:
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-v",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc2=size={size}:rate={frame_rate}",
+            "-t",
+            str(duration),
+            "-c:v",
+            "libx264",
+            "-g",
+            str(gop_size),
+            "-pix_fmt",
+            "yuv420p",
+            str(output_file),
+            "-y",
+        ],
+        check=True,
+    )
+
+
+def count_frames(video_file: Path) -> int:
+    output = subprocess.check_output(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-count_frames",
+            "-select_streams",
+            "v:0",
+            "-show_entries",
+            "stream=nb_read_frames",
+            "-of",
+            "csv=p=0",
+            str(video_file),
+        ]
+    )
+
+    return int(output.decode("utf-8").strip())
+
+
+def run_benchmark(video_file: Path, parallel_segments: int, working_directory: Path) -> Dict[str, Any]:
+    frames_directory = working_directory / f"frames_{parallel_segments}"
+    output_directory = working_directory / f"video_{parallel_segments}"
+    for directory in (frames_directory, output_directory):
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+
+    ffmpeg_executor = FFMPEGExecutor(file_name_format="%08d", parallel_segments=parallel_segments)
+
+    start = time.perf_counter()
+    video_metadata = ffmpeg_executor.extract_frames(file_path=video_file, output_directory=frames_directory)
+    extract_seconds = time.perf_counter() - start
+
+    frames = sorted(frames_directory.glob("*.png"))
+    frames_digest = hashlib.sha256()
+    for frame in frames:
+        frames_digest.update(frame.read_bytes())
+
+    start = time.perf_counter()
+    ffmpeg_executor.create_video(
+        frames_directory=frames_directory, output_directory=output_directory, video_metadata=video_metadata
+    )
+    encode_seconds = time.perf_counter() - start
+
+    return {
+        "parallel_segments": parallel_segments,
+        "extract_seconds": extract_seconds,
+        "encode_seconds": encode_seconds,
+        "extracted_frames": len(frames),
+        "extracted_frames_digest": frames_digest.hexdigest(),
+        "encoded_frames": count_frames(video_file=output_directory / video_metadata["name"]),
+    }
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    baseline = results[0]
+    print(f"{'segments':>8} {'extract, s':>11} {'speed-up':>9} {'encode, s':>10} {'speed-up':>9} {'frames':>7}  same")
+    for result in results:
+        same = (
+            result["extracted_frames_digest"] == baseline["extracted_frames_digest"]
+            and result["encoded_frames"] == baseline["encoded_frames"]
+        )
+        print(
+            f"{result['parallel_segments']:>8} "
+            f"{result['extract_seconds']:>11.2f} {baseline['extract_seconds'] / result['extract_seconds']:>8.2f}x "
+            f"{result['encode_seconds']:>10.2f} {baseline['encode_seconds'] / result['encode_seconds']:>8.2f}x "
+            f"{result['extracted_frames']:>7}  {'yes' if same else 'NO'}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares the single process and the segmented ffmpeg runs.")
+    parser.add_argument("--video", type=Path, help="video to benchmark, a synthetic one is generated if it is unset")
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--duration", type=int, default=60, help="duration of the synthetic video in seconds")
+    parser.add_argument("--size", default="1280x720", help="frame size of the synthetic video")
+    parser.add_argument("--frame-rate", type=int, default=25, help="frame rate of the synthetic video")
+    parser.add_argument("--gop-size", type=int, default=50, help="keyframe interval of the synthetic video")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with tempfile.TemporaryDirectory() as working_directory:
+        working_directory = Path(working_directory)
+
+        video_file = arguments.video
+        if video_file is None:
+            video_file = working_directory / "synthetic.mp4"
+            logging.info(f"generating a {arguments.duration}s {arguments.size} synthetic video")
+            create_synthetic_video(
+                output_file=video_file,
+                duration=arguments.duration,
+                size=arguments.size,
+                frame_rate=arguments.frame_rate,
+                gop_size=arguments.gop_size,
+            )
+
+        results = []
+        # the single process run goes first, so it is the baseline of the speed-up
+        for parallel_segments in dict.fromkeys([1] + arguments.segments):
+            logging.info(f"benchmarking {parallel_segments} segments")
+            results.append(
+                run_benchmark(
+                    video_file=video_file, parallel_segments=parallel_segments, working_directory=working_directory
+                )
+            )
+
+        print_results(results=results)
+
+
+if __name__ == "__main__":
+    main()
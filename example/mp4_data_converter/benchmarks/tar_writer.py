@@ -0,0 +1,140 @@
+import argparse
+import functools
+import logging
+import os
+import shutil
+import statistics
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
+
+
+def archive_with_tarfile(images_paths: List[Path], out_directory_path: Path, num_files: int) -> None:
+    # the archiving of the TarExecutor before the zero-copy writer
+    segment_lists = [images_paths[x : x + num_files] for x in range(0, len(images_paths), num_files)]  # noqa E203
+    for idx, segment in enumerate(segment_lists, start=1):
+        with tarfile.open(out_directory_path / f"{idx:08d}.tar", "w") as archive:
+            for filename in segment:
+                archive.add(name=filename, arcname=filename.name)
+
+
+def archive_with_tar_executor(
+    images_paths: List[Path], out_directory_path: Path, num_files: int, workers: int = 1
+) -> None:
+    TarExecutor().archive_files(
+        images_paths=images_paths, out_directory_path=out_directory_path, num_files=num_files, workers=workers
+    )
+
+
+def create_frames(directory: Path, frames: int, frame_size: int) -> List[Path]:
+    directory.mkdir(parents=True)
+    data = os.urandom(frame_size)
+    frames_paths = []
+    for idx in range(1, frames + 1):
+        frame_path = directory / f"{idx:08d}.png"
+        frame_path.write_bytes(data)
+        frames_paths.append(frame_path)
+
+    return frames_paths
+
+
+def read_members(tar_files_directory: Path) -> Dict[str, bytes]:
+    members = {}
+    for tar_file in sorted(tar_files_directory.glob("*.tar")):
+        with tarfile.open(tar_file, "r") as archive:
+            for member in archive.getmembers():
+                members[member.name] = archive.extractfile(member).read()
+
+    return members
+
+
+def run_benchmark(
+    archive: Callable[[List[Path], Path, int], None],
+    frames_paths: List[Path],
+    number_of_files_in_tar: int,
+    output_directory: Path,
+    repeat: int,
+) -> Dict[str, Any]:
+    wall_seconds, cpu_seconds = [], []
+    for _ in range(repeat):
+        shutil.rmtree(output_directory, ignore_errors=True)
+        output_directory.mkdir(parents=True)
+
+        start, cpu_start = time.perf_counter(), time.process_time()
+        archive(frames_paths, output_directory, number_of_files_in_tar)
+        wall_seconds.append(time.perf_counter() - start)
+        cpu_seconds.append(time.process_time() - cpu_start)
+
+    frames_bytes = sum(frame_path.stat().st_size for frame_path in frames_paths)
+    wall_time = statistics.median(wall_seconds)
+
+    return {
+        "seconds": wall_time,
+        "cpu_seconds": statistics.median(cpu_seconds),
+        "frames_per_second": len(frames_paths) / wall_time,
+        "mb_per_second": frames_bytes / 2**20 / wall_time,
+        "archives_bytes": sum(tar_file.stat().st_size for tar_file in output_directory.glob("*.tar")),
+    }
+
+
+def print_results(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"{'writer':>15} {'time, s':>8} {'cpu, s':>7} {'frames/s':>10} {'MB/s':>8} {'archives, MB':>13}")
+    for writer, result in results.items():
+        print(
+            f"{writer:>15} {result['seconds']:>8.2f} {result['cpu_seconds']:>7.2f} "
+            f"{result['frames_per_second']:>10.0f} {result['mb_per_second']:>8.1f} "
+            f"{result['archives_bytes'] / 2**20:>13.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compares the tarfile archiving with the zero-copy tar writer.")
+    parser.add_argument("--frames", type=int, default=100000)
+    parser.add_argument("--frame-size", type=int, default=16384, help="size of every frame in bytes")
+    parser.add_argument("--number-of-files-in-tar", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="worker processes of the tar executor")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--directory", type=Path, help="directory for the frames and archives, a temporary one if unset"
+    )
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with tempfile.TemporaryDirectory(dir=arguments.directory) as working_directory:
+        working_directory = Path(working_directory)
+
+        logging.info(f"creating {arguments.frames} frames of {arguments.frame_size} bytes")
+        frames_paths = create_frames(
+            directory=working_directory / "frames", frames=arguments.frames, frame_size=arguments.frame_size
+        )
+
+        writers = {"tarfile": archive_with_tarfile}
+        for workers in arguments.workers:
+            writers[f"tar_executor_{workers}"] = functools.partial(archive_with_tar_executor, workers=workers)
+
+        results = {}
+        for writer, archive in writers.items():
+            logging.info(f"benchmarking the {writer} writer")
+            results[writer] = run_benchmark(
+                archive=archive,
+                frames_paths=frames_paths,
+                number_of_files_in_tar=arguments.number_of_files_in_tar,
+                output_directory=working_directory / writer,
+                repeat=arguments.repeat,
+            )
+
+        # the archives differ by the pax headers tarfile adds for the fractional modification times, not by the frames
+        frames = read_members(working_directory / "tarfile")
+        if any(read_members(working_directory / writer) != frames for writer in writers):
+            raise SystemExit("The archives of the writers hold different frames")
+
+        print_results(results=results)
+
+
+if __name__ == "__main__":
+    main()
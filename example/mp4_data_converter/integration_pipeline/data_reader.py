@@ -1,20 +1,35 @@
+import contextlib
 import logging
 import shutil
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Mapping, Optional
 
 from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
-from src.integration_pipeline.base.pipeline_element import PipelineElement
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
+from example.mp4_data_converter.utils.video_utils import estimate_frames_count, retrieve_video_metadata_from_video_file
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import count_frames, get_size, record_element_io
+from src.utils.progress import record_frames_total
 
 
-class DataReader(PipelineElement):
+class DataReader(StreamingPipelineElement):
     def __init__(self, settings):
         super().__init__(settings=settings)
+        self._frame_format = FrameFormat.from_settings(settings=settings)
 
     def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
-        video_file = list(Path(inputs["directory_data_video"]).glob("*.mp4"))[0]
-        ffmpeg_executor = FFMPEGExecutor(file_name_format=self._settings["frame_file_name_format"])
+        if self._settings.get("piped_archiving", False):
+            return self._extract_frames_into_archives(inputs=inputs, outputs=outputs)
+
+        video_file = self._get_video_file(input_directory=Path(inputs["directory_data_video"]))
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings["frame_file_name_format"],
+            parallel_segments=self._settings.get("parallel_segments", 1),
+            frame_format=self._frame_format,
+        )
         output_directory = Path(outputs["directory_extracted_frames"])
         output_directory.mkdir(parents=True, exist_ok=True)
 
@@ -29,12 +44,116 @@ class DataReader(PipelineElement):
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         logging.info("finished extracting frames")
+        frames_count = len(list(output_directory.glob(f"*.{self._frame_format.extension}")))
+        record_frames_total(frames=frames_count)
+        record_element_io(
+            element=type(self).__name__,
+            frames=frames_count,
+            read_bytes=get_size(video_file),
+            written_bytes=get_size(output_directory),
+        )
 
         return {"directory_extracted_frames": output_directory, "video_metadata": video_metadata}
 
-    def cleanup(self, outputs: Dict[str, Any]) -> None:
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        if self._settings.get("piped_archiving", False):
+            return self._extract_frames_into_archives(inputs=inputs, outputs=outputs, stream=stream)
+
+        video_file = self._get_video_file(input_directory=Path(inputs["directory_data_video"]))
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings["frame_file_name_format"], frame_format=self._frame_format
+        )
         output_directory = Path(outputs["directory_extracted_frames"])
+        # frames are streamed as soon as they appear, so the ones left behind by an interrupted run are removed first
+        shutil.rmtree(path=output_directory, ignore_errors=True)
+        output_directory.mkdir(parents=True, exist_ok=True)
+
+        video_metadata = retrieve_video_metadata_from_video_file(video_file_path=video_file)
+        record_frames_total(frames=estimate_frames_count(video_metadata=video_metadata))
+        stream.publish({"directory_extracted_frames": output_directory, "video_metadata": video_metadata})
+
+        logging.info(f"started to stream frames from {video_file} extracted into the {output_directory}")
+        frames_count = 0
+        try:
+            frames_batches = ffmpeg_executor.iterate_extracted_frames(
+                file_path=video_file, output_directory=output_directory
+            )
+            with contextlib.closing(frames_batches):
+                for frames in frames_batches:
+                    stream.send(frames)
+                    frames_count += len(frames)
+        except ChildProcessError as e:
+            message = f"Failed to extract frames from the video: {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        logging.info("finished streaming extracted frames")
+        # the estimated frames count is replaced by the actual one
+        record_frames_total(frames=frames_count)
+        record_element_io(
+            element=type(self).__name__,
+            frames=frames_count,
+            read_bytes=get_size(video_file),
+            written_bytes=get_size(output_directory),
+        )
+
+        return {"directory_extracted_frames": output_directory, "video_metadata": video_metadata}
+
+    def _extract_frames_into_archives(
+        self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: Optional[WorkStream] = None
+    ) -> Dict[str, Any]:
+        video_file = self._get_video_file(input_directory=Path(inputs["directory_data_video"]))
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings["frame_file_name_format"], frame_format=self._frame_format
+        )
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
+        output_directory = Path(outputs["tar_files_directory"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+
+        video_metadata = retrieve_video_metadata_from_video_file(video_file_path=video_file)
+        record_frames_total(frames=estimate_frames_count(video_metadata=video_metadata))
+        if stream is not None:
+            stream.publish({"tar_files_directory": output_directory, "video_metadata": video_metadata})
+
+        logging.info(f"started to extract frames from {video_file} straight into archives in the {output_directory}")
+        try:
+            frames = ffmpeg_executor.iterate_frames(file_path=video_file)
+            with contextlib.closing(frames):
+                for tar_file in tar_executor.archive_frames(
+                    frames=count_frames(element=type(self).__name__, frames=frames),
+                    out_directory_path=output_directory,
+                    num_files=self._settings["number_of_files_in_tar"],
+                ):
+                    logging.debug(f"archived frames into the {tar_file}")
+                    if stream is not None:
+                        stream.send(tar_file)
+        except ChildProcessError as e:
+            message = f"Failed to extract frames from the video: {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        logging.info("finished extracting frames into archives")
+        record_element_io(
+            element=type(self).__name__, read_bytes=get_size(video_file), written_bytes=get_size(output_directory)
+        )
+
+        return {"tar_files_directory": output_directory, "video_metadata": video_metadata}
+
+    @staticmethod
+    def _get_video_file(input_directory: Path) -> Path:
+        video_files = list(input_directory.glob("*.mp4"))
+        if len(video_files) > 1:
+            logging.warning(
+                f"found {len(video_files)} videos in the {input_directory}, only {video_files[0]} is processed. "
+                f"Please use the batch mode to process all of them"
+            )
+
+        return video_files[0]
+
+    def cleanup(self, outputs: Dict[str, Any]) -> None:
+        for key in ("directory_extracted_frames", "tar_files_directory"):
+            if key not in outputs:
+                continue
 
-        if output_directory.is_dir():
-            logging.debug(f"cleaning up {output_directory}")
-            shutil.rmtree(path=output_directory, ignore_errors=True)
+            output_directory = Path(outputs[key])
+            if output_directory.is_dir():
+                logging.debug(f"cleaning up {output_directory}")
+                shutil.rmtree(path=output_directory, ignore_errors=True)
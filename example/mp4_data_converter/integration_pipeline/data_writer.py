@@ -1,29 +1,51 @@
 import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple
 
 from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
-from src.integration_pipeline.base.pipeline_element import PipelineElement
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import count_frames, get_size, record_element_io
 
 
-class DataWriter(PipelineElement):
+class DataWriter(StreamingPipelineElement):
     def __init__(self, settings):
         super().__init__(settings=settings)
+        self._frame_format = FrameFormat.from_settings(settings=settings)
 
     def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+        if self._settings.get("piped_encoding", False):
+            tar_files_directory = Path(inputs["anonymized_tar_files_directory"])
+            tar_files = sorted(tar_files_directory.glob("*.tar"))
+            if len(tar_files) == 0:
+                message = (
+                    f"The anonymized tar files directory {tar_files_directory} is invalid. "
+                    f"Please check if it contains tar files"
+                )
+                raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+            return self._encode_archives(tar_files=tar_files, inputs=inputs, outputs=outputs)
+
         input_directory = Path(inputs["directory_anonymized_frames"])
-        if len(list(input_directory.glob("*.png"))) == 0:
+        frames_paths = list(input_directory.glob(f"*.{self._frame_format.extension}"))
+        if len(frames_paths) == 0:
             message = (
                 f"The anonymized frames directory {input_directory} is invalid. "
-                f"Please check if it contains PNG files"
+                f"Please check if it contains {self._frame_format.extension.upper()} files"
             )
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         output_directory = Path(outputs["directory_anonymized_data_video"])
         output_directory.mkdir(parents=True, exist_ok=True)
 
-        ffmpeg_executor = FFMPEGExecutor(file_name_format=self._settings["frame_file_name_format"])
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings["frame_file_name_format"],
+            parallel_segments=self._settings.get("parallel_segments", 1),
+            frame_format=self._frame_format,
+        )
 
         logging.info(f"started to create video using frames from the {input_directory}")
         try:
@@ -37,8 +59,146 @@ class DataWriter(PipelineElement):
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         logging.info(f"finished creating video and saved it into the {output_directory}")
+        record_element_io(
+            element=type(self).__name__,
+            frames=len(frames_paths),
+            read_bytes=sum(get_size(frame_path) for frame_path in frames_paths),
+            written_bytes=get_size(output_directory / inputs["video_metadata"]["name"]),
+        )
 
         return {"directory_anonymized_data_video": output_directory}
 
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        if self._settings.get("piped_encoding", False):
+            return self._encode_archives(
+                tar_files=self._order_tar_files(tar_files=stream.receive()), inputs=inputs, outputs=outputs
+            )
+
+        # frames are encoded in their order, so the video is created once every anonymized frame has arrived
+        stream.drain()
+
+        return self.run(inputs=inputs, outputs=outputs)
+
+    def _encode_archives(
+        self, tar_files: Iterable[Path], inputs: Mapping[str, Any], outputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        output_directory = Path(outputs["directory_anonymized_data_video"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings["frame_file_name_format"], frame_format=self._frame_format
+        )
+
+        logging.info("started to create video using frames piped from the anonymized tar files")
+        try:
+            ffmpeg_executor.create_video_from_frames(
+                frames=count_frames(
+                    element=type(self).__name__,
+                    frames=self._iterate_frames(tar_files=tar_files, frame_duplicates=inputs.get("frame_duplicates")),
+                ),
+                output_directory=output_directory,
+                video_metadata=inputs["video_metadata"],
+            )
+        except ChildProcessError as e:
+            message = f"Failed to create video: {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        logging.info(f"finished creating video and saved it into the {output_directory}")
+        record_element_io(
+            element=type(self).__name__, written_bytes=get_size(output_directory / inputs["video_metadata"]["name"])
+        )
+
+        return {"directory_anonymized_data_video": output_directory}
+
+    def _iterate_frames(
+        self, tar_files: Iterable[Path], frame_duplicates: Optional[Mapping[str, str]]
+    ) -> Iterator[bytes]:
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
+        frames = self._iterate_archive_frames(tar_files=tar_files, tar_executor=tar_executor)
+        if frame_duplicates is None:
+            yield from (frame for _, _, frame in frames)
+            return
+
+        # the duplicate frames are left out of the archives, so each one is filled in at its position with its original
+        # frame, which is read back from its archive unless it is the frame just before. The FrameDeduplicator fills
+        # frame_duplicates in as it goes, so only the positions up to the last frame seen are looked up
+        frame_archives: Dict[str, Path] = {}
+        last_frame = ("", b"")
+        next_frame_idx = 1
+        for tar_file, frame_name, frame in frames:
+            frame_idx = int(Path(frame_name).stem)
+            for duplicate_idx in range(next_frame_idx, frame_idx):
+                duplicate_name = self._get_frame_name(frame_idx=duplicate_idx)
+                if duplicate_name in frame_duplicates:
+                    yield self._read_original_frame(
+                        duplicate_name=duplicate_name,
+                        original_name=frame_duplicates[duplicate_name],
+                        frame_archives=frame_archives,
+                        last_frame=last_frame,
+                        tar_executor=tar_executor,
+                    )
+
+            yield frame
+            frame_archives[frame_name] = tar_file
+            last_frame = (frame_name, frame)
+            next_frame_idx = frame_idx + 1
+
+        # the duplicates of the last frames of the video come after every archive
+        duplicate_name = self._get_frame_name(frame_idx=next_frame_idx)
+        while duplicate_name in frame_duplicates:
+            yield self._read_original_frame(
+                duplicate_name=duplicate_name,
+                original_name=frame_duplicates[duplicate_name],
+                frame_archives=frame_archives,
+                last_frame=last_frame,
+                tar_executor=tar_executor,
+            )
+            next_frame_idx += 1
+            duplicate_name = self._get_frame_name(frame_idx=next_frame_idx)
+
+    def _iterate_archive_frames(
+        self, tar_files: Iterable[Path], tar_executor: TarExecutor
+    ) -> Iterator[Tuple[Path, str, bytes]]:
+        for tar_file in tar_files:
+            record_element_io(element=type(self).__name__, read_bytes=get_size(tar_file))
+            logging.debug(f"piping frames from the {tar_file}")
+            for frame_name, frame in tar_executor.iterate_archive_files(archive_path=tar_file):
+                yield tar_file, frame_name, frame
+
+    def _get_frame_name(self, frame_idx: int) -> str:
+        return f"{self._settings['frame_file_name_format'] % frame_idx}.{self._frame_format.extension}"
+
+    @staticmethod
+    def _read_original_frame(
+        duplicate_name: str,
+        original_name: str,
+        frame_archives: Dict[str, Path],
+        last_frame: Tuple[str, bytes],
+        tar_executor: TarExecutor,
+    ) -> bytes:
+        if original_name == last_frame[0]:
+            return last_frame[1]
+
+        if original_name not in frame_archives:
+            message = f"The anonymized frame {original_name} duplicated by {duplicate_name} is missing"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        return tar_executor.read_archive_file(archive_path=frame_archives[original_name], name=original_name)
+
+    @staticmethod
+    def _order_tar_files(tar_files: Iterable[Path]) -> Iterator[Path]:
+        # anonymized archives may arrive out of order, while frames have to be encoded in the order of the segments,
+        # so an archive is held back until every segment before it has arrived
+        pending_tar_files: Dict[int, Path] = {}
+        next_segment_idx = 1
+        for tar_file in tar_files:
+            pending_tar_files[int(tar_file.stem)] = tar_file
+            while next_segment_idx in pending_tar_files:
+                yield pending_tar_files.pop(next_segment_idx)
+                next_segment_idx += 1
+
+        for segment_idx in sorted(pending_tar_files):
+            yield pending_tar_files[segment_idx]
+
     def cleanup(self, outputs: Dict[str, Any]) -> None:
         pass
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
+from example.mp4_data_converter.utils.file_utils import link_or_copy_file
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import record_element_io
+
+
+class FrameDeduplicator(StreamingPipelineElement):
+    def __init__(self, settings):
+        super().__init__(settings=settings)
+        self._frame_format = FrameFormat.from_settings(settings=settings)
+
+        self._perceptual_threshold = self._settings.get("perceptual_threshold")
+        self._thumbnail_size = self._settings.get("thumbnail_size", 32)
+
+        self._reset()
+
+    def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+        frames_directory = Path(inputs["directory_extracted_frames"])
+        frames_paths = sorted(frames_directory.glob(f"*.{self._frame_format.extension}"))
+        if len(frames_paths) == 0:
+            message = (
+                f"There are no files with extension '.{self._frame_format.extension}' to deduplicate "
+                f"in {frames_directory}"
+            )
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        output_directory = Path(outputs["directory_unique_frames"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+
+        logging.info(f"started to deduplicate frames from {frames_directory} into the {output_directory}")
+        self._reset()
+        frame_duplicates = {}
+        self._deduplicate(
+            frames_paths=frames_paths, output_directory=output_directory, frame_duplicates=frame_duplicates
+        )
+        self._log_savings(frames_count=len(frames_paths), frame_duplicates=frame_duplicates)
+
+        return {"directory_unique_frames": output_directory, "frame_duplicates": frame_duplicates}
+
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        output_directory = Path(outputs["directory_unique_frames"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        # the duplicates are published while they are still being found, so that the DataWriter piping the frames can
+        # fill them in as the archives arrive, each one is added before the frames after it are sent on
+        frame_duplicates = {}
+        stream.publish({"directory_unique_frames": output_directory, "frame_duplicates": frame_duplicates})
+
+        logging.info(f"started to deduplicate streamed frames into the {output_directory}")
+        self._reset()
+        frames_count = 0
+        for frames_paths in stream.receive():
+            unique_frames_paths = self._deduplicate(
+                frames_paths=frames_paths, output_directory=output_directory, frame_duplicates=frame_duplicates
+            )
+            if unique_frames_paths:
+                stream.send(unique_frames_paths)
+
+            frames_count += len(frames_paths)
+
+        if frames_count == 0:
+            message = f"There were no frames streamed to deduplicate into the {output_directory}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        self._log_savings(frames_count=frames_count, frame_duplicates=frame_duplicates)
+
+        return {"directory_unique_frames": output_directory, "frame_duplicates": frame_duplicates}
+
+    def _reset(self) -> None:
+        self._frames_by_hash = {}
+        self._last_unique_frame = None
+        self._last_unique_thumbnail = None
+
+    def _deduplicate(
+        self, frames_paths: List[Path], output_directory: Path, frame_duplicates: Dict[str, str]
+    ) -> List[Path]:
+        thumbnails = self._create_thumbnails(frames_paths=frames_paths)
+
+        unique_frames_paths = []
+        for idx, frame_path in enumerate(frames_paths):
+            # identical frames are found among all of the frames seen so far, similar ones only compared with the last
+            # unique frame, so that slow changes of the scene are not accumulated into a single frame
+            frame_hash = self._hash_frame(frame_path=frame_path)
+            original_frame = self._frames_by_hash.get(frame_hash)
+            if original_frame is None and thumbnails is not None and self._is_similar(thumbnail=thumbnails[idx]):
+                original_frame = self._last_unique_frame
+
+            if original_frame is not None:
+                frame_duplicates[frame_path.name] = original_frame
+                continue
+
+            unique_frame_path = output_directory / frame_path.name
+            link_or_copy_file(source=frame_path, destination=unique_frame_path)
+            unique_frames_paths.append(unique_frame_path)
+
+            self._frames_by_hash[frame_hash] = frame_path.name
+            self._last_unique_frame = frame_path.name
+            if thumbnails is not None:
+                self._last_unique_thumbnail = thumbnails[idx]
+
+        return unique_frames_paths
+
+    def _create_thumbnails(self, frames_paths: List[Path]) -> Optional[List[bytes]]:
+        if self._perceptual_threshold is None:
+            return None
+
+        ffmpeg_executor = FFMPEGExecutor(
+            file_name_format=self._settings.get("frame_file_name_format", "%08d"), frame_format=self._frame_format
+        )
+        try:
+            return ffmpeg_executor.create_thumbnails(frames_paths=frames_paths, size=self._thumbnail_size)
+        except ChildProcessError as e:
+            message = f"Failed to create thumbnails of the frames: {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+    def _is_similar(self, thumbnail: bytes) -> bool:
+        if self._last_unique_thumbnail is None:
+            return False
+
+        # the largest difference of a pixel is used, so a small object entering the scene still makes a frame unique
+        return max(abs(a - b) for a, b in zip(thumbnail, self._last_unique_thumbnail)) <= self._perceptual_threshold
+
+    def _hash_frame(self, frame_path: Path) -> str:
+        frame = frame_path.read_bytes()
+        record_element_io(element=type(self).__name__, frames=1, read_bytes=len(frame))
+
+        return hashlib.sha256(frame).hexdigest()
+
+    @staticmethod
+    def _log_savings(frames_count: int, frame_duplicates: Dict[str, str]) -> None:
+        logging.info(
+            f"finished deduplicating frames: {len(frame_duplicates)} of {frames_count} frames are duplicates and are "
+            f"not sent to Redact ({len(frame_duplicates) / frames_count:.1%} saved)"
+        )
+
+    def cleanup(self, outputs: Dict[str, Any]) -> None:
+        output_directory = Path(outputs["directory_unique_frames"])
+
+        if output_directory.is_dir():
+            logging.debug(f"cleaning up {output_directory}")
+            shutil.rmtree(path=output_directory, ignore_errors=True)
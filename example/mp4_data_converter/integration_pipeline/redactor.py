@@ -1,23 +1,82 @@
+import functools
+import itertools
 import logging
 import shutil
+import tarfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Union
 
-from redact.v4 import JobArguments, JobState, OutputType, RedactInstance, Region, ServiceType
+import httpx
+from redact.v4 import JobArguments, JobState, OutputType, RedactInstance, RedactJob, Region, ServiceType
 from retry import retry
 
-from src.integration_pipeline.base.pipeline_element import PipelineElement
+from example.mp4_data_converter.utils.file_utils import restore_duplicate_frames
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.metrics import (
+    REDACT_JOB_DURATION_SECONDS,
+    REDACT_JOB_FAILURES,
+    REDACT_JOB_RETRIES,
+    REDACT_JOBS,
+    REDACT_QUEUE_WAIT_SECONDS,
+)
+from example.mp4_data_converter.utils.redact_cache import RedactCache
+from example.mp4_data_converter.utils.redact_job_tracker import RedactJobTracker
+from example.mp4_data_converter.utils.redact_throughput import RedactThroughput
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import get_size, record_element_io
 from src.utils.settings import Settings
+from src.utils.tracing import span
 
+# the Redact jobs in any other state, e.g. cancelled, are finished and only the completed ones succeeded
+UNFINISHED_JOB_STATES = (JobState.pending, JobState.active)
 
-class Redactor(PipelineElement):
+
+class Redactor(StreamingPipelineElement):
     def __init__(self, settings):
         super().__init__(settings=settings)
 
+        self._max_concurrent_jobs = self._settings.get("max_concurrent_jobs", 1)
+        # the anonymized archives are unpacked into frames while they are downloaded, which replaces the TarExtractor
+        self._piped_extraction = self._settings.get("piped_extraction", False)
+        self._output_key = (
+            "directory_anonymized_frames" if self._piped_extraction else "anonymized_tar_files_directory"
+        )
+        self._tar_executor = TarExecutor(image_extenstion=FrameFormat.from_settings(settings=settings).extension)
+        self._redact_instance = None
+        self._httpx_client = None
+        self._redact_instance_lock = threading.Lock()
+
+        self._redaction_settings = {
+            "service": ServiceType.blur,
+            "out_type": OutputType.archives,
+            "region": Region.germany,
+            "face": True,
+            "license_plate": True,
+            "face_determination_threshold": self._settings["face_determination_threshold"],
+            "lp_determination_threshold": self._settings["lp_determination_threshold"],
+        }
+
+        # the durations of the jobs are recorded for the TarArchiver to pick the size of the archives from
+        self._redact_throughput = None
+        if self._settings.get("redact_stats_file"):
+            self._redact_throughput = RedactThroughput(stats_file=Path(self._settings["redact_stats_file"]))
+
+        self._redact_cache = None
+        if self._settings.get("cache_directory"):
+            self._redact_cache = RedactCache(
+                directory=Path(self._settings["cache_directory"]),
+                max_size_bytes=self._settings.get("cache_max_size_mb", 10240) * 2**20,
+            )
+
     def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
         input_directory = Path(inputs["tar_files_directory"])
-        output_directory = Path(outputs["anonymized_tar_files_directory"])
+        output_directory = Path(outputs[self._output_key])
         output_directory.mkdir(parents=True, exist_ok=True)
 
         if not self._is_tar_archives_directory_valid(tar_files_directory=input_directory):
@@ -31,47 +90,307 @@ class Redactor(PipelineElement):
                 f"does not contain any tar files",
             )
 
-        for tar_file in input_directory.glob("*.tar"):
-            anonymized_tar_file = output_directory / tar_file.name
-            logging.info(f"anonymizing the {tar_file}")
-            self._redact(
-                tar_file=tar_file, redact_url=self._settings["redact_url"], anonymized_tar_file=anonymized_tar_file
+        for _ in self._anonymize(tar_files=sorted(input_directory.glob("*.tar")), output_directory=output_directory):
+            pass
+
+        if self._piped_extraction:
+            self._restore_duplicates(
+                frame_duplicates=inputs.get("frame_duplicates") or {}, output_directory=output_directory
             )
-            logging.info(f"finished anonymizing the {tar_file}")
 
-        return {"anonymized_tar_files_directory": output_directory}
+        return {self._output_key: output_directory}
+
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        output_directory = Path(outputs[self._output_key])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        stream.publish({self._output_key: output_directory})
+
+        anonymized_tar_files_count = 0
+        for anonymized_result in self._anonymize(tar_files=stream.receive(), output_directory=output_directory):
+            stream.send(anonymized_result)
+            anonymized_tar_files_count += 1
+
+        if anonymized_tar_files_count == 0:
+            message = "There were no tar archives streamed to anonymize"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        # the duplicates are known once the FrameDeduplicator has seen every frame, which has happened by the time the
+        # last archive arrives
+        if self._piped_extraction:
+            restored_frames = self._restore_duplicates(
+                frame_duplicates=inputs.get("frame_duplicates") or {}, output_directory=output_directory
+            )
+            if restored_frames:
+                stream.send(restored_frames)
+
+        return {self._output_key: output_directory}
 
     @staticmethod
     def _is_tar_archives_directory_valid(tar_files_directory: Path) -> bool:
         return tar_files_directory.is_dir() and len(list(tar_files_directory.glob("*.tar")))
 
-    @retry(PipelineElementError, tries=Settings().redaction_retry)
-    def _redact(self, tar_file: Path, redact_url: str, anonymized_tar_file: Path) -> None:
-        redact_instance = RedactInstance.create(
-            service=ServiceType.blur, out_type=OutputType.archives, redact_url=redact_url
+    def _anonymize(self, tar_files: Iterable[Path], output_directory: Path) -> Iterator[Union[Path, List[Path]]]:
+        # yields the anonymized tar files, or the lists of the anonymized frames with the piped extraction
+        redact_instance = self._get_redact_instance()
+        anonymize_tar_file = (
+            self._anonymize_and_extract_tar_file if self._piped_extraction else self._anonymize_tar_file
         )
 
-        job_args = JobArguments(
-            region=Region.germany,
-            face=True,
-            license_plate=True,
-            face_determination_threshold=self._settings["face_determination_threshold"],
-            lp_determination_threshold=self._settings["lp_determination_threshold"],
+        # every job is uploaded and downloaded by a thread of its own, while a single tracker polls all of them
+        job_tracker = RedactJobTracker(
+            finished_states=[state for state in JobState if state not in UNFINISHED_JOB_STATES],
+            min_poll_interval=self._settings.get("min_poll_interval", 0.5),
+            max_poll_interval=self._settings.get("max_poll_interval", 30),
+            max_status_requests_per_second=self._settings.get("max_status_requests_per_second", 10),
+            job_timeout=self._settings.get("job_timeout", 3600),
+            redact_throughput=self._redact_throughput,
+        )
+        with job_tracker, ThreadPoolExecutor(
+            max_workers=self._max_concurrent_jobs, thread_name_prefix="redactor"
+        ) as executor:
+            in_flight = set()
+            try:
+                for tar_file in tar_files:
+                    queued_at = time.perf_counter()
+                    if len(in_flight) >= self._max_concurrent_jobs:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        yield from (future.result() for future in done)
+
+                    in_flight.add(
+                        executor.submit(
+                            anonymize_tar_file,
+                            tar_file=tar_file,
+                            redact_instance=redact_instance,
+                            job_tracker=job_tracker,
+                            output_directory=output_directory,
+                            queued_at=queued_at,
+                        )
+                    )
+
+                for future in as_completed(in_flight):
+                    yield future.result()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def _anonymize_tar_file(
+        self,
+        tar_file: Path,
+        redact_instance: RedactInstance,
+        job_tracker: RedactJobTracker,
+        output_directory: Path,
+        queued_at: float,
+    ) -> Path:
+        REDACT_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+        anonymized_tar_file = output_directory / tar_file.name
+
+        if self._is_work_unit_finished(work_unit=tar_file.name) and anonymized_tar_file.is_file():
+            logging.info(f"the {tar_file} was anonymized by the interrupted run")
+            return anonymized_tar_file
+
+        cache_key = None
+        if self._redact_cache is not None:
+            cache_key = RedactCache.get_key(tar_file=tar_file, redaction_settings=self._redaction_settings)
+            if self._redact_cache.get(key=cache_key, destination=anonymized_tar_file):
+                logging.info(f"took the anonymized {tar_file} from the Redact cache")
+                self._finish_work_unit(work_unit=tar_file.name)
+                return anonymized_tar_file
+
+        logging.info(f"anonymizing the {tar_file}")
+        self._redact(
+            tar_file=tar_file,
+            redact_instance=redact_instance,
+            job_tracker=job_tracker,
+            download=lambda job: job.download_result_to_file(file=anonymized_tar_file),
+            attempts=itertools.count(),
+        )
+        logging.info(f"finished anonymizing the {tar_file}")
+        record_element_io(
+            element=type(self).__name__, read_bytes=get_size(tar_file), written_bytes=get_size(anonymized_tar_file)
         )
 
-        with tar_file.open("rb") as f:
-            job = redact_instance.start_job(file=f, job_args=job_args)
+        if cache_key is not None:
+            self._redact_cache.put(key=cache_key, source=anonymized_tar_file)
+
+        self._finish_work_unit(work_unit=tar_file.name)
+
+        return anonymized_tar_file
+
+    def _anonymize_and_extract_tar_file(
+        self,
+        tar_file: Path,
+        redact_instance: RedactInstance,
+        job_tracker: RedactJobTracker,
+        output_directory: Path,
+        queued_at: float,
+    ) -> List[Path]:
+        REDACT_QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
 
-        job = job.wait_until_finished()
-        job_status = job.get_status()
-        if job_status.state == JobState.failed:
-            message = f"Redacting tarfile {tar_file} failed with error: {job_status.error}"
+        # anonymized archives hold the frames of the archives sent to Redact, under the same names
+        if self._is_work_unit_finished(work_unit=tar_file.name):
+            frames = [output_directory / name for name in self._tar_executor.get_image_names(archive_path=tar_file)]
+            if all(frame.is_file() for frame in frames):
+                logging.info(f"the {tar_file} was anonymized and extracted by the interrupted run")
+                return frames
+
+        # the archive taken from the cache is a copy of the cache entry, removed once its frames are extracted
+        cache_key = None
+        if self._redact_cache is not None:
+            cache_key = RedactCache.get_key(tar_file=tar_file, redaction_settings=self._redaction_settings)
+            cached_tar_file = output_directory / tar_file.name
+            if self._redact_cache.get(key=cache_key, destination=cached_tar_file):
+                logging.info(f"took the anonymized {tar_file} from the Redact cache")
+                try:
+                    frames = self._tar_executor.extract_file(
+                        archive_path=cached_tar_file, out_directory_path=output_directory
+                    )
+                except (OSError, tarfile.TarError) as e:
+                    message = f"Failed to extract the frames of the cached anonymized {tar_file}: {e}"
+                    raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+                finally:
+                    cached_tar_file.unlink(missing_ok=True)
+
+                self._finish_work_unit(work_unit=tar_file.name)
+                return frames
+
+        # with the cache the downloaded archive is also copied aside while it is extracted, to be cached afterwards
+        archive_copy_path = output_directory / f"{tar_file.name}.download" if cache_key is not None else None
+
+        logging.info(f"anonymizing the {tar_file} and extracting its frames")
+        try:
+            frames = self._redact(
+                tar_file=tar_file,
+                redact_instance=redact_instance,
+                job_tracker=job_tracker,
+                download=functools.partial(
+                    self._download_and_extract,
+                    tar_file=tar_file,
+                    output_directory=output_directory,
+                    archive_copy_path=archive_copy_path,
+                ),
+                attempts=itertools.count(),
+            )
+            logging.info(f"finished anonymizing the {tar_file} and extracting its frames")
+            record_element_io(
+                element=type(self).__name__,
+                frames=len(frames),
+                read_bytes=get_size(tar_file),
+                written_bytes=sum(get_size(frame) for frame in frames),
+            )
+
+            if archive_copy_path is not None:
+                self._redact_cache.put(key=cache_key, source=archive_copy_path)
+        finally:
+            if archive_copy_path is not None:
+                archive_copy_path.unlink(missing_ok=True)
+
+        self._finish_work_unit(work_unit=tar_file.name)
+
+        return frames
+
+    def _download_and_extract(
+        self, job: RedactJob, tar_file: Path, output_directory: Path, archive_copy_path: Optional[Path]
+    ) -> List[Path]:
+        # a broken download fails the attempt, so the job is redacted again
+        try:
+            return self._tar_executor.extract_stream(
+                write_archive=lambda archive: job.download_result_to_file(file=archive),
+                out_directory_path=output_directory,
+                archive_copy_path=archive_copy_path,
+            )
+        except (OSError, tarfile.TarError) as e:
+            message = f"Failed to extract the frames of the anonymized {tar_file}: {e}"
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
-        job.download_result_to_file(file=anonymized_tar_file)
+    @staticmethod
+    def _restore_duplicates(frame_duplicates: Dict[str, str], output_directory: Path) -> List[Path]:
+        try:
+            return restore_duplicate_frames(frame_duplicates=frame_duplicates, directory=output_directory)
+        except FileNotFoundError as e:
+            raise PipelineElementError(public_message=str(e), severity=Severity.major, log_message=str(e))
+
+    def _get_redact_instance(self) -> RedactInstance:
+        # a single instance with a pooled client is shared by all jobs, and by the runs of an element reused in the
+        # watch and job server modes, so connections are kept alive between them until the element is closed
+        with self._redact_instance_lock:
+            if self._redact_instance is None:
+                # one connection more than the jobs, so the status requests never wait behind the uploads and downloads
+                self._httpx_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self._max_concurrent_jobs + 1,
+                        max_keepalive_connections=self._max_concurrent_jobs + 1,
+                    ),
+                    timeout=self._settings.get("request_timeout", 300),
+                )
+                self._redact_instance = RedactInstance.create(
+                    service=self._redaction_settings["service"],
+                    out_type=self._redaction_settings["out_type"],
+                    redact_url=self._settings["redact_url"],
+                    httpx_client=self._httpx_client,
+                )
+
+            return self._redact_instance
+
+    @retry(PipelineElementError, tries=Settings().redaction_retry)
+    def _redact(
+        self,
+        tar_file: Path,
+        redact_instance: RedactInstance,
+        job_tracker: RedactJobTracker,
+        download: Callable[[RedactJob], Any],
+        attempts: Iterator[int],
+    ) -> Any:
+        # the same attempts iterator is passed to every retry of the tar file
+        if next(attempts) > 0:
+            REDACT_JOB_RETRIES.inc()
+
+        job_args = JobArguments(
+            region=self._redaction_settings["region"],
+            face=self._redaction_settings["face"],
+            license_plate=self._redaction_settings["license_plate"],
+            face_determination_threshold=self._redaction_settings["face_determination_threshold"],
+            lp_determination_threshold=self._redaction_settings["lp_determination_threshold"],
+        )
+
+        REDACT_JOBS.inc()
+        started_at = time.perf_counter()
+        with REDACT_JOB_DURATION_SECONDS.time(), span(name="redact", category="redact", tar_file=tar_file):
+            with span(name="upload", category="redact"), tar_file.open("rb") as f:
+                job = redact_instance.start_job(file=f, job_args=job_args)
+
+            with span(name="wait", category="redact"):
+                try:
+                    job_status = job_tracker.wait(job=job, upload_bytes=get_size(tar_file))
+                except TimeoutError as e:
+                    REDACT_JOB_FAILURES.inc()
+                    message = f"Redacting tarfile {tar_file} timed out: {e}"
+                    raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+            if job_status.state != JobState.completed:
+                REDACT_JOB_FAILURES.inc()
+                message = f"Redacting tarfile {tar_file} ended {job_status.state} with error: {job_status.error}"
+                raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+            with span(name="download", category="redact"):
+                result = download(job)
+
+        if self._redact_throughput is not None:
+            self._redact_throughput.record_job(
+                upload_bytes=get_size(tar_file), duration_seconds=time.perf_counter() - started_at
+            )
+
+        return result
+
+    def close(self) -> None:
+        with self._redact_instance_lock:
+            if self._httpx_client is not None:
+                self._httpx_client.close()
+
+            self._httpx_client = None
+            self._redact_instance = None
 
     def cleanup(self, outputs: Dict[str, Any]) -> None:
-        output_directory = Path(outputs["anonymized_tar_files_directory"])
+        output_directory = Path(outputs[self._output_key])
 
         if output_directory.is_dir():
             logging.debug(f"cleaning up {output_directory}")
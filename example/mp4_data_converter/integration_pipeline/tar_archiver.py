@@ -1,44 +1,175 @@
 import logging
 import shutil
+import tarfile
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
 
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.metrics import TAR_ARCHIVE_SIZE_BYTES, TAR_TARGET_SIZE_BYTES
+from example.mp4_data_converter.utils.redact_throughput import RedactThroughput
 from example.mp4_data_converter.utils.tar_executor import TarExecutor
-from src.integration_pipeline.base.pipeline_element import PipelineElement
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import get_size, record_element_io
 
+# the file and the work unit keeping the archive size, so a resumed run cuts the archives the Redactor has seen
+TAR_SIZE_FILE = ".tar_size"
 
-class TarArchiver(PipelineElement):
+
+class TarArchiver(StreamingPipelineElement):
     def __init__(self, settings):
         super().__init__(settings=settings)
+        self._frame_format = FrameFormat.from_settings(settings=settings)
+        self._archiving_workers = self._settings.get("archiving_workers", 1)
+        # the archives are cut at number_of_files_in_tar frames or at tar_size_mb, whichever comes first
+        self._num_files = self._settings.get("number_of_files_in_tar")
+        self._tar_size_bytes = self._get_bytes(size_mb=self._settings.get("tar_size_mb"))
+
+        # the adaptive size is picked from the Redact jobs the Redactor records into the redact_stats_file
+        self._redact_throughput = None
+        if self._settings.get("adaptive_tar_size", False):
+            self._redact_throughput = RedactThroughput(stats_file=Path(self._settings["redact_stats_file"]))
 
     def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
-        frames_directory = Path(inputs["directory_extracted_frames"])
-        frames_paths = sorted([f for f in frames_directory.glob("*.png")])
+        # with the FrameDeduplicator in the pipeline only its unique frames are archived
+        frames_directory = Path(inputs.get("directory_unique_frames") or inputs["directory_extracted_frames"])
+        frames_paths = sorted([f for f in frames_directory.glob(f"*.{self._frame_format.extension}")])
 
         if len(frames_paths) == 0:
-            message = f"There are no files with extension '.png' to archive in {frames_directory}"
+            message = (
+                f"There are no files with extension '.{self._frame_format.extension}' to archive in {frames_directory}"
+            )
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         output_directory = Path(outputs["tar_files_directory"])
         output_directory.mkdir(parents=True, exist_ok=True)
 
-        tar_executor = TarExecutor(image_extenstion="png")
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
+        tar_size_bytes = self._get_tar_size(output_directory=output_directory)
 
         logging.info(f"started to archive frames from {frames_directory} into the {output_directory}")
         try:
-            tar_executor.archive_files(
-                images_paths=frames_paths,
+            for _, tar_file in tar_executor.archive_segments(
+                segments=self._iterate_segments(frames_lists=[frames_paths], tar_size_bytes=tar_size_bytes),
                 out_directory_path=output_directory,
-                num_files=self._settings["number_of_files_in_tar"],
-            )
+                workers=self._archiving_workers,
+            ):
+                TAR_ARCHIVE_SIZE_BYTES.observe(get_size(tar_file))
         except Exception as e:
             message = f"Failed to archive frames into the archive(-s): {e}"
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         logging.info("finished archiving frames")
+        record_element_io(
+            element=type(self).__name__,
+            frames=len(frames_paths),
+            read_bytes=sum(get_size(frame_path) for frame_path in frames_paths),
+            written_bytes=get_size(output_directory),
+        )
+
+        return {"tar_files_directory": output_directory}
+
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        output_directory = Path(outputs["tar_files_directory"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        stream.publish({"tar_files_directory": output_directory})
+
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
+        tar_size_bytes = self._get_tar_size(output_directory=output_directory)
+
+        logging.info(f"started to archive streamed frames into the {output_directory}")
+        archived_segments_count = 0
+        try:
+            for frames_paths, tar_file in tar_executor.archive_segments(
+                segments=self._iterate_segments(frames_lists=stream.receive(), tar_size_bytes=tar_size_bytes),
+                out_directory_path=output_directory,
+                workers=self._archiving_workers,
+            ):
+                record_element_io(
+                    element=type(self).__name__,
+                    frames=len(frames_paths),
+                    read_bytes=sum(get_size(frame_path) for frame_path in frames_paths),
+                    written_bytes=get_size(tar_file),
+                )
+                TAR_ARCHIVE_SIZE_BYTES.observe(get_size(tar_file))
+                stream.send(tar_file)
+                archived_segments_count += 1
+        except (OSError, EOFError, BrokenProcessPool) as e:
+            message = f"Failed to archive frames into the archive(-s): {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        if archived_segments_count == 0:
+            message = f"There were no frames streamed to archive into the {output_directory}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        logging.info("finished archiving streamed frames")
+
+        return {"tar_files_directory": output_directory}
+
+    def _get_tar_size(self, output_directory: Path) -> Optional[int]:
+        tar_size_bytes = self._tar_size_bytes
+        if self._redact_throughput is not None:
+            tar_size_file = output_directory / TAR_SIZE_FILE
+            if self._is_work_unit_finished(work_unit=TAR_SIZE_FILE) and tar_size_file.is_file():
+                tar_size_bytes = int(tar_size_file.read_text())
+                logging.info(f"cutting the archives at {tar_size_bytes / 2**20:.1f} MB like the interrupted run")
+            elif (estimate := self._redact_throughput.estimate()) is not None:
+                overhead_seconds, bytes_per_second = estimate
+                tar_size_bytes = RedactThroughput.get_target_size(
+                    overhead_seconds=overhead_seconds,
+                    bytes_per_second=bytes_per_second,
+                    overhead_share=self._settings.get("redact_overhead_share", 0.1),
+                    min_bytes=self._get_bytes(size_mb=self._settings.get("min_tar_size_mb", 1)),
+                    max_bytes=self._get_bytes(size_mb=self._settings.get("max_tar_size_mb", 256)),
+                )
+                logging.info(
+                    f"cutting the archives at {tar_size_bytes / 2**20:.1f} MB for Redact jobs taking "
+                    f"{overhead_seconds:.2f}s plus {bytes_per_second / 2**20:.1f} MB/s"
+                )
+            else:
+                logging.info("there are too few Redact jobs recorded to pick the archive size, using the tar_size_mb")
+
+            if tar_size_bytes is not None:
+                tar_size_file.write_text(str(tar_size_bytes))
+                self._finish_work_unit(work_unit=TAR_SIZE_FILE)
+
+        elif tar_size_bytes is not None:
+            logging.info(f"cutting the archives at {tar_size_bytes / 2**20:.1f} MB")
+
+        if tar_size_bytes is not None:
+            TAR_TARGET_SIZE_BYTES.set(tar_size_bytes)
+
+        return tar_size_bytes
+
+    def _iterate_segments(
+        self, frames_lists: Iterable[List[Path]], tar_size_bytes: Optional[int]
+    ) -> Iterator[List[Path]]:
+        # a frame larger than the whole size gets an archive of its own
+        segment, segment_bytes = [], 0
+        for frames in frames_lists:
+            for frame in frames:
+                frame_bytes = 0
+                if tar_size_bytes is not None:
+                    frame_bytes = tarfile.BLOCKSIZE + -(-get_size(frame) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+                if segment and (
+                    len(segment) == self._num_files
+                    or (tar_size_bytes is not None and segment_bytes + frame_bytes > tar_size_bytes)
+                ):
+                    yield segment
+                    segment, segment_bytes = [], 0
+
+                segment.append(frame)
+                segment_bytes += frame_bytes
+
+        if segment:
+            yield segment
 
-        return {"directory_extracted_frames": output_directory}
+    @staticmethod
+    def _get_bytes(size_mb: Optional[float]) -> Optional[int]:
+        return int(size_mb * 2**20) if size_mb is not None else None
 
     def cleanup(self, outputs: Dict[str, Any]) -> None:
         output_directory = Path(outputs["tar_files_directory"])
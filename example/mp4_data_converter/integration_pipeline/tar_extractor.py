@@ -1,16 +1,23 @@
 import logging
 import shutil
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Tuple
 
+from example.mp4_data_converter.utils.file_utils import restore_duplicate_frames
+from example.mp4_data_converter.utils.frame_format import FrameFormat
 from example.mp4_data_converter.utils.tar_executor import TarExecutor
-from src.integration_pipeline.base.pipeline_element import PipelineElement
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.utils.metrics import get_size, record_element_io
 
 
-class TarExtractor(PipelineElement):
+class TarExtractor(StreamingPipelineElement):
     def __init__(self, settings):
         super().__init__(settings=settings)
+        self._frame_format = FrameFormat.from_settings(settings=settings)
+        self._extraction_workers = self._settings.get("extraction_workers", 1)
 
     def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
         frames_directory = Path(inputs["anonymized_tar_files_directory"])
@@ -23,22 +30,110 @@ class TarExtractor(PipelineElement):
         output_directory = Path(outputs["directory_anonymized_frames"])
         output_directory.mkdir(parents=True, exist_ok=True)
 
-        tar_executor = TarExecutor(image_extenstion="png")
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
 
         logging.info(f"started to extract frames using archives from {frames_directory} into the {output_directory}")
         try:
             tar_executor.extract_files(
                 archives_paths=tars_anonymized,
                 out_directory_path=output_directory,
+                workers=self._extraction_workers,
             )
         except Exception as e:
             message = f"Failed to extract frames from the archive(s): {e}"
             raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
 
         logging.info("finished extracting frames")
+        record_element_io(
+            element=type(self).__name__,
+            frames=len(list(output_directory.glob(f"*.{self._frame_format.extension}"))),
+            read_bytes=sum(get_size(tar_file) for tar_file in tars_anonymized),
+            written_bytes=get_size(output_directory),
+        )
+
+        self._restore_duplicates(
+            frame_duplicates=inputs.get("frame_duplicates") or {}, output_directory=output_directory
+        )
+
+        return {"directory_anonymized_frames": output_directory}
+
+    def run_stream(self, inputs: Mapping[str, Any], outputs: Dict[str, Any], stream: WorkStream) -> Dict[str, Any]:
+        output_directory = Path(outputs["directory_anonymized_frames"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        stream.publish({"directory_anonymized_frames": output_directory})
+
+        tar_executor = TarExecutor(image_extenstion=self._frame_format.extension)
+
+        logging.info(f"started to extract frames from streamed archives into the {output_directory}")
+        extracted_archives_count = 0
+        for tar_file, frames in self._extract_stream(
+            tar_files=stream.receive(), tar_executor=tar_executor, output_directory=output_directory
+        ):
+            record_element_io(
+                element=type(self).__name__,
+                frames=len(frames),
+                read_bytes=get_size(tar_file),
+                written_bytes=sum(get_size(frame) for frame in frames),
+            )
+            stream.send(frames)
+            extracted_archives_count += 1
+
+        if extracted_archives_count == 0:
+            message = "There were no anonymized tar archives streamed to extract"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+        logging.info("finished extracting frames from streamed archives")
+
+        # the duplicates are known once the FrameDeduplicator has seen every frame, which has happened by the time the
+        # last archive arrives
+        restored_frames = self._restore_duplicates(
+            frame_duplicates=inputs.get("frame_duplicates") or {}, output_directory=output_directory
+        )
+        if restored_frames:
+            stream.send(restored_frames)
 
         return {"directory_anonymized_frames": output_directory}
 
+    def _extract_stream(
+        self, tar_files: Iterable[Path], tar_executor: TarExecutor, output_directory: Path
+    ) -> Iterator[Tuple[Path, List[Path]]]:
+        # up to extraction_workers archives are extracted at once, their frames are sent in the order they finish
+        with ThreadPoolExecutor(max_workers=self._extraction_workers, thread_name_prefix="tar_extractor") as executor:
+            in_flight = {}
+            try:
+                for tar_file in tar_files:
+                    if len(in_flight) >= self._extraction_workers:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        yield from (self._get_extracted_frames(future=future, in_flight=in_flight) for future in done)
+
+                    future = executor.submit(
+                        tar_executor.extract_file, archive_path=tar_file, out_directory_path=output_directory
+                    )
+                    in_flight[future] = tar_file
+
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from (self._get_extracted_frames(future=future, in_flight=in_flight) for future in done)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    @staticmethod
+    def _get_extracted_frames(future: Future, in_flight: Dict[Future, Path]) -> Tuple[Path, List[Path]]:
+        tar_file = in_flight.pop(future)
+        try:
+            return tar_file, future.result()
+        except Exception as e:
+            message = f"Failed to extract frames from the archive {tar_file}: {e}"
+            raise PipelineElementError(public_message=message, severity=Severity.major, log_message=message)
+
+    @staticmethod
+    def _restore_duplicates(frame_duplicates: Dict[str, str], output_directory: Path) -> List[Path]:
+        try:
+            return restore_duplicate_frames(frame_duplicates=frame_duplicates, directory=output_directory)
+        except FileNotFoundError as e:
+            raise PipelineElementError(public_message=str(e), severity=Severity.major, log_message=str(e))
+
     def cleanup(self, outputs: Dict[str, Any]) -> None:
         output_directory = Path(outputs["directory_anonymized_frames"])
 
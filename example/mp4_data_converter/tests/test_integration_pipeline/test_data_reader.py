@@ -1,3 +1,4 @@
+import tarfile
 from pathlib import Path
 
 import pytest
@@ -43,3 +44,37 @@ class TestDataReader:
             data_reader.run(
                 inputs={"directory_data_video": tmp_path}, outputs={"directory_extracted_frames": tmp_path}
             )
+
+    def test_run_piped_archiving(self, mocker: MockFixture, tmp_path: Path) -> None:
+        frames = [(f"{idx:08d}.png", b"frame") for idx in range(1, 6)]
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.data_reader.FFMPEGExecutor.iterate_frames",
+            return_value=(frame for frame in frames),
+        )
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.data_reader."
+            "retrieve_video_metadata_from_video_file",
+            return_value={},
+        )
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.data_reader.Path.glob", return_value=["video.mp4"]
+        )
+
+        data_reader = DataReader(
+            settings={
+                "frame_file_name_format": self.file_name_format,
+                "piped_archiving": True,
+                "number_of_files_in_tar": 2,
+            }
+        )
+
+        result = data_reader.run(inputs={"directory_data_video": tmp_path}, outputs={"tar_files_directory": tmp_path})
+
+        assert result == {"tar_files_directory": tmp_path, "video_metadata": {}}
+
+        tar_files = sorted(tmp_path.iterdir())
+        assert [tar_file.name for tar_file in tar_files] == ["00000001.tar", "00000002.tar", "00000003.tar"]
+
+        with tarfile.open(tar_files[-1], "r") as archive:
+            assert archive.getnames() == ["00000005.png"]
+            assert archive.extractfile("00000005.png").read() == b"frame"
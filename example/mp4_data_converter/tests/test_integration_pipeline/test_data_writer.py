@@ -1,3 +1,5 @@
+import io
+import tarfile
 from pathlib import Path
 from typing import Any, Dict
 
@@ -78,3 +80,76 @@ class TestDataWriter:
                 inputs={"directory_anonymized_frames": tmp_path, "video_metadata": video_metadata},
                 outputs={"directory_anonymized_data_video": tmp_path},
             )
+
+    @staticmethod
+    def _archive_frames(tar_file: Path, frames: Dict[str, bytes]) -> None:
+        with tarfile.open(tar_file, "w") as archive:
+            for name, data in frames.items():
+                frame_info = tarfile.TarInfo(name=name)
+                frame_info.size = len(data)
+                archive.addfile(tarinfo=frame_info, fileobj=io.BytesIO(data))
+
+    def test_run_piped_encoding(self, mocker: MockFixture, tmp_path: Path, video_metadata: Dict[str, Any]) -> None:
+        encoded_frames = []
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.data_writer.FFMPEGExecutor."
+            "create_video_from_frames",
+            side_effect=lambda frames, output_directory, video_metadata: encoded_frames.extend(frames),
+        )
+        self._archive_frames(tar_file=tmp_path / "00000002.tar", frames={"00000004.png": b"4", "00000003.png": b"3"})
+        self._archive_frames(tar_file=tmp_path / "00000001.tar", frames={"00000001.png": b"1", "00000002.png": b"2"})
+
+        data_writer = DataWriter(settings={"frame_file_name_format": self.file_name_format, "piped_encoding": True})
+
+        result = data_writer.run(
+            inputs={"anonymized_tar_files_directory": tmp_path, "video_metadata": video_metadata},
+            outputs={"directory_anonymized_data_video": tmp_path / "output"},
+        )
+
+        assert result == {"directory_anonymized_data_video": tmp_path / "output"}
+        assert encoded_frames == [b"1", b"2", b"3", b"4"]
+
+    def test_encode_archives_fills_in_the_duplicate_frames(
+        self, mocker: MockFixture, tmp_path: Path, video_metadata: Dict[str, Any]
+    ) -> None:
+        encoded_frames = []
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.data_writer.FFMPEGExecutor."
+            "create_video_from_frames",
+            side_effect=lambda frames, output_directory, video_metadata: encoded_frames.extend(frames),
+        )
+        self._archive_frames(tar_file=tmp_path / "00000001.tar", frames={"00000001.png": b"1", "00000002.png": b"2"})
+        self._archive_frames(tar_file=tmp_path / "00000002.tar", frames={"00000004.png": b"4", "00000006.png": b"6"})
+        frame_duplicates = {
+            "00000003.png": "00000001.png",
+            "00000005.png": "00000004.png",
+            "00000007.png": "00000006.png",
+            "00000008.png": "00000006.png",
+        }
+
+        data_writer = DataWriter(settings={"frame_file_name_format": self.file_name_format, "piped_encoding": True})
+
+        data_writer._encode_archives(
+            tar_files=[tmp_path / "00000001.tar", tmp_path / "00000002.tar"],
+            inputs={"video_metadata": video_metadata, "frame_duplicates": frame_duplicates},
+            outputs={"directory_anonymized_data_video": tmp_path / "output"},
+        )
+
+        assert len(encoded_frames) == 8
+        assert encoded_frames == [b"1", b"2", b"1", b"4", b"4", b"6", b"6", b"6"]
+
+    def test_run_piped_encoding_invalid_directory_raises(self, tmp_path: Path, video_metadata: Dict[str, Any]) -> None:
+        data_writer = DataWriter(settings={"frame_file_name_format": self.file_name_format, "piped_encoding": True})
+
+        with pytest.raises(PipelineElementError):
+            data_writer.run(
+                inputs={"anonymized_tar_files_directory": tmp_path, "video_metadata": video_metadata},
+                outputs={"directory_anonymized_data_video": tmp_path / "output"},
+            )
+
+    def test_order_tar_files(self) -> None:
+        tar_files = [Path(f"{idx:08d}.tar") for idx in (2, 1, 4, 3, 6)]
+
+        result = list(DataWriter._order_tar_files(tar_files=tar_files))
+
+        assert result == [Path(f"{idx:08d}.tar") for idx in (1, 2, 3, 4, 6)]
@@ -1,8 +1,13 @@
+import contextlib
 import math
+import subprocess
+import sys
+import tarfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import pytest
+from pytest_mock import MockFixture
 
 from example.mp4_data_converter.utils.ffmpeg_executor import FFMPEGExecutor
 from example.mp4_data_converter.utils.video_utils import retrieve_video_metadata_from_video_file
@@ -69,3 +74,139 @@ class TestFFMPEGExecutor:
         assert result == video_metadata
 
         assert math.isclose(result_bit_rate, original_bit_rate, rel_tol=0.4)
+
+    @pytest.mark.parametrize(
+        ("frame_timestamps", "keyframes", "frames_count", "segments"),
+        [
+            ([idx * 0.04 for idx in range(10)], [0, 4, 8], 10, [(0, 4, None), (4, 6, 0.14)]),
+            ([idx * 0.04 for idx in range(10)], [0, 4, 8], None, [(0, 4, None), (4, 6, 0.14)]),
+            ([idx * 0.04 for idx in range(10)], [0, 4, 8], 9, []),
+            ([idx * 0.04 for idx in range(10)], [0], 10, [(0, 10, None)]),
+            ([0.0, 0.04, 0.2, 0.24], [0, 2], 4, []),
+            ([0.0], [0], 1, []),
+        ],
+    )
+    def test_split_video(
+        self,
+        mocker: MockFixture,
+        frame_timestamps: List[float],
+        keyframes: List[int],
+        frames_count: Optional[int],
+        segments: List[Tuple[int, int, Optional[float]]],
+    ) -> None:
+        mocker.patch(
+            target="example.mp4_data_converter.utils.ffmpeg_executor.retrieve_frame_timestamps_from_video_file",
+            return_value=(frame_timestamps, keyframes),
+        )
+        mocker.patch(
+            target="example.mp4_data_converter.utils.ffmpeg_executor.retrieve_frames_count_from_video_file",
+            return_value=frames_count,
+        )
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format, parallel_segments=2)
+
+        result = ffmpeg_executor._split_video(file_path=Path("video.mp4"))
+
+        assert [(start, count) for start, count, _ in result] == [(start, count) for start, count, _ in segments]
+        for (_, _, seek_timestamp), (_, _, expected_seek_timestamp) in zip(result, segments):
+            assert seek_timestamp == pytest.approx(expected_seek_timestamp)
+
+    def test_extract_segments_raises(self, mocker: MockFixture, tmp_path: Path) -> None:
+        mocker.patch("example.mp4_data_converter.utils.ffmpeg_executor.FFMPEGExecutor._execute")
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format, parallel_segments=2)
+
+        with pytest.raises(ChildProcessError):
+            ffmpeg_executor._extract_segments(
+                file_path=Path("video.mp4"), output_directory=tmp_path, segments=[(0, 4, None), (4, 6, 0.14)]
+            )
+
+    @pytest.mark.parametrize(
+        ("missing_frames", "extra_frames", "raises"),
+        [([], [], False), ([7], [], True), ([], [11], True)],
+    )
+    def test_extract_segments_checks_the_frames(
+        self, mocker: MockFixture, tmp_path: Path, missing_frames: List[int], extra_frames: List[int], raises: bool
+    ) -> None:
+        # a stand-in for ffmpeg writing the frames of the segment but the missing ones
+        def execute(command: List[str]) -> None:
+            start_number = int(command[command.index("-start_number") + 1])
+            frames_count = int(command[command.index("-frames:v") + 1])
+            for frame_number in range(start_number, start_number + frames_count):
+                if frame_number not in missing_frames:
+                    (tmp_path / f"{frame_number:08d}.png").touch()
+
+        mocker.patch.object(FFMPEGExecutor, "_execute", side_effect=execute)
+        for frame_number in extra_frames:
+            (tmp_path / f"{frame_number:08d}.png").touch()
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format, parallel_segments=2)
+
+        with pytest.raises(ChildProcessError) if raises else contextlib.nullcontext():
+            ffmpeg_executor._extract_segments(
+                file_path=Path("video.mp4"), output_directory=tmp_path, segments=[(0, 4, None), (4, 6, 0.14)]
+            )
+
+    def test_extract_segments_rejects_segments_not_following_each_other(
+        self, mocker: MockFixture, tmp_path: Path
+    ) -> None:
+        mock_execute = mocker.patch.object(FFMPEGExecutor, "_execute")
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format, parallel_segments=2)
+
+        with pytest.raises(ChildProcessError):
+            ffmpeg_executor._extract_segments(
+                file_path=Path("video.mp4"), output_directory=tmp_path, segments=[(0, 4, None), (3, 6, 0.1)]
+            )
+
+        mock_execute.assert_not_called()
+
+    def test_create_video_from_segments(
+        self, mocker: MockFixture, video_metadata: Dict[str, Any], tmp_path: Path
+    ) -> None:
+        mock_execute = mocker.patch("example.mp4_data_converter.utils.ffmpeg_executor.FFMPEGExecutor._execute")
+        frames_directory = tmp_path / "frames"
+        frames_directory.mkdir()
+        for idx in range(1, 8):
+            (frames_directory / f"{idx:08d}.png").touch()
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format, parallel_segments=2)
+
+        ffmpeg_executor.create_video(
+            frames_directory=frames_directory, output_directory=tmp_path, video_metadata=video_metadata
+        )
+
+        commands = [call.kwargs["command"] for call in mock_execute.call_args_list]
+        segment_ranges = sorted(
+            (command[command.index("-start_number") + 1], command[command.index("-frames:v") + 1])
+            for command in commands[:-1]
+        )
+
+        assert segment_ranges == [("1", "3"), ("4", "4")]
+        assert commands[-1][:4] == ["-f", "concat", "-safe", "0"]
+        assert commands[-1][-2:] == [str(tmp_path / video_metadata["name"]), "-y"]
+
+    def test_create_video_from_frames_reaps_ffmpeg_on_failed_frames(
+        self, mocker: MockFixture, video_metadata: Dict[str, Any], tmp_path: Path
+    ) -> None:
+        # a stand-in for ffmpeg reading the frames until it is killed
+        process = subprocess.Popen(
+            args=[sys.executable, "-c", "import sys; sys.stdin.buffer.read()"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        mocker.patch.object(FFMPEGExecutor, "_start", return_value=process)
+
+        def frames() -> Iterator[bytes]:
+            yield b"frame"
+            raise tarfile.ReadError("unexpected end of data")
+
+        ffmpeg_executor = FFMPEGExecutor(file_name_format=self.file_name_format)
+
+        with pytest.raises(tarfile.ReadError):
+            ffmpeg_executor.create_video_from_frames(
+                frames=frames(), output_directory=tmp_path, video_metadata=video_metadata
+            )
+
+        assert process.returncode is not None
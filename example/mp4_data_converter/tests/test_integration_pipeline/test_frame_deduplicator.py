@@ -0,0 +1,85 @@
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from pytest_mock import MockFixture
+
+from example.mp4_data_converter.integration_pipeline.frame_deduplicator import FrameDeduplicator
+from example.mp4_data_converter.integration_pipeline.tar_extractor import TarExtractor
+from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError
+
+
+class TestFrameDeduplicator:
+    @staticmethod
+    def _write_frames(directory: Path, frames: Dict[str, bytes]) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, data in frames.items():
+            (directory / name).write_bytes(data)
+
+    def test_run(self, tmp_path: Path) -> None:
+        self._write_frames(
+            tmp_path / "frames",
+            {"00000001.png": b"a", "00000002.png": b"a", "00000003.png": b"b", "00000004.png": b"a"},
+        )
+
+        frame_deduplicator = FrameDeduplicator(settings={})
+
+        result = frame_deduplicator.run(
+            inputs={"directory_extracted_frames": tmp_path / "frames"},
+            outputs={"directory_unique_frames": tmp_path / "unique_frames"},
+        )
+
+        assert result == {
+            "directory_unique_frames": tmp_path / "unique_frames",
+            "frame_duplicates": {"00000002.png": "00000001.png", "00000004.png": "00000001.png"},
+        }
+        assert sorted(path.name for path in (tmp_path / "unique_frames").iterdir()) == ["00000001.png", "00000003.png"]
+
+    def test_run_perceptual(self, mocker: MockFixture, tmp_path: Path) -> None:
+        self._write_frames(
+            tmp_path / "frames",
+            {"00000001.png": b"a", "00000002.png": b"b", "00000003.png": b"c", "00000004.png": b"d"},
+        )
+        mocker.patch(
+            target="example.mp4_data_converter.integration_pipeline.frame_deduplicator.FFMPEGExecutor."
+            "create_thumbnails",
+            return_value=[bytes([10, 10]), bytes([12, 8]), bytes([14, 10]), bytes([13, 10])],
+        )
+
+        frame_deduplicator = FrameDeduplicator(settings={"perceptual_threshold": 2, "thumbnail_size": 2})
+
+        result = frame_deduplicator.run(
+            inputs={"directory_extracted_frames": tmp_path / "frames"},
+            outputs={"directory_unique_frames": tmp_path / "unique_frames"},
+        )
+
+        assert result["frame_duplicates"] == {"00000002.png": "00000001.png", "00000004.png": "00000003.png"}
+
+    def test_run_raises(self, tmp_path: Path) -> None:
+        frame_deduplicator = FrameDeduplicator(settings={})
+
+        with pytest.raises(PipelineElementError):
+            frame_deduplicator.run(
+                inputs={"directory_extracted_frames": tmp_path},
+                outputs={"directory_unique_frames": tmp_path / "unique_frames"},
+            )
+
+    def test_restore_duplicates(self, tmp_path: Path) -> None:
+        self._write_frames(tmp_path, {"00000001.png": b"anonymized"})
+
+        result = TarExtractor._restore_duplicates(
+            frame_duplicates={"00000002.png": "00000001.png"}, output_directory=tmp_path
+        )
+
+        assert result == [tmp_path / "00000002.png"]
+        assert (tmp_path / "00000002.png").read_bytes() == b"anonymized"
+
+        # the restored duplicate is not linked to its original, so editing it leaves the original as it is
+        assert not (tmp_path / "00000002.png").samefile(tmp_path / "00000001.png")
+        (tmp_path / "00000002.png").write_bytes(b"edited")
+        assert (tmp_path / "00000001.png").read_bytes() == b"anonymized"
+
+        with pytest.raises(PipelineElementError):
+            TarExtractor._restore_duplicates(
+                frame_duplicates={"00000003.png": "00000004.png"}, output_directory=tmp_path
+            )
@@ -0,0 +1,95 @@
+import io
+import struct
+import zlib
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from example.mp4_data_converter.utils.frame_format import PNG_SIGNATURE, FrameFormat
+
+
+class TestFrameFormat:
+    @staticmethod
+    def _png_image(data: bytes) -> bytes:
+        chunks = b""
+        for chunk_type, chunk_data in ((b"IHDR", data), (b"IEND", b"")):
+            chunk = struct.pack(">I4s", len(chunk_data), chunk_type) + chunk_data
+            chunks += chunk + struct.pack(">I", zlib.crc32(chunk[4:]))
+
+        return PNG_SIGNATURE + chunks
+
+    @staticmethod
+    def _jpeg_image(scan_data: bytes) -> bytes:
+        quantization_table = b"\x00" + bytes(range(64))
+        scan_header = b"\x01\x01\x00\x00\x3f\x00"
+        return (
+            b"\xff\xd8"
+            + b"\xff\xdb"
+            + struct.pack(">H", len(quantization_table) + 2)
+            + quantization_table
+            + b"\xff\xda"
+            + struct.pack(">H", len(scan_header) + 2)
+            + scan_header
+            + scan_data
+            + b"\xff\xd9"
+        )
+
+    @pytest.mark.parametrize(
+        ("settings", "extension", "encoder_options"),
+        [
+            (None, "png", []),
+            ({"frame_format": "png"}, "png", []),
+            ({"frame_format": "png:1"}, "png", ["-compression_level", "1"]),
+            ({"frame_format": "jpg"}, "jpg", ["-q:v", "2"]),
+            ({"frame_format": "jpg:5"}, "jpg", ["-q:v", "5"]),
+        ],
+    )
+    def test_from_settings(
+        self, settings: Optional[Dict[str, Any]], extension: str, encoder_options: List[str]
+    ) -> None:
+        frame_format = FrameFormat.from_settings(settings=settings)
+
+        assert frame_format.extension == extension
+        assert frame_format.encoder_options == encoder_options
+
+    @pytest.mark.parametrize("frame_format", ["bmp", "png:10", "png:fast", "jpg:1"])
+    def test_from_settings_raises(self, frame_format: str) -> None:
+        with pytest.raises(ValueError):
+            FrameFormat.from_settings(settings={"frame_format": frame_format})
+
+    def test_read_png_images(self) -> None:
+        images = [self._png_image(b"first"), self._png_image(b"IEND in the data"), self._png_image(b"")]
+
+        result = list(FrameFormat(extension="png").read_images(stream=io.BytesIO(b"".join(images))))
+
+        assert result == images
+
+    def test_read_png_images_raises(self) -> None:
+        image = self._png_image(b"first")
+
+        with pytest.raises(ChildProcessError):
+            list(FrameFormat(extension="png").read_images(stream=io.BytesIO(image[:-6])))
+
+        with pytest.raises(ChildProcessError):
+            list(FrameFormat(extension="png").read_images(stream=io.BytesIO(b"not a png image")))
+
+    def test_read_jpeg_images(self) -> None:
+        images = [
+            self._jpeg_image(b"\x12\x34"),
+            self._jpeg_image(b"\xff\x00\xff\xd0\x56"),
+            self._jpeg_image(b""),
+        ]
+        jpeg_format = FrameFormat(extension="jpg")
+
+        result = list(jpeg_format.read_images(stream=io.BufferedReader(io.BytesIO(b"".join(images)), buffer_size=3)))
+
+        assert result == images
+
+    def test_read_jpeg_images_raises(self) -> None:
+        image = self._jpeg_image(b"\x12\x34")
+
+        with pytest.raises(ChildProcessError):
+            list(FrameFormat(extension="jpg").read_images(stream=io.BytesIO(image[:-1])))
+
+        with pytest.raises(ChildProcessError):
+            list(FrameFormat(extension="jpg").read_images(stream=io.BytesIO(b"not a jpeg image")))
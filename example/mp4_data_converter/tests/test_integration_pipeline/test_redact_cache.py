@@ -0,0 +1,86 @@
+import io
+import os
+import tarfile
+from pathlib import Path
+from typing import Dict
+
+from example.mp4_data_converter.utils.redact_cache import RedactCache
+
+
+class TestRedactCache:
+    redaction_settings = {"region": "germany", "face": True, "face_determination_threshold": None}
+
+    @staticmethod
+    def _archive(tar_file: Path, files: Dict[str, bytes], mtime: int = 0) -> Path:
+        with tarfile.open(tar_file, "w") as archive:
+            for name, data in files.items():
+                file_info = tarfile.TarInfo(name=name)
+                file_info.size = len(data)
+                file_info.mtime = mtime
+                archive.addfile(tarinfo=file_info, fileobj=io.BytesIO(data))
+
+        return tar_file
+
+    def test_get_key(self, tmp_path: Path) -> None:
+        tar_file = self._archive(tmp_path / "1.tar", {"00000001.png": b"1", "00000002.png": b"2"})
+        repacked_tar_file = self._archive(tmp_path / "2.tar", {"00000002.png": b"2", "00000001.png": b"1"}, mtime=1)
+        other_tar_file = self._archive(tmp_path / "3.tar", {"00000001.png": b"1", "00000002.png": b"3"})
+
+        key = RedactCache.get_key(tar_file=tar_file, redaction_settings=self.redaction_settings)
+
+        assert key == RedactCache.get_key(tar_file=repacked_tar_file, redaction_settings=self.redaction_settings)
+        assert key != RedactCache.get_key(tar_file=other_tar_file, redaction_settings=self.redaction_settings)
+        assert key != RedactCache.get_key(
+            tar_file=tar_file, redaction_settings={**self.redaction_settings, "face_determination_threshold": 0.5}
+        )
+
+    def test_get(self, tmp_path: Path) -> None:
+        redact_cache = RedactCache(directory=tmp_path / "cache", max_size_bytes=2**20)
+        anonymized_tar_file = self._archive(tmp_path / "anonymized.tar", {"00000001.png": b"anonymized"})
+        destination = tmp_path / "output" / "1.tar"
+        destination.parent.mkdir()
+
+        assert not redact_cache.get(key="key", destination=destination)
+
+        redact_cache.put(key="key", source=anonymized_tar_file)
+
+        assert redact_cache.get(key="key", destination=destination)
+        assert destination.read_bytes() == anonymized_tar_file.read_bytes()
+
+    def test_get_does_not_share_the_cache_entry(self, tmp_path: Path) -> None:
+        redact_cache = RedactCache(directory=tmp_path / "cache", max_size_bytes=2**20)
+        anonymized_tar_file = self._archive(tmp_path / "anonymized.tar", {"00000001.png": b"anonymized"})
+        destination = tmp_path / "1.tar"
+        redact_cache.put(key="key", source=anonymized_tar_file)
+
+        assert redact_cache.get(key="key", destination=destination)
+
+        # e.g. a later download of the anonymized archive to the same path
+        with destination.open("wb") as f:
+            f.write(b"rewritten")
+
+        assert redact_cache.get(key="key", destination=tmp_path / "2.tar")
+        assert (tmp_path / "2.tar").read_bytes() == anonymized_tar_file.read_bytes()
+
+    def test_put_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        anonymized_tar_file = self._archive(tmp_path / "anonymized.tar", {"00000001.png": b"anonymized"})
+        entry_size = anonymized_tar_file.stat().st_size
+        redact_cache = RedactCache(directory=tmp_path / "cache", max_size_bytes=2 * entry_size)
+
+        for mtime, key in enumerate(("first", "second")):
+            redact_cache.put(key=key, source=anonymized_tar_file)
+            os.utime(tmp_path / "cache" / f"{key}.tar", times=(mtime, mtime))
+
+        assert redact_cache.get(key="first", destination=tmp_path / "first.tar")
+
+        redact_cache.put(key="third", source=anonymized_tar_file)
+
+        assert sorted(entry.name for entry in (tmp_path / "cache").iterdir()) == ["first.tar", "third.tar"]
+
+    def test_put_skips_files_larger_than_cache(self, tmp_path: Path) -> None:
+        anonymized_tar_file = self._archive(tmp_path / "anonymized.tar", {"00000001.png": b"anonymized"})
+        redact_cache = RedactCache(directory=tmp_path / "cache", max_size_bytes=1)
+
+        redact_cache.put(key="key", source=anonymized_tar_file)
+
+        assert list((tmp_path / "cache").iterdir()) == []
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from example.mp4_data_converter.utils.redact_job_tracker import RedactJobTracker
+from example.mp4_data_converter.utils.redact_throughput import RedactThroughput
+from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+
+
+class Status:
+    def __init__(self, state: str) -> None:
+        self.state = state
+
+
+class Job:
+    def __init__(self, states: List[str]) -> None:
+        # the job answers the status requests with the states in turn and keeps the last one
+        self._states = states
+        self.status_requests = 0
+
+    def get_status(self) -> Status:
+        state = self._states[min(self.status_requests, len(self._states) - 1)]
+        self.status_requests += 1
+        if isinstance(state, Exception):
+            raise state
+
+        return Status(state=state)
+
+
+class TestRedactJobTracker:
+    def test_wait(self) -> None:
+        jobs = [Job(states=["pending"] * idx + ["active", "completed"]) for idx in range(8)]
+
+        with RedactJobTracker(
+            finished_states=("completed", "failed"),
+            min_poll_interval=0.01,
+            max_poll_interval=0.02,
+            max_status_requests_per_second=1000,
+        ) as job_tracker, ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            statuses = list(executor.map(lambda job: job_tracker.wait(job=job, upload_bytes=2**20), jobs))
+
+        assert [status.state for status in statuses] == ["completed"] * len(jobs)
+        assert [job.status_requests for job in jobs] == [idx + 2 for idx in range(8)]
+
+    def test_wait_polls_close_to_the_expected_end(self, tmp_path: Path) -> None:
+        # the recorded jobs take 0.2s, so the job is polled after 0.1s, 0.15s, 0.175s, 0.195s and then backs off
+        redact_throughput = RedactThroughput(stats_file=tmp_path / "redact_stats.json")
+        for _ in range(3):
+            redact_throughput.record_job(upload_bytes=2**20, duration_seconds=0.2)
+        job = Job(states=["active"] * 4 + ["completed"])
+
+        with RedactJobTracker(
+            finished_states=("completed", "failed"),
+            min_poll_interval=0.02,
+            max_poll_interval=0.05,
+            max_status_requests_per_second=1000,
+            redact_throughput=redact_throughput,
+        ) as job_tracker:
+            started_at = time.monotonic()
+            status = job_tracker.wait(job=job, upload_bytes=2**20)
+
+        assert status.state == "completed"
+        assert job.status_requests == 5
+        assert time.monotonic() - started_at == pytest.approx(0.215, abs=0.05)
+
+    def test_wait_limits_the_status_requests(self) -> None:
+        jobs = [Job(states=["active"] * 3 + ["completed"]) for _ in range(4)]
+
+        with RedactJobTracker(
+            finished_states=("completed", "failed"), min_poll_interval=0.01, max_status_requests_per_second=100
+        ) as job_tracker, ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            started_at = time.monotonic()
+            list(executor.map(lambda job: job_tracker.wait(job=job, upload_bytes=2**20), jobs))
+
+        # 16 status requests at most 100 a second
+        assert time.monotonic() - started_at >= 0.15
+
+    def test_wait_times_out(self) -> None:
+        job = Job(states=["active"])
+
+        with RedactJobTracker(
+            finished_states=("completed", "failed"), min_poll_interval=0.01, max_poll_interval=0.02, job_timeout=0.1
+        ) as job_tracker:
+            with pytest.raises(TimeoutError):
+                job_tracker.wait(job=job, upload_bytes=2**20)
+
+    def test_wait_tolerates_status_errors(self) -> None:
+        job = Job(states=[ConnectionError("reset"), ConnectionError("reset"), "completed"])
+
+        with RedactJobTracker(finished_states=("completed", "failed"), min_poll_interval=0.01) as job_tracker:
+            assert job_tracker.wait(job=job, upload_bytes=2**20).state == "completed"
+
+        job = Job(states=[ConnectionError("reset")])
+
+        with RedactJobTracker(finished_states=("completed", "failed"), min_poll_interval=0.01) as job_tracker:
+            with pytest.raises(PipelineElementError) as error:
+                job_tracker.wait(job=job, upload_bytes=2**20)
+
+        assert error.value.severity == Severity.major
+        assert job.status_requests == 3
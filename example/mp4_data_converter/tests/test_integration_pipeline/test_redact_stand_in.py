@@ -0,0 +1,85 @@
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import httpx
+import pytest
+
+from example.mp4_data_converter.benchmarks.redact_stand_in import RedactStandIn, RedactStandInServer
+
+
+class TestRedactStandIn:
+    @pytest.fixture
+    def start_server(self, tmp_path: Path) -> Iterator[Callable]:
+        servers = []
+
+        def _start_server(**kwargs) -> str:
+            server = RedactStandInServer(
+                ("127.0.0.1", 0), redact_stand_in=RedactStandIn(directory=tmp_path / "jobs", seed=0, **kwargs)
+            )
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            servers.append(server)
+
+            return f"http://127.0.0.1:{server.server_port}"
+
+        yield _start_server
+
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+    @staticmethod
+    def _wait_until_finished(client: httpx.Client, job_url: str) -> dict:
+        while (status := client.get(f"{job_url}/status").json())["state"] in ("pending", "active"):
+            time.sleep(0.01)
+
+        return status
+
+    def test_job(self, start_server: Callable) -> None:
+        redact_url = start_server(latency_per_mb=0.01)
+
+        with httpx.Client() as client:
+            assert client.get(f"{redact_url}/v4/health").json() == {"status": "operational"}
+
+            response = client.post(
+                f"{redact_url}/v4/blur/archives", params={"face": True}, files={"file": ("1.tar", b"archive")}
+            )
+            job_url = f"{redact_url}/v4/blur/archives/{response.json()['output_id']}"
+
+            assert self._wait_until_finished(client=client, job_url=job_url)["state"] == "completed"
+            assert client.get(job_url).content == b"archive"
+            assert client.delete(job_url).status_code == 200
+            assert client.get(f"{job_url}/status").status_code == 404
+
+    def test_failed_job(self, start_server: Callable) -> None:
+        redact_url = start_server(failure_rate=1.0)
+
+        with httpx.Client() as client:
+            response = client.post(f"{redact_url}/v4/blur/archives", files={"file": ("1.tar", b"archive")})
+            job_url = f"{redact_url}/v4/blur/archives/{response.json()['output_id']}"
+            status = self._wait_until_finished(client=client, job_url=job_url)
+
+            assert status["state"] == "failed"
+            assert status["error"]
+            assert client.get(job_url).status_code == 422
+
+    def test_full_queue(self, start_server: Callable) -> None:
+        redact_url = start_server(max_queued_jobs=1, stall_rate=1.0)
+
+        with httpx.Client() as client:
+            status_codes = []
+            for _ in range(3):
+                response = client.post(f"{redact_url}/v4/blur/archives", files={"file": ("1.tar", b"archive")})
+                status_codes.append(response.status_code)
+                # the first job stalls the only worker, the second one waits in the queue
+                time.sleep(0.05)
+
+            assert status_codes == [200, 200, 429]
+
+    def test_injected_errors(self, start_server: Callable) -> None:
+        redact_url = start_server(error_rate=1.0)
+
+        with httpx.Client() as client:
+            assert client.get(f"{redact_url}/v4/health").status_code == 200
+            assert client.post(f"{redact_url}/v4/blur/archives", files={"file": ("1.tar", b"a")}).status_code == 500
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockFixture
+
+from example.mp4_data_converter.utils import redact_throughput
+from example.mp4_data_converter.utils.redact_throughput import RedactThroughput
+
+
+class TestRedactThroughput:
+    def test_record_job(self, mocker: MockFixture, tmp_path: Path) -> None:
+        mocker.patch.object(redact_throughput, "MAX_JOBS", 3)
+        throughput = RedactThroughput(stats_file=tmp_path / "stats" / "redact_stats.json")
+
+        for idx in range(1, 5):
+            throughput.record_job(upload_bytes=idx * 100, duration_seconds=idx)
+
+        assert throughput.get_jobs() == [(200, 2.0), (300, 3.0), (400, 4.0)]
+        assert json.loads((tmp_path / "stats" / "redact_stats.json").read_text()) == {
+            "jobs": [[200, 2.0], [300, 3.0], [400, 4.0]]
+        }
+
+    def test_estimate(self, tmp_path: Path) -> None:
+        throughput = RedactThroughput(stats_file=tmp_path / "redact_stats.json")
+        for upload_bytes in (2**20, 2**21, 2**22, 2**23):
+            throughput.record_job(upload_bytes=upload_bytes, duration_seconds=5 + upload_bytes / 2**20)
+
+        overhead_seconds, bytes_per_second = throughput.estimate()
+
+        assert overhead_seconds == pytest.approx(5)
+        assert bytes_per_second == pytest.approx(2**20)
+
+    def test_estimate_without_jobs_of_different_sizes(self, tmp_path: Path) -> None:
+        throughput = RedactThroughput(stats_file=tmp_path / "redact_stats.json")
+        assert throughput.estimate() is None
+
+        for _ in range(5):
+            throughput.record_job(upload_bytes=2**20, duration_seconds=3)
+
+        assert throughput.estimate() is None
+
+    def test_get_target_size(self) -> None:
+        # 5s of overhead at 1 MB/s takes at most 10% of a job from 45 MB, which is rounded to 32 MB
+        assert (
+            RedactThroughput.get_target_size(
+                overhead_seconds=5, bytes_per_second=2**20, overhead_share=0.1, min_bytes=2**20, max_bytes=2**30
+            )
+            == 2**25
+        )
+        assert (
+            RedactThroughput.get_target_size(
+                overhead_seconds=5, bytes_per_second=2**20, overhead_share=0.1, min_bytes=2**20, max_bytes=2**24
+            )
+            == 2**24
+        )
+        assert (
+            RedactThroughput.get_target_size(
+                overhead_seconds=0, bytes_per_second=2**20, overhead_share=0.1, min_bytes=2**20, max_bytes=2**30
+            )
+            == 2**20
+        )
@@ -0,0 +1,231 @@
+import io
+import tarfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+
+import pytest
+from pytest_mock import MockFixture
+
+pytest.importorskip("redact.v4")
+
+from redact.v4 import JobState  # noqa: E402
+
+from example.mp4_data_converter.integration_pipeline import redactor  # noqa: E402
+from example.mp4_data_converter.integration_pipeline.redactor import Redactor  # noqa: E402
+from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity  # noqa: E402
+
+
+class Status:
+    def __init__(self, state: JobState) -> None:
+        self.state = state
+        self.error = "the archive is broken" if state == JobState.failed else None
+
+
+class Job:
+    def __init__(self, data: bytes, state: JobState, status_error: Optional[Exception] = None) -> None:
+        self._data = data
+        self._state = state
+        self._status_error = status_error
+
+    def get_status(self) -> Status:
+        if self._status_error is not None:
+            raise self._status_error
+
+        return Status(state=self._state)
+
+    def download_result_to_file(self, file: Union[Path, BinaryIO]) -> None:
+        if isinstance(file, Path):
+            file.write_bytes(self._data)
+        else:
+            file.write(self._data)
+
+
+class RedactService:
+    # returns the uploaded archives as the anonymized ones, fails the jobs of the failing archives, cancels the jobs of
+    # the cancelled archives and fails the status requests of the jobs of the unreachable archives
+    def __init__(
+        self,
+        failing_archives: List[str] = (),
+        cancelled_archives: List[str] = (),
+        unreachable_archives: List[str] = (),
+    ) -> None:
+        self.failing_archives = failing_archives
+        self.cancelled_archives = cancelled_archives
+        self.unreachable_archives = unreachable_archives
+        self.started_archives = []
+        self.max_running_uploads = 0
+        self._running_uploads = 0
+        self._lock = threading.Lock()
+
+    def start_job(self, file: BinaryIO, job_args: Any) -> Job:
+        with self._lock:
+            self._running_uploads += 1
+            self.max_running_uploads = max(self.max_running_uploads, self._running_uploads)
+            self.started_archives.append(Path(file.name).name)
+
+        time.sleep(0.05)
+        state = JobState.completed
+        if Path(file.name).name in self.failing_archives:
+            state = JobState.failed
+        elif Path(file.name).name in self.cancelled_archives:
+            state = JobState.cancelled
+
+        with self._lock:
+            self._running_uploads -= 1
+
+        status_error = None
+        if Path(file.name).name in self.unreachable_archives:
+            status_error = ConnectionError("the connection was reset")
+
+        return Job(data=file.read(), state=state, status_error=status_error)
+
+
+class TestRedactor:
+    @staticmethod
+    def _get_settings(**settings: Any) -> Dict[str, Any]:
+        return {
+            "redact_url": "http://redact:8787",
+            "face_determination_threshold": None,
+            "lp_determination_threshold": None,
+            "min_poll_interval": 0.01,
+            **settings,
+        }
+
+    @staticmethod
+    def _archive(tar_file: Path, frames: Dict[str, bytes]) -> Path:
+        tar_file.parent.mkdir(parents=True, exist_ok=True)
+        with tarfile.open(tar_file, "w") as archive:
+            for name, data in frames.items():
+                frame_info = tarfile.TarInfo(name=name)
+                frame_info.size = len(data)
+                archive.addfile(tarinfo=frame_info, fileobj=io.BytesIO(data))
+
+        return tar_file
+
+    @pytest.fixture
+    def redact_service(self, mocker: MockFixture) -> RedactService:
+        redact_service = RedactService()
+        mocker.patch.object(redactor, "RedactInstance").create.return_value = redact_service
+
+        return redact_service
+
+    def test_run(self, redact_service: RedactService, tmp_path: Path) -> None:
+        tar_files = [
+            self._archive(tmp_path / "tar_files" / f"{idx:08d}.tar", {f"{idx:08d}.png": bytes([idx])})
+            for idx in range(1, 9)
+        ]
+        redactor_element = Redactor(settings=self._get_settings(max_concurrent_jobs=3))
+
+        outputs = redactor_element.run(
+            inputs={"tar_files_directory": tmp_path / "tar_files"},
+            outputs={"anonymized_tar_files_directory": tmp_path / "anonymized"},
+        )
+
+        assert outputs == {"anonymized_tar_files_directory": tmp_path / "anonymized"}
+        assert redact_service.max_running_uploads == 3
+        assert sorted(redact_service.started_archives) == [tar_file.name for tar_file in tar_files]
+        assert all(
+            (tmp_path / "anonymized" / tar_file.name).read_bytes() == tar_file.read_bytes() for tar_file in tar_files
+        )
+
+    def test_run_failing_archive_cancels_the_jobs_not_submitted(
+        self, redact_service: RedactService, tmp_path: Path
+    ) -> None:
+        for idx in range(1, 5):
+            self._archive(tmp_path / "tar_files" / f"{idx:08d}.tar", {f"{idx:08d}.png": bytes([idx])})
+        redact_service.failing_archives = ["00000001.tar"]
+        redactor_element = Redactor(settings=self._get_settings(max_concurrent_jobs=1))
+
+        with pytest.raises(PipelineElementError) as error:
+            redactor_element.run(
+                inputs={"tar_files_directory": tmp_path / "tar_files"},
+                outputs={"anonymized_tar_files_directory": tmp_path / "anonymized"},
+            )
+
+        # the failed archive is retried, while the archives after it are never submitted
+        assert error.value.severity == Severity.major
+        assert redact_service.started_archives == ["00000001.tar"] * redactor.Settings().redaction_retry
+
+    def test_run_retries_the_archive_whose_status_fails(self, redact_service: RedactService, tmp_path: Path) -> None:
+        self._archive(tmp_path / "tar_files" / "00000001.tar", {"00000001.png": b"1"})
+        redact_service.unreachable_archives = ["00000001.tar"]
+        redactor_element = Redactor(settings=self._get_settings())
+
+        with pytest.raises(PipelineElementError) as error:
+            redactor_element.run(
+                inputs={"tar_files_directory": tmp_path / "tar_files"},
+                outputs={"anonymized_tar_files_directory": tmp_path / "anonymized"},
+            )
+
+        assert error.value.severity == Severity.major
+        assert redact_service.started_archives == ["00000001.tar"] * redactor.Settings().redaction_retry
+
+    def test_run_fails_the_cancelled_archive(self, redact_service: RedactService, tmp_path: Path) -> None:
+        self._archive(tmp_path / "tar_files" / "00000001.tar", {"00000001.png": b"1"})
+        redact_service.cancelled_archives = ["00000001.tar"]
+        redactor_element = Redactor(settings=self._get_settings())
+
+        with pytest.raises(PipelineElementError) as error:
+            redactor_element.run(
+                inputs={"tar_files_directory": tmp_path / "tar_files"},
+                outputs={"anonymized_tar_files_directory": tmp_path / "anonymized"},
+            )
+
+        assert error.value.severity == Severity.major
+        assert redact_service.started_archives == ["00000001.tar"] * redactor.Settings().redaction_retry
+
+    def test_cleanup_keeps_the_client_until_close(self, redact_service: RedactService, tmp_path: Path) -> None:
+        self._archive(tmp_path / "tar_files" / "00000001.tar", {"00000001.png": b"1"})
+        redactor_element = Redactor(settings=self._get_settings())
+        outputs = {"anonymized_tar_files_directory": tmp_path / "anonymized"}
+        redactor_element.run(inputs={"tar_files_directory": tmp_path / "tar_files"}, outputs=outputs)
+        httpx_client = redactor_element._httpx_client
+
+        redactor_element.cleanup(outputs=outputs)
+
+        # the next run of a reused element keeps the connections of the previous one
+        assert not httpx_client.is_closed
+        assert not (tmp_path / "anonymized").exists()
+
+        redactor_element.run(inputs={"tar_files_directory": tmp_path / "tar_files"}, outputs=outputs)
+
+        assert redactor_element._httpx_client is httpx_client
+
+        redactor_element.close()
+
+        assert httpx_client.is_closed
+
+    def test_run_with_piped_extraction(self, redact_service: RedactService, tmp_path: Path) -> None:
+        tar_files = [
+            self._archive(tmp_path / "tar_files" / f"{idx:08d}.tar", {f"{idx:08d}.jpg": bytes([idx]), "info.txt": b""})
+            for idx in (1, 2)
+        ]
+        settings = self._get_settings(
+            piped_extraction=True, cache_directory=str(tmp_path / "cache"), frame_format="jpg:2"
+        )
+
+        # the first run anonymizes the archives and caches them, the second one extracts them from the cache
+        for run in ("first", "second"):
+            (tmp_path / run).mkdir()
+            frames = Redactor(settings=settings)._anonymize(tar_files=tar_files, output_directory=tmp_path / run)
+
+            assert sorted(frame for tar_frames in frames for frame in tar_frames) == [
+                tmp_path / run / "00000001.jpg",
+                tmp_path / run / "00000002.jpg",
+            ]
+
+        assert sorted(redact_service.started_archives) == ["00000001.tar", "00000002.tar"]
+        assert not list((tmp_path / "second").glob("*.tar"))
+
+        outputs = Redactor(settings=settings).run(
+            inputs={
+                "tar_files_directory": tmp_path / "tar_files",
+                "frame_duplicates": {"00000003.jpg": "00000001.jpg"},
+            },
+            outputs={"directory_anonymized_frames": tmp_path / "third"},
+        )
+
+        assert outputs == {"directory_anonymized_frames": tmp_path / "third"}
+        assert (tmp_path / "third" / "00000003.jpg").read_bytes() == bytes([1])
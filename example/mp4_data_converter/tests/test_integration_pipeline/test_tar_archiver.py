@@ -0,0 +1,81 @@
+import tarfile
+from pathlib import Path
+from typing import List
+
+from pytest_mock import MockFixture
+
+from example.mp4_data_converter.integration_pipeline.tar_archiver import TarArchiver
+from example.mp4_data_converter.utils.redact_throughput import RedactThroughput
+
+
+class TestTarArchiver:
+    @staticmethod
+    def _get_archived_frames(tar_files_directory: Path) -> List[List[str]]:
+        archived_frames = []
+        for tar_file in sorted(tar_files_directory.glob("*.tar")):
+            with tarfile.open(tar_file, "r") as archive:
+                archived_frames.append(archive.getnames())
+
+        return archived_frames
+
+    def test_run_by_size(self, tmp_path: Path) -> None:
+        (tmp_path / "frames").mkdir()
+        for idx, size in enumerate([300, 300, 900, 5000, 100, 100, 100], start=1):
+            (tmp_path / "frames" / f"{idx:08d}.png").write_bytes(b"0" * size)
+
+        # every frame takes a header block and its data blocks, so 2 KiB holds up to 2 frames of up to 512 bytes
+        tar_archiver = TarArchiver(settings={"number_of_files_in_tar": 3, "tar_size_mb": 2 / 1024})
+        tar_archiver.run(
+            inputs={"directory_extracted_frames": tmp_path / "frames"},
+            outputs={"tar_files_directory": tmp_path / "tar_files"},
+        )
+
+        assert self._get_archived_frames(tmp_path / "tar_files") == [
+            ["00000001.png", "00000002.png"],
+            ["00000003.png"],
+            ["00000004.png"],
+            ["00000005.png", "00000006.png"],
+            ["00000007.png"],
+        ]
+
+    def test_run_adaptive(self, tmp_path: Path) -> None:
+        (tmp_path / "frames").mkdir()
+        for idx in range(1, 11):
+            (tmp_path / "frames" / f"{idx:08d}.png").write_bytes(b"0" * 2**19)
+
+        redact_stats_file = tmp_path / "redact_stats.json"
+        for upload_bytes in (2**20, 2**21, 2**22):
+            RedactThroughput(stats_file=redact_stats_file).record_job(
+                upload_bytes=upload_bytes, duration_seconds=0.25 + upload_bytes / 2**22
+            )
+
+        # 0.25s of overhead at 4 MB/s takes at most 10% of a job from 9 MB, which is rounded to 8 MB
+        settings = {"number_of_files_in_tar": None, "adaptive_tar_size": True, "redact_stats_file": redact_stats_file}
+        TarArchiver(settings=settings).run(
+            inputs={"directory_extracted_frames": tmp_path / "frames"},
+            outputs={"tar_files_directory": tmp_path / "tar_files"},
+        )
+
+        assert [len(frames) for frames in self._get_archived_frames(tmp_path / "tar_files")] == [10]
+        assert (tmp_path / "tar_files" / ".tar_size").read_text() == str(2**23)
+
+    def test_run_adaptive_keeps_size_of_interrupted_run(self, mocker: MockFixture, tmp_path: Path) -> None:
+        (tmp_path / "frames").mkdir()
+        for idx in range(1, 5):
+            (tmp_path / "frames" / f"{idx:08d}.png").write_bytes(b"0" * 1000)
+        (tmp_path / "tar_files").mkdir()
+        (tmp_path / "tar_files" / ".tar_size").write_text("2048")
+
+        settings = {
+            "number_of_files_in_tar": None,
+            "adaptive_tar_size": True,
+            "redact_stats_file": tmp_path / "redact_stats.json",
+        }
+        tar_archiver = TarArchiver(settings=settings)
+        tar_archiver.attach_work_units(work_units=mocker.Mock(**{"is_finished.return_value": True}))
+        tar_archiver.run(
+            inputs={"directory_extracted_frames": tmp_path / "frames"},
+            outputs={"tar_files_directory": tmp_path / "tar_files"},
+        )
+
+        assert [len(frames) for frames in self._get_archived_frames(tmp_path / "tar_files")] == [1, 1, 1, 1]
@@ -0,0 +1,200 @@
+import errno
+import io
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Dict
+
+import pytest
+from pytest_mock import MockFixture
+
+from example.mp4_data_converter.utils import tar_executor
+from example.mp4_data_converter.utils.tar_executor import TarExecutor
+from src.utils import tracing
+from src.utils.tracing import Tracer
+
+
+class TestTarExecutor:
+    @staticmethod
+    def _archive(tar_file: Path, files: Dict[str, bytes]) -> Path:
+        with tarfile.open(tar_file, "w") as archive:
+            for name, data in files.items():
+                file_info = tarfile.TarInfo(name=name)
+                file_info.size = len(data)
+                archive.addfile(tarinfo=file_info, fileobj=io.BytesIO(data))
+
+        return tar_file
+
+    def test_extract_files(self, tmp_path: Path) -> None:
+        archives_paths = [
+            self._archive(tmp_path / f"{idx:08d}.tar", {f"{idx:08d}.png": bytes([idx]) * 10, f"{idx:08d}.txt": b"-"})
+            for idx in range(1, 9)
+        ]
+        output_directory = tmp_path / "frames"
+        output_directory.mkdir()
+
+        frames = TarExecutor().extract_files(
+            archives_paths=archives_paths, out_directory_path=output_directory, workers=4
+        )
+
+        assert frames == [output_directory / f"{idx:08d}.png" for idx in range(1, 9)]
+        assert all(frame.read_bytes() == bytes([idx]) * 10 for idx, frame in enumerate(frames, start=1))
+
+    def test_extract_stream(self, tmp_path: Path) -> None:
+        files = {f"{idx:08d}.png": bytes([idx]) * 2**16 for idx in range(1, 5)}
+        tar_file = self._archive(tmp_path / "00000001.tar", files)
+        output_directory = tmp_path / "frames"
+        output_directory.mkdir()
+
+        def write_archive(archive: BinaryIO) -> None:
+            with tar_file.open("rb") as f:
+                while chunk := f.read(1000):
+                    archive.write(chunk)
+
+        frames = TarExecutor().extract_stream(
+            write_archive=write_archive,
+            out_directory_path=output_directory,
+            archive_copy_path=tmp_path / "copy.tar",
+        )
+
+        assert frames == [output_directory / name for name in files]
+        assert all((output_directory / name).read_bytes() == data for name, data in files.items())
+        assert (tmp_path / "copy.tar").read_bytes() == tar_file.read_bytes()
+
+    def test_extract_stream_broken_archive_raises(self, tmp_path: Path) -> None:
+        def write_archive(archive: BinaryIO) -> None:
+            for _ in range(100):
+                archive.write(b"not a tar archive" * 1000)
+
+        with pytest.raises(tarfile.ReadError):
+            TarExecutor().extract_stream(write_archive=write_archive, out_directory_path=tmp_path)
+
+    def test_extract_stream_failed_write_raises(self, tmp_path: Path) -> None:
+        tar_file = self._archive(tmp_path / "00000001.tar", {"00000001.png": b"1" * 2**16})
+
+        def write_archive(archive: BinaryIO) -> None:
+            archive.write(tar_file.read_bytes()[:1000])
+            raise ConnectionError("the download was interrupted")
+
+        with pytest.raises(ConnectionError):
+            TarExecutor().extract_stream(write_archive=write_archive, out_directory_path=tmp_path / "frames")
+
+    def test_archive_segment(self, tmp_path: Path) -> None:
+        frames_paths = []
+        for idx, size in enumerate([0, 1, 511, 512, 513, 100000], start=1):
+            frame_path = tmp_path / f"{idx:08d}.png"
+            frame_path.write_bytes(bytes([idx]) * size)
+            frames_paths.append(frame_path)
+        frames_paths.append(tmp_path / f"{'0' * 100}.png")
+        frames_paths[-1].write_bytes(b"long name")
+        (tmp_path / "archives").mkdir()
+
+        tar_file = TarExecutor.archive_segment(
+            images_paths=frames_paths, out_directory_path=tmp_path / "archives", segment_idx=1
+        )
+
+        # the archive is the one tarfile adds the frames to, but for the fractional modification times, which tarfile
+        # keeps in pax headers, while the ustar headers hold whole seconds
+        expected_tar_file = tmp_path / "expected.tar"
+        with tarfile.open(expected_tar_file, "w") as archive:
+            for frame_path in frames_paths:
+                frame_info = archive.gettarinfo(name=frame_path, arcname=frame_path.name)
+                frame_info.mtime = int(frame_info.mtime)
+                with frame_path.open("rb") as f:
+                    archive.addfile(tarinfo=frame_info, fileobj=f)
+
+        assert tar_file == tmp_path / "archives" / "00000001.tar"
+        assert tar_file.read_bytes() == expected_tar_file.read_bytes()
+
+    def test_archive_segment_writes_the_headers_of_tarfile(self, tmp_path: Path) -> None:
+        frame_path = tmp_path / "00000001.png"
+        frame_path.write_bytes(b"frame")
+
+        tar_file = TarExecutor.archive_segment(images_paths=[frame_path], out_directory_path=tmp_path, segment_idx=1)
+
+        with tarfile.open(tmp_path / "expected.tar", "w") as archive:
+            frame_info = archive.gettarinfo(name=frame_path, arcname=frame_path.name)
+        frame_info.mtime = int(frame_info.mtime)
+
+        assert tar_file.read_bytes()[: tarfile.BLOCKSIZE] == frame_info.tobuf(format=tarfile.USTAR_FORMAT)
+
+    def test_archive_segment_without_kernel_copies(self, mocker: MockFixture, tmp_path: Path) -> None:
+        frame_path = tmp_path / "00000001.png"
+        frame_path.write_bytes(b"1" * 100000)
+        copies = [tar_executor._copy_file_range, tar_executor._read_write]
+        mocker.patch.object(tar_executor, "_copies", copies)
+        mocker.patch("os.copy_file_range", side_effect=OSError(errno.EXDEV, "Invalid cross-device link"))
+
+        tar_file = TarExecutor.archive_segment(images_paths=[frame_path], out_directory_path=tmp_path, segment_idx=1)
+
+        assert copies == [tar_executor._read_write]
+        with tarfile.open(tar_file, "r") as archive:
+            assert archive.extractfile("00000001.png").read() == b"1" * 100000
+
+    def test_archive_segments_in_threads_without_kernel_copies(self, mocker: MockFixture, tmp_path: Path) -> None:
+        frames_paths = []
+        for idx in range(1, 9):
+            frame_path = tmp_path / f"{idx:08d}.png"
+            frame_path.write_bytes(bytes([idx]) * 100000)
+            frames_paths.append(frame_path)
+        copies = [tar_executor._copy_file_range, tar_executor._read_write]
+        mocker.patch.object(tar_executor, "_copies", copies)
+        mocker.patch("os.copy_file_range", side_effect=OSError(errno.EXDEV, "Invalid cross-device link"))
+
+        # the threads drop the refused copy from the shared list at the same time
+        with ThreadPoolExecutor(max_workers=len(frames_paths)) as executor:
+            tar_files = list(
+                executor.map(
+                    lambda idx: TarExecutor.archive_segment(
+                        images_paths=[frames_paths[idx - 1]], out_directory_path=tmp_path, segment_idx=idx
+                    ),
+                    range(1, len(frames_paths) + 1),
+                )
+            )
+
+        assert copies == [tar_executor._read_write]
+        for idx, tar_file in enumerate(tar_files, start=1):
+            with tarfile.open(tar_file, "r") as archive:
+                assert archive.extractfile(f"{idx:08d}.png").read() == bytes([idx]) * 100000
+
+    def test_archive_files_in_parallel(self, tmp_path: Path) -> None:
+        frames_paths = []
+        for idx in range(1, 11):
+            frame_path = tmp_path / f"{idx:08d}.png"
+            frame_path.write_bytes(bytes([idx]) * idx * 1000)
+            frames_paths.append(frame_path)
+
+        for workers in (1, 3):
+            (tmp_path / str(workers)).mkdir()
+            TarExecutor().archive_files(
+                images_paths=frames_paths, out_directory_path=tmp_path / str(workers), num_files=3, workers=workers
+            )
+
+        tar_files = sorted((tmp_path / "3").iterdir())
+        assert [tar_file.name for tar_file in tar_files] == [f"{idx:08d}.tar" for idx in range(1, 5)]
+        assert all(tar_file.read_bytes() == (tmp_path / "1" / tar_file.name).read_bytes() for tar_file in tar_files)
+
+    def test_archive_files_in_parallel_traces_the_archives(self, tmp_path: Path) -> None:
+        frames_paths = []
+        for idx in range(1, 11):
+            frame_path = tmp_path / f"{idx:08d}.png"
+            frame_path.write_bytes(bytes([idx]) * 1000)
+            frames_paths.append(frame_path)
+
+        (tmp_path / "archives").mkdir()
+        tracing._tracer = Tracer(process_name="orchestrator")
+        try:
+            TarExecutor().archive_files(
+                images_paths=frames_paths, out_directory_path=tmp_path / "archives", num_files=3, workers=3
+            )
+            events = tracing._tracer.pop_events()
+        finally:
+            tracing._tracer = None
+
+        spans = [event for event in events if event["ph"] == "X"]
+        thread_names = {event["tid"]: event["args"]["name"] for event in events if event["name"] == "thread_name"}
+
+        assert sorted(Path(span["args"]["archive"]).name for span in spans if span["name"] == "archive") == [
+            f"{idx:08d}.tar" for idx in range(1, 5)
+        ]
+        assert all(thread_names[span["tid"]].startswith("tar worker") for span in spans)
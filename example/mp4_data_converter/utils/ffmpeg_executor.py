@@ -1,39 +1,257 @@
+import contextlib
+import io
 import logging
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from example.mp4_data_converter.utils.video_utils import retrieve_video_metadata_from_video_file
+from example.mp4_data_converter.utils.frame_format import FrameFormat
+from example.mp4_data_converter.utils.video_utils import (
+    retrieve_frame_timestamps_from_video_file,
+    retrieve_frames_count_from_video_file,
+    retrieve_video_metadata_from_video_file,
+)
+from src.utils.tracing import add_span, span
+
+FRAME_INTERVAL_TOLERANCE = 0.01
 
 
 class FFMPEGExecutor:
-    def __init__(self, file_name_format: str):
+    def __init__(
+        self,
+        file_name_format: str,
+        poll_interval: float = 0.5,
+        parallel_segments: int = 1,
+        frame_format: Optional[FrameFormat] = None,
+    ):
         self._application = "ffmpeg"
 
         self._file_name_format = file_name_format
+        self._frame_format = frame_format or FrameFormat()
+        self._poll_interval = poll_interval
+        self._parallel_segments = parallel_segments
+        self._start_times: Dict[int, int] = {}
 
     def extract_frames(self, file_path: Path, output_directory: Path) -> Dict[str, Any]:
         video_metadata = retrieve_video_metadata_from_video_file(video_file_path=file_path)
-        command = ["-i", str(file_path.absolute()), str(output_directory.absolute() / f"{self._file_name_format}.png")]
+
+        segments = self._split_video(file_path=file_path) if self._parallel_segments > 1 else []
+        if len(segments) > 1:
+            self._extract_segments(file_path=file_path, output_directory=output_directory, segments=segments)
+            return video_metadata
+
+        command = self._extract_frames_command(file_path=file_path, output_directory=output_directory)
 
         self._execute(command=command)
         return video_metadata
 
+    def _split_video(self, file_path: Path) -> List[Tuple[int, int, Optional[float]]]:
+        frame_timestamps, keyframes = retrieve_frame_timestamps_from_video_file(video_file_path=file_path)
+        frame_intervals = [end - start for start, end in zip(frame_timestamps, frame_timestamps[1:])]
+        if not frame_intervals:
+            return []
+
+        # frames of a variable frame rate video can be dropped or duplicated differently around the seek points
+        mean_frame_interval = sum(frame_intervals) / len(frame_intervals)
+        if max(frame_intervals) - min(frame_intervals) > FRAME_INTERVAL_TOLERANCE * mean_frame_interval:
+            logging.debug(f"{file_path} has a variable frame rate, so its frames are extracted by one process")
+            return []
+
+        # the frames are numbered by the packets, which have to be the frames ffmpeg decodes, e.g. not with an edit
+        # list cutting some of them
+        frames_count = len(frame_timestamps)
+        recorded_frames_count = retrieve_frames_count_from_video_file(video_file_path=file_path)
+        if recorded_frames_count is not None and recorded_frames_count != frames_count:
+            logging.debug(
+                f"{file_path} has {frames_count} packets but {recorded_frames_count} frames, so its frames are "
+                f"extracted by one process"
+            )
+            return []
+
+        # segments start at the keyframes closest to the even split points
+        split_frames = {
+            min(keyframes, key=lambda keyframe: abs(keyframe - idx * frames_count / self._parallel_segments))
+            for idx in range(1, self._parallel_segments)
+            if keyframes
+        }
+        segment_starts = [0] + sorted(split_frames - {0})
+        segment_ends = segment_starts[1:] + [frames_count]
+
+        # seeking halfway between the keyframe and the frame before it makes ffmpeg start decoding from the previous
+        # keyframe and drop everything before the segment, so the frames are the same as in a single process run
+        return [
+            (start, end - start, (frame_timestamps[start - 1] + frame_timestamps[start]) / 2 if start else None)
+            for start, end in zip(segment_starts, segment_ends)
+        ]
+
+    def _extract_segments(
+        self, file_path: Path, output_directory: Path, segments: List[Tuple[int, int, Optional[float]]]
+    ) -> None:
+        # the frame ranges of the segments follow each other from the first frame, so every frame is written once
+        video_frames_count = 0
+        for start, frames_count, _ in segments:
+            if start != video_frames_count:
+                raise ChildProcessError(
+                    f"The segment starting at frame {start + 1} does not follow the frames 1-{video_frames_count} "
+                    f"before it."
+                )
+
+            video_frames_count += frames_count
+
+        commands = []
+        for start, frames_count, seek_timestamp in segments:
+            command = ["-seek_timestamp", "1", "-ss", f"{seek_timestamp:.6f}"] if seek_timestamp is not None else []
+            command += [
+                "-i",
+                str(file_path.absolute()),
+                "-frames:v",
+                str(frames_count),
+                "-start_number",
+                str(start + 1),
+            ]
+            command += self._frame_format.encoder_options
+            command.append(str(self._frames_pattern(directory=output_directory.absolute())))
+            commands.append(command)
+
+        logging.debug(f"extracting frames of {file_path} in {len(commands)} segments")
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            for future in [executor.submit(self._execute, command=command) for command in commands]:
+                future.result()
+
+        # every segment writes at most its frames, so the frames of the video are all there once no segment has left
+        # a gap and nothing follows the last one, e.g. frames of another video left in the directory
+        for start, frames_count, _ in segments:
+            missing_frames = [
+                frame_number
+                for frame_number in range(start + 1, start + frames_count + 1)
+                if not self._frame_path(output_directory, frame_number).exists()
+            ]
+            if missing_frames:
+                raise ChildProcessError(
+                    f"The {self._application} extracted {frames_count - len(missing_frames)} of the {frames_count} "
+                    f"frames of the segment starting at frame {start + 1}."
+                )
+
+        if self._frame_path(output_directory, video_frames_count + 1).exists():
+            raise ChildProcessError(
+                f"The {self._application} extracted more than the {video_frames_count} frames of {file_path.name}."
+            )
+
+    def iterate_extracted_frames(self, file_path: Path, output_directory: Path) -> Iterator[List[Path]]:
+        command = self._extract_frames_command(file_path=file_path, output_directory=output_directory)
+        process = self._start(command=command)
+        output_logger = threading.Thread(target=self._log_output, args=(process.stdout,), daemon=True)
+        output_logger.start()
+
+        try:
+            frame_number = 1
+            while True:
+                finished = process.poll() is not None
+
+                # a frame is completely written once ffmpeg has moved on to the next one or has exited
+                frames = []
+                while self._frame_path(output_directory, frame_number + 1).exists() or (
+                    finished and self._frame_path(output_directory, frame_number).exists()
+                ):
+                    frames.append(self._frame_path(output_directory, frame_number))
+                    frame_number += 1
+
+                if frames:
+                    yield frames
+
+                if finished:
+                    break
+
+                time.sleep(self._poll_interval)
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+            output_logger.join()
+
+        self._wait(process=process, command=command)
+
+    def iterate_frames(self, file_path: Path) -> Iterator[Tuple[str, bytes]]:
+        command = ["-i", str(file_path.absolute()), "-f", "image2pipe", "-c:v", self._frame_format.codec]
+        command += self._frame_format.encoder_options + ["pipe:1"]
+        process = self._start(command=command, binary_output=True)
+        output_logger = threading.Thread(
+            target=self._log_output, args=(io.TextIOWrapper(process.stderr),), daemon=True
+        )
+        output_logger.start()
+
+        try:
+            for frame_number, image in enumerate(self._frame_format.read_images(stream=process.stdout), start=1):
+                yield f"{self._file_name_format % frame_number}.{self._frame_format.extension}", image
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+            process.stdout.close()
+            output_logger.join()
+
+        self._wait(process=process, command=command)
+
+    def _extract_frames_command(self, file_path: Path, output_directory: Path) -> List[str]:
+        return (
+            ["-i", str(file_path.absolute())]
+            + self._frame_format.encoder_options
+            + [str(self._frames_pattern(directory=output_directory.absolute()))]
+        )
+
+    def _frames_pattern(self, directory: Path) -> Path:
+        return directory / f"{self._file_name_format}.{self._frame_format.extension}"
+
+    def _frame_path(self, output_directory: Path, frame_number: int) -> Path:
+        return output_directory / f"{self._file_name_format % frame_number}.{self._frame_format.extension}"
+
     def _execute(self, command: List[str]) -> None:
+        with span(name=self._application, category="ffmpeg", command=" ".join(command)):
+            process = self._start(command=command)
+            self._log_output(output=process.stdout)
+            self._wait(process=process, command=command)
+
+    def _start(self, command: List[str], binary_output: bool = False, piped_input: bool = False) -> subprocess.Popen:
         logging.debug(f"started {self._application}")
         process = subprocess.Popen(
             args=[self._application] + command,
+            stdin=subprocess.PIPE if piped_input else None,
             stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True,
+            stderr=subprocess.PIPE if binary_output else subprocess.STDOUT,
+            universal_newlines=not (binary_output or piped_input),
         )
-        for stdout_line in iter(process.stdout.readline, ""):
+        self._start_times[process.pid] = time.time_ns()
+
+        return process
+
+    @staticmethod
+    def _log_output(output: IO[str]) -> None:
+        for stdout_line in iter(output.readline, ""):
             logging.debug(stdout_line)
 
-        process.stdout.close()
+        output.close()
+
+    def _wait(self, process: subprocess.Popen, command: List[str]) -> None:
         return_code = process.wait(timeout=600)
 
         logging.debug(f"finished {self._application}")
+        # every subprocess gets a track of its own, showing how the concurrent ones overlap
+        add_span(
+            name=self._application,
+            category="subprocess",
+            start_ns=self._start_times.pop(process.pid, time.time_ns()),
+            end_ns=time.time_ns(),
+            track=process.pid,
+            track_name=f"{self._application} {process.pid}",
+            command=" ".join(command),
+            return_code=return_code,
+        )
 
         if return_code:
             message = f"The {self._application} failed to execute command {' '.join(command)}."
@@ -41,14 +259,161 @@ class FFMPEGExecutor:
 
             raise ChildProcessError(message)
 
+    def create_thumbnails(self, frames_paths: List[Path], size: int) -> List[bytes]:
+        # every frame lasts a second at a rate of one frame per second, so the images are neither dropped nor repeated
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt") as frames_list:
+            frames_list.write("".join(f"file '{frame_path.absolute()}'\nduration 1\n" for frame_path in frames_paths))
+            frames_list.flush()
+
+            command = [
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                frames_list.name,
+                "-r",
+                "1",
+                "-vf",
+                f"scale={size}:{size}:flags=area,format=gray",
+                "-f",
+                "rawvideo",
+                "pipe:1",
+            ]
+            process = self._start(command=command, binary_output=True)
+            output_logger = threading.Thread(
+                target=self._log_output, args=(io.TextIOWrapper(process.stderr),), daemon=True
+            )
+            output_logger.start()
+
+            try:
+                thumbnails = process.stdout.read()
+            finally:
+                process.stdout.close()
+                output_logger.join()
+
+            self._wait(process=process, command=command)
+
+        thumbnail_size = size * size
+        if len(thumbnails) != thumbnail_size * len(frames_paths):
+            raise ChildProcessError(
+                f"The {self._application} created {len(thumbnails) // thumbnail_size} thumbnails "
+                f"for {len(frames_paths)} frames."
+            )
+
+        return [
+            thumbnails[idx : idx + thumbnail_size] for idx in range(0, len(thumbnails), thumbnail_size)  # noqa E203
+        ]
+
     def create_video(
         self, frames_directory: Path, output_directory: Path, video_metadata: Dict[str, Any]
     ) -> Dict[str, Any]:
+        output_file = output_directory / video_metadata["name"]
+
+        frames_count = len(list(frames_directory.glob(f"*.{self._frame_format.extension}")))
+        if self._parallel_segments > 1 and frames_count >= 2 * self._parallel_segments:
+            self._create_video_from_segments(
+                frames_directory=frames_directory,
+                frames_count=frames_count,
+                output_file=output_file,
+                video_metadata=video_metadata,
+            )
+            return {}
+
         command = [
             "-framerate",
             video_metadata["avg_frame_rate"],
             "-i",
-            f"{frames_directory}/{self._file_name_format}.png",
+            str(self._frames_pattern(directory=frames_directory)),
+        ] + self._encode_video_command(output_file=output_file, video_metadata=video_metadata)
+
+        self._execute(command=command)
+
+        return {}
+
+    def _create_video_from_segments(
+        self, frames_directory: Path, frames_count: int, output_file: Path, video_metadata: Dict[str, Any]
+    ) -> None:
+        bounds = [idx * frames_count // self._parallel_segments for idx in range(self._parallel_segments + 1)]
+
+        with tempfile.TemporaryDirectory(dir=output_file.parent) as segments_directory:
+            segment_files = []
+            commands = []
+            for idx, (start, end) in enumerate(zip(bounds, bounds[1:])):
+                segment_file = Path(segments_directory) / f"{idx:08d}{output_file.suffix}"
+                commands.append(
+                    [
+                        "-framerate",
+                        video_metadata["avg_frame_rate"],
+                        "-start_number",
+                        str(start + 1),
+                        "-i",
+                        str(self._frames_pattern(directory=frames_directory)),
+                        "-frames:v",
+                        str(end - start),
+                    ]
+                    + self._encode_video_command(output_file=segment_file, video_metadata=video_metadata)
+                )
+                segment_files.append(segment_file)
+
+            logging.debug(f"encoding {frames_count} frames in {len(commands)} segments")
+            with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+                for future in [executor.submit(self._execute, command=command) for command in commands]:
+                    future.result()
+
+            concat_file = Path(segments_directory) / "segments.txt"
+            concat_file.write_text("".join(f"file '{segment_file.absolute()}'\n" for segment_file in segment_files))
+
+            self._execute(
+                command=["-f", "concat", "-safe", "0", "-i", str(concat_file), "-c", "copy", str(output_file), "-y"]
+            )
+
+    def create_video_from_frames(
+        self, frames: Iterable[bytes], output_directory: Path, video_metadata: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        command = [
+            "-f",
+            "image2pipe",
+            "-framerate",
+            video_metadata["avg_frame_rate"],
+            "-i",
+            "pipe:0",
+        ] + self._encode_video_command(
+            output_file=output_directory / video_metadata["name"], video_metadata=video_metadata
+        )
+        process = self._start(command=command, piped_input=True)
+        output_logger = threading.Thread(
+            target=self._log_output, args=(io.TextIOWrapper(process.stdout),), daemon=True
+        )
+        output_logger.start()
+
+        written = False
+        try:
+            for frame in frames:
+                process.stdin.write(frame)
+
+            written = True
+        except BrokenPipeError:
+            # ffmpeg has exited before reading every frame, its return code tells what went wrong
+            written = True
+        finally:
+            # the frames failed to arrive, so ffmpeg is stopped and reaped before their error is raised
+            if not written:
+                process.kill()
+                process.wait()
+
+            with contextlib.suppress(BrokenPipeError):
+                process.stdin.close()
+
+            output_logger.join()
+
+        self._wait(process=process, command=command)
+
+        return {}
+
+    @staticmethod
+    def _encode_video_command(output_file: Path, video_metadata: Dict[str, Any]) -> List[str]:
+        return [
             "-c:v",
             video_metadata["codec_name"],
             "-pix_fmt",
@@ -59,10 +424,6 @@ class FFMPEGExecutor:
             video_metadata["display_aspect_ratio"],
             "-b:v",
             str(video_metadata["bit_rate"]),
-            str(output_directory / video_metadata["name"]),
+            str(output_file),
             "-y",
         ]
-
-        self._execute(command=command)
-
-        return {}
@@ -0,0 +1,53 @@
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List
+
+from src.orchestrator.artifact_store import FICLONE
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def link_or_copy_file(source: Path, destination: Path) -> None:
+    destination.unlink(missing_ok=True)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def clone_or_copy_file(source: Path, destination: Path) -> None:
+    # the copy never shares an inode with its source, so writing either of them leaves the other one as it is, while
+    # the file systems of Linux supporting it share the data until then
+    destination.unlink(missing_ok=True)
+    with source.open("rb") as source_file, destination.open("wb") as destination_file:
+        try:
+            if fcntl is None:
+                raise OSError("cloning files is not supported")
+
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+        except OSError:
+            shutil.copyfileobj(source_file, destination_file)
+
+
+def restore_duplicate_frames(frame_duplicates: Dict[str, str], directory: Path) -> List[Path]:
+    # the restored duplicates are files of their own, as the later elements or users may edit a frame in place
+    restored_frames = []
+    for duplicate_frame, original_frame in frame_duplicates.items():
+        try:
+            clone_or_copy_file(source=directory / original_frame, destination=directory / duplicate_frame)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"The anonymized frame {original_frame} duplicated by {duplicate_frame} is missing"
+            )
+
+        restored_frames.append(directory / duplicate_frame)
+
+    if restored_frames:
+        logging.info(f"restored {len(restored_frames)} duplicate frames from their anonymized originals")
+
+    return restored_frames
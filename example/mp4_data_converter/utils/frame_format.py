@@ -0,0 +1,157 @@
+import struct
+from typing import IO, Any, Dict, Iterator, List, Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_LAST_CHUNK_TYPE = b"IEND"
+
+JPEG_START_OF_IMAGE = b"\xff\xd8"
+JPEG_END_OF_IMAGE = b"\xff\xd9"
+JPEG_START_OF_SCAN = 0xDA
+JPEG_RESTART_MARKERS = set(range(0xD0, 0xD8))
+JPEG_STANDALONE_MARKERS = {0x01} | JPEG_RESTART_MARKERS
+
+PNG_COMPRESSION_LEVELS = range(0, 10)
+JPEG_QUALITIES = range(2, 32)
+
+
+class FrameFormat:
+    def __init__(self, extension: str = "png", compression_level: Optional[int] = None, quality: int = 2) -> None:
+        if extension not in ("png", "jpg"):
+            raise ValueError(f"The frame format '{extension}' is not supported, please use 'png' or 'jpg'")
+
+        if compression_level is not None and compression_level not in PNG_COMPRESSION_LEVELS:
+            raise ValueError(f"The PNG compression level {compression_level} is not in the range from 0 to 9")
+
+        if quality not in JPEG_QUALITIES:
+            raise ValueError(f"The JPEG quality {quality} is not in the range from 2 (best) to 31 (worst)")
+
+        self._extension = extension
+        self._compression_level = compression_level
+        self._quality = quality
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]]) -> "FrameFormat":
+        # the format is a single value, e.g. "png", "png:1" (compression level) or "jpg:2" (quality)
+        extension, _, option = str((settings or {}).get("frame_format", "png")).partition(":")
+        if option and not option.isdigit():
+            raise ValueError(f"The frame format option '{option}' is not a number")
+
+        if extension == "jpg":
+            return cls(extension=extension, quality=int(option) if option else 2)
+
+        return cls(extension=extension, compression_level=int(option) if option else None)
+
+    @property
+    def extension(self) -> str:
+        return self._extension
+
+    @property
+    def codec(self) -> str:
+        return "png" if self._extension == "png" else "mjpeg"
+
+    @property
+    def encoder_options(self) -> List[str]:
+        if self._extension == "jpg":
+            return ["-q:v", str(self._quality)]
+
+        return ["-compression_level", str(self._compression_level)] if self._compression_level is not None else []
+
+    def read_images(self, stream: IO[bytes]) -> Iterator[bytes]:
+        return _read_png_images(stream=stream) if self._extension == "png" else _read_jpeg_images(stream=stream)
+
+
+def _read_png_images(stream: IO[bytes]) -> Iterator[bytes]:
+    while signature := stream.read(len(PNG_SIGNATURE)):
+        if signature != PNG_SIGNATURE:
+            raise ChildProcessError("The piped frames are not PNG images.")
+
+        chunks = [signature]
+        while True:
+            chunk_header = stream.read(8)
+            if len(chunk_header) < 8:
+                raise ChildProcessError("The piped PNG image is truncated.")
+
+            chunk_length, chunk_type = struct.unpack(">I4s", chunk_header)
+            chunk_data = stream.read(chunk_length + 4)
+            if len(chunk_data) < chunk_length + 4:
+                raise ChildProcessError("The piped PNG image is truncated.")
+
+            chunks += [chunk_header, chunk_data]
+
+            if chunk_type == PNG_LAST_CHUNK_TYPE:
+                break
+
+        yield b"".join(chunks)
+
+
+def _read_jpeg_images(stream: IO[bytes], read_size: int = 1 << 16) -> Iterator[bytes]:
+    buffer = bytearray()
+    position = 0
+    in_scan = False
+    while True:
+        if position == 0:
+            if len(buffer) < len(JPEG_START_OF_IMAGE):
+                data = stream.read1(read_size)
+                if not data:
+                    if buffer:
+                        raise ChildProcessError("The piped JPEG image is truncated.")
+
+                    return
+
+                buffer += data
+                continue
+
+            if buffer[: len(JPEG_START_OF_IMAGE)] != JPEG_START_OF_IMAGE:
+                raise ChildProcessError("The piped frames are not JPEG images.")
+
+            position = len(JPEG_START_OF_IMAGE)
+            continue
+
+        if in_scan:
+            # the entropy-coded data escapes 0xFF bytes, so the scan ends at the first marker other than a restart one
+            marker_position = buffer.find(b"\xff", position)
+            if marker_position == -1 or marker_position + 1 >= len(buffer):
+                position = len(buffer) if marker_position == -1 else marker_position
+                _read_more(stream=stream, buffer=buffer, read_size=read_size)
+                continue
+
+            position = marker_position
+            if buffer[marker_position + 1] == 0x00 or buffer[marker_position + 1] in JPEG_RESTART_MARKERS:
+                position += 2
+            else:
+                in_scan = False
+
+            continue
+
+        if len(buffer) < position + 2:
+            _read_more(stream=stream, buffer=buffer, read_size=read_size)
+            continue
+
+        if buffer[position] != 0xFF:
+            raise ChildProcessError("The piped JPEG image is malformed.")
+
+        marker = buffer[position + 1]
+        if marker == JPEG_END_OF_IMAGE[1]:
+            yield bytes(buffer[: position + 2])
+            del buffer[: position + 2]
+            position = 0
+        elif marker in JPEG_STANDALONE_MARKERS:
+            position += 2
+        elif len(buffer) < position + 4:
+            _read_more(stream=stream, buffer=buffer, read_size=read_size)
+        else:
+            (segment_length,) = struct.unpack_from(">H", buffer, position + 2)
+            if len(buffer) < position + 2 + segment_length:
+                _read_more(stream=stream, buffer=buffer, read_size=read_size)
+                continue
+
+            position += 2 + segment_length
+            in_scan = marker == JPEG_START_OF_SCAN
+
+
+def _read_more(stream: IO[bytes], buffer: bytearray, read_size: int) -> None:
+    data = stream.read1(read_size)
+    if not data:
+        raise ChildProcessError("The piped JPEG image is truncated.")
+
+    buffer += data
@@ -0,0 +1,38 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from src.utils.metrics import DURATION_BUCKETS, REGISTRY
+
+SIZE_BUCKETS = tuple(2**power for power in range(20, 31))
+
+REDACT_JOBS = Counter("cip_redact_jobs", "Redact jobs submitted", registry=REGISTRY)
+REDACT_JOB_RETRIES = Counter(
+    "cip_redact_job_retries", "Redact jobs submitted again after a failure", registry=REGISTRY
+)
+REDACT_JOB_FAILURES = Counter("cip_redact_job_failures", "Redact jobs which failed", registry=REGISTRY)
+REDACT_STATUS_REQUESTS = Counter(
+    "cip_redact_status_requests", "Status requests polling the Redact jobs", registry=REGISTRY
+)
+REDACT_JOB_DURATION_SECONDS = Histogram(
+    "cip_redact_job_duration_seconds",
+    "Time from starting a Redact job to downloading its result",
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+REDACT_QUEUE_WAIT_SECONDS = Histogram(
+    "cip_redact_queue_wait_seconds",
+    "Time an archive waited for one of the max_concurrent_jobs Redact job slots",
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+TAR_TARGET_SIZE_BYTES = Gauge(
+    "cip_tar_target_size_bytes",
+    "Archive size the TarArchiver cuts the frames at",
+    multiprocess_mode="liveall",
+    registry=REGISTRY,
+)
+TAR_ARCHIVE_SIZE_BYTES = Histogram(
+    "cip_tar_archive_size_bytes",
+    "Size of the archives written by the TarArchiver",
+    buckets=SIZE_BUCKETS,
+    registry=REGISTRY,
+)
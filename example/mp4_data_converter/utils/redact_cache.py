@@ -0,0 +1,89 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+CHUNK_SIZE = 1 << 20
+
+
+class RedactCache:
+    def __init__(self, directory: Path, max_size_bytes: int) -> None:
+        self._directory = directory
+        self._max_size_bytes = max_size_bytes
+        self._eviction_lock = threading.Lock()
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._evict()
+
+    @staticmethod
+    def get_key(tar_file: Path, redaction_settings: Dict[str, Any]) -> str:
+        # members are hashed instead of the archive itself, so archives of the same frames packed at another time
+        # (tar headers carry modification times) share the key
+        key = hashlib.sha256(json.dumps(redaction_settings, sort_keys=True, default=str).encode("utf-8"))
+        with tarfile.open(tar_file, "r") as archive:
+            for member in sorted(archive.getmembers(), key=lambda member: member.name):
+                if not member.isfile():
+                    continue
+
+                key.update(f"{member.name}\0{member.size}\0".encode("utf-8"))
+                member_file = archive.extractfile(member)
+                while chunk := member_file.read(CHUNK_SIZE):
+                    key.update(chunk)
+
+        return key.hexdigest()
+
+    def get(self, key: str, destination: Path) -> bool:
+        entry = self._entry_path(key=key)
+        try:
+            # the access time is not reliable on noatime mounts, so the modification time tracks the recent use
+            os.utime(entry)
+            # the entry is copied, as a link would share its inode with the destination, which a later download or
+            # archive to the same path rewrites in place
+            destination.unlink(missing_ok=True)
+            shutil.copyfile(entry, destination)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def put(self, key: str, source: Path) -> None:
+        if source.stat().st_size > self._max_size_bytes:
+            logging.debug(f"the {source} is larger than the Redact cache, so it is not cached")
+            return
+
+        # entries appear atomically, so concurrent runs sharing the cache never read a partially written one
+        with tempfile.NamedTemporaryFile(dir=self._directory, suffix=".tmp", delete=False) as f:
+            temporary_entry = Path(f.name)
+            with source.open("rb") as source_file:
+                shutil.copyfileobj(source_file, f, CHUNK_SIZE)
+
+        os.replace(temporary_entry, self._entry_path(key=key))
+
+        self._evict()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._directory / f"{key}.tar"
+
+    def _evict(self) -> None:
+        with self._eviction_lock:
+            entries = []
+            for entry in self._directory.glob("*.tar"):
+                with contextlib.suppress(FileNotFoundError):
+                    entry_stat = entry.stat()
+                    entries.append((entry_stat.st_mtime, entry_stat.st_size, entry))
+
+            cache_size = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if cache_size <= self._max_size_bytes:
+                    break
+
+                logging.debug(f"evicting the least recently used {entry} from the Redact cache")
+                entry.unlink(missing_ok=True)
+                cache_size -= size
@@ -0,0 +1,179 @@
+import collections
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from typing import Any, Collection, Optional
+
+from example.mp4_data_converter.utils.metrics import REDACT_STATUS_REQUESTS
+from example.mp4_data_converter.utils.redact_throughput import MIN_JOBS, RedactThroughput, fit_jobs
+from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+
+BACKOFF_FACTOR = 2
+MAX_STATUS_ERRORS = 3
+MAX_TRACKED_JOBS = 200
+
+
+class _TrackedJob:
+    def __init__(self, job: Any, upload_bytes: int, expected_seconds: Optional[float]) -> None:
+        self.job = job
+        self.upload_bytes = upload_bytes
+        self.expected_seconds = expected_seconds
+        self.started_at = time.monotonic()
+        self.overdue_polls = 0
+        self.status_errors = 0
+        self.future = Future()
+
+
+class RedactJobTracker:
+    def __init__(
+        self,
+        finished_states: Collection[Any],
+        min_poll_interval: float = 0.5,
+        max_poll_interval: float = 30,
+        max_status_requests_per_second: float = 10,
+        job_timeout: Optional[float] = None,
+        redact_throughput: Optional[RedactThroughput] = None,
+    ) -> None:
+        self._finished_states = finished_states
+        self._min_poll_interval = min_poll_interval
+        self._max_poll_interval = max_poll_interval
+        self._status_request_interval = 1 / max_status_requests_per_second
+        self._job_timeout = job_timeout
+        self._redact_throughput = redact_throughput
+
+        # the durations from the start of the jobs to their end, which the expected durations are fitted to
+        self._finished_jobs = collections.deque(maxlen=MAX_TRACKED_JOBS)
+        self._polls = []
+        self._poll_counter = itertools.count()
+        self._condition = threading.Condition()
+        self._next_status_request_at = 0.0
+        self._stopped = False
+        self._thread = None
+
+    def __enter__(self) -> "RedactJobTracker":
+        self._stopped = False
+        self._thread = threading.Thread(target=self._track, name="redact_job_tracker", daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+        self._thread.join()
+
+        # the jobs still tracked are not followed anymore, so whoever waits for them is not left hanging
+        for _, _, tracked_job in self._polls:
+            tracked_job.future.cancel()
+        self._polls.clear()
+
+    def wait(self, job: Any, upload_bytes: int) -> Any:
+        # returns the status of the job once it is in one of the finished states
+        tracked_job = _TrackedJob(
+            job=job, upload_bytes=upload_bytes, expected_seconds=self._get_expected_seconds(upload_bytes=upload_bytes)
+        )
+        self._schedule(tracked_job=tracked_job)
+
+        try:
+            return tracked_job.future.result()
+        except CancelledError:
+            raise RuntimeError("The Redact job tracker stopped before the job finished")
+
+    def _get_expected_seconds(self, upload_bytes: int) -> Optional[float]:
+        # the jobs of this tracker are timed from their start to their end, while the recorded ones include the upload
+        # and the download, so they are only used until enough jobs of this tracker have finished
+        jobs = list(self._finished_jobs)
+        if len(jobs) < MIN_JOBS and self._redact_throughput is not None:
+            jobs = self._redact_throughput.get_jobs() + jobs
+
+        if (estimate := fit_jobs(jobs=jobs)) is not None:
+            overhead_seconds, bytes_per_second = estimate
+            return overhead_seconds + upload_bytes / bytes_per_second
+
+        # without jobs of different sizes the duration is taken in proportion to the size
+        if jobs and (jobs_bytes := sum(job_bytes for job_bytes, _ in jobs)) > 0:
+            return sum(seconds for _, seconds in jobs) * upload_bytes / jobs_bytes
+
+        return None
+
+    def _get_poll_interval(self, tracked_job: _TrackedJob) -> float:
+        remaining_seconds = None
+        if tracked_job.expected_seconds is not None:
+            remaining_seconds = tracked_job.expected_seconds - (time.monotonic() - tracked_job.started_at)
+
+        if remaining_seconds is not None and remaining_seconds > self._min_poll_interval:
+            # the polls close in on the expected end of the job, so they neither fire long before it nor long after
+            interval = remaining_seconds / 2
+        else:
+            # past the expected end, or without one, the polls back off
+            interval = self._min_poll_interval * BACKOFF_FACTOR**tracked_job.overdue_polls
+            tracked_job.overdue_polls += 1
+
+        return min(max(interval, self._min_poll_interval), self._max_poll_interval)
+
+    def _schedule(self, tracked_job: _TrackedJob) -> None:
+        poll_at = time.monotonic() + self._get_poll_interval(tracked_job=tracked_job)
+        with self._condition:
+            if self._stopped:
+                tracked_job.future.cancel()
+                return
+
+            heapq.heappush(self._polls, (poll_at, next(self._poll_counter), tracked_job))
+            self._condition.notify()
+
+    def _track(self) -> None:
+        # a single loop polls every job, one status request at a time and at most max_status_requests_per_second
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.monotonic()
+                    if self._polls and max(self._polls[0][0], self._next_status_request_at) <= now:
+                        break
+
+                    timeout = None
+                    if self._polls:
+                        timeout = max(self._polls[0][0], self._next_status_request_at) - now
+                    self._condition.wait(timeout=timeout)
+
+                if self._stopped:
+                    return
+
+                _, _, tracked_job = heapq.heappop(self._polls)
+                self._next_status_request_at = time.monotonic() + self._status_request_interval
+
+            self._poll(tracked_job=tracked_job)
+
+    def _poll(self, tracked_job: _TrackedJob) -> None:
+        REDACT_STATUS_REQUESTS.inc()
+        try:
+            status = tracked_job.job.get_status()
+        except Exception as e:
+            tracked_job.status_errors += 1
+            if tracked_job.status_errors >= MAX_STATUS_ERRORS:
+                # raised as the other failures of a Redact job, so the job is retried like them
+                message = f"Failed to get the status of a Redact job {MAX_STATUS_ERRORS} times: {e}"
+                tracked_job.future.set_exception(
+                    PipelineElementError(public_message=message, severity=Severity.major, log_message=str(e))
+                )
+                return
+
+            logging.warning(f"failed to get the status of a Redact job, will ask again: {e}")
+            self._schedule(tracked_job=tracked_job)
+            return
+
+        tracked_job.status_errors = 0
+        duration_seconds = time.monotonic() - tracked_job.started_at
+        if status.state in self._finished_states:
+            self._finished_jobs.append((tracked_job.upload_bytes, duration_seconds))
+            tracked_job.future.set_result(status)
+        elif self._job_timeout is not None and duration_seconds > self._job_timeout:
+            tracked_job.future.set_exception(
+                TimeoutError(f"The Redact job is still {status.state} after {duration_seconds:.0f}s")
+            )
+        else:
+            self._schedule(tracked_job=tracked_job)
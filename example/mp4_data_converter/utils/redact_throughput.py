@@ -0,0 +1,73 @@
+import contextlib
+import json
+import math
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+MAX_JOBS = 200
+MIN_JOBS = 3
+
+
+class RedactThroughput:
+    def __init__(self, stats_file: Path) -> None:
+        self._stats_file = stats_file
+        self._lock = threading.Lock()
+
+    def record_job(self, upload_bytes: int, duration_seconds: float) -> None:
+        # the runs sharing the file may overwrite each other's latest jobs, which only loses a few samples
+        with self._lock:
+            jobs = self.get_jobs()[-(MAX_JOBS - 1) :]  # noqa E203
+            jobs.append((upload_bytes, duration_seconds))
+
+            self._stats_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=self._stats_file.parent, suffix=".tmp", delete=False) as f:
+                json.dump({"jobs": jobs}, f)
+
+            os.replace(f.name, self._stats_file)
+
+    def get_jobs(self) -> List[Tuple[int, float]]:
+        with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+            with self._stats_file.open() as f:
+                return [(int(upload_bytes), float(seconds)) for upload_bytes, seconds in json.load(f)["jobs"]]
+
+        return []
+
+    def estimate(self) -> Optional[Tuple[float, float]]:
+        return fit_jobs(jobs=self.get_jobs())
+
+    @staticmethod
+    def get_target_size(
+        overhead_seconds: float, bytes_per_second: float, overhead_share: float, min_bytes: int, max_bytes: int
+    ) -> int:
+        # the smallest jobs whose overhead is at most overhead_share of their duration keep the most jobs in flight
+        # and the retries cheap, the size is rounded to a power of two, so it stays the same for a slightly different
+        # throughput and the archives keep hitting the Redact cache
+        size = overhead_seconds * bytes_per_second * (1 - overhead_share) / overhead_share
+        if size >= 1:
+            size = 2 ** round(math.log2(size))
+
+        return int(min(max(size, min_bytes), max_bytes))
+
+
+def fit_jobs(jobs: List[Tuple[int, float]]) -> Optional[Tuple[float, float]]:
+    # a job takes a fixed overhead plus the time of its bytes, fitted by least squares to the durations of the jobs;
+    # the fit needs jobs of different sizes and is None otherwise
+    if len(jobs) < MIN_JOBS:
+        return None
+
+    mean_bytes = sum(upload_bytes for upload_bytes, _ in jobs) / len(jobs)
+    mean_seconds = sum(seconds for _, seconds in jobs) / len(jobs)
+    bytes_variance = sum((upload_bytes - mean_bytes) ** 2 for upload_bytes, _ in jobs)
+    if bytes_variance == 0:
+        return None
+
+    seconds_per_byte = (
+        sum((upload_bytes - mean_bytes) * (seconds - mean_seconds) for upload_bytes, seconds in jobs) / bytes_variance
+    )
+    if seconds_per_byte <= 0:
+        return None
+
+    return max(mean_seconds - seconds_per_byte * mean_bytes, 0.0), 1 / seconds_per_byte
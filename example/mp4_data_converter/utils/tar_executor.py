@@ -1,6 +1,36 @@
+import contextlib
+import errno
+import functools
+import io
+import multiprocessing
+import os
+import struct
 import tarfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import List, Optional
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.tracing import add_span, span
+
+try:
+    import grp
+    import pwd
+except ImportError:
+    grp = pwd = None
+
+CHUNK_SIZE = 1 << 20
+# the fields of a ustar header up to the device numbers, the rest of the 512 bytes stays empty for regular files
+USTAR_HEADER = struct.Struct("100s8s8s8s12s12s8s1s100s8s32s32s16s167x")
+# the device numbers of a regular file as the tarfile of this Python writes them, zeros in the older versions and empty
+# fields in the newer ones
+USTAR_DEVICE_FIELDS = tarfile.TarInfo().tobuf(format=tarfile.USTAR_FORMAT)[329:345]
+USTAR_NAME_LENGTH = 100
+USTAR_OWNER_NAME_LENGTH = 32
+USTAR_MAX_NUMBER = {"uid": 8**7, "gid": 8**7, "size": 8**11, "mtime": 8**11}
+# the errors of the kernel copies on the file systems and kernels which do not support them for the given files
+KERNEL_COPY_UNSUPPORTED_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
 
 
 class TarExecutor:
@@ -8,16 +38,339 @@ class TarExecutor:
         self._image_extenstion = image_extenstion
 
     def archive_files(
-        self, images_paths: List[Path], out_directory_path: Path, num_files: Optional[int] = 100
+        self, images_paths: List[Path], out_directory_path: Path, num_files: Optional[int] = 100, workers: int = 1
     ) -> None:
         segment_lists = [images_paths[x : x + num_files] for x in range(0, len(images_paths), num_files)]  # noqa E203
-        for idx, segment in enumerate(segment_lists, start=1):
-            segment_tar_file_path = out_directory_path / f"{idx:08d}.tar"
-            with tarfile.open(segment_tar_file_path, "w") as archive:
-                for filename in segment:
-                    archive.add(name=filename, arcname=filename.name)
-
-    def extract_files(self, archives_paths: List[Path], out_directory_path: Path) -> None:
-        for archives_path in archives_paths:
-            with tarfile.open(archives_path, "r") as archive:
-                archive.extractall(path=out_directory_path)
+        for _ in self.archive_segments(segments=segment_lists, out_directory_path=out_directory_path, workers=workers):
+            pass
+
+    def archive_segments(
+        self, segments: Iterable[List[Path]], out_directory_path: Path, workers: int = 1
+    ) -> Iterator[Tuple[List[Path], Path]]:
+        # the segments are numbered in the order they come, so the archive names and members do not depend on the
+        # workers, while the archives are yielded with their frames in the order they are written
+        if workers <= 1:
+            for idx, segment in enumerate(segments, start=1):
+                yield segment, self.archive_segment(
+                    images_paths=segment, out_directory_path=out_directory_path, segment_idx=idx
+                )
+            return
+
+        # the pipeline elements run in threads, which a forked worker process would copy in whatever state they are
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+        ) as executor:
+            in_flight = {}
+            try:
+                for idx, segment in enumerate(segments, start=1):
+                    # the written archives are handed over right away, waiting only while the workers are all busy
+                    timeout = None if len(in_flight) >= 2 * workers else 0
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    yield from (_get_archive(future=future, images_paths=in_flight.pop(future)) for future in done)
+
+                    future = executor.submit(
+                        _archive_segment_in_worker,
+                        images_paths=segment,
+                        out_directory_path=out_directory_path,
+                        segment_idx=idx,
+                    )
+                    in_flight[future] = segment
+
+                for future in as_completed(list(in_flight)):
+                    yield _get_archive(future=future, images_paths=in_flight.pop(future))
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    @staticmethod
+    def archive_segment(images_paths: List[Path], out_directory_path: Path, segment_idx: int) -> Path:
+        # the headers are built from a single fstat of every frame and the frames are copied into the archive by the
+        # kernel, the result being the ustar archive tarfile writes for the same members with their modification times
+        # truncated to whole seconds
+        segment_tar_file_path = out_directory_path / f"{segment_idx:08d}.tar"
+        with span(name="archive", category="tar", archive=segment_tar_file_path, files=len(images_paths)):
+            with segment_tar_file_path.open("wb", buffering=0) as archive:
+                archive_fd, archive_size, padding = archive.fileno(), 0, b""
+                for filename in images_paths:
+                    with filename.open("rb", buffering=0) as frame:
+                        frame_stat = os.fstat(frame.fileno())
+                        header = _get_header(name=filename.name, frame_stat=frame_stat)
+                        _write(fd=archive_fd, data=padding + header)
+                        _copy_data(in_fd=frame.fileno(), out_fd=archive_fd, size=frame_stat.st_size)
+
+                    padding = tarfile.NUL * (-frame_stat.st_size % tarfile.BLOCKSIZE)
+                    archive_size += len(header) + frame_stat.st_size + len(padding)
+
+                # two empty blocks end the archive, which is filled up to a whole record like tarfile does
+                end_size = 2 * tarfile.BLOCKSIZE
+                end_size += -(archive_size + end_size) % tarfile.RECORDSIZE
+                _write(fd=archive_fd, data=padding + tarfile.NUL * end_size)
+
+        return segment_tar_file_path
+
+    def archive_frames(
+        self, frames: Iterable[Tuple[str, bytes]], out_directory_path: Path, num_files: Optional[int] = 100
+    ) -> Iterator[Path]:
+        archive, segment_idx = None, 0
+        try:
+            for frame_idx, (name, data) in enumerate(frames):
+                if frame_idx % num_files == 0:
+                    if archive is not None:
+                        archive.close()
+                        yield Path(archive.name)
+
+                    segment_idx += 1
+                    archive = tarfile.open(out_directory_path / f"{segment_idx:08d}.tar", "w")
+
+                frame_info = tarfile.TarInfo(name=name)
+                frame_info.size = len(data)
+                frame_info.mtime = int(time.time())
+                frame_info.mode = 0o644
+                archive.addfile(tarinfo=frame_info, fileobj=io.BytesIO(data))
+        finally:
+            if archive is not None:
+                archive.close()
+
+        if archive is not None:
+            yield Path(archive.name)
+
+    def extract_files(self, archives_paths: List[Path], out_directory_path: Path, workers: int = 1) -> List[Path]:
+        # the archives hold distinct frames, so they are extracted concurrently, the file I/O releasing the GIL
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tar_extractor") as executor:
+            futures = [
+                executor.submit(self.extract_file, archive_path=archive_path, out_directory_path=out_directory_path)
+                for archive_path in archives_paths
+            ]
+
+            return [frame for future in futures for frame in future.result()]
+
+    def extract_file(self, archive_path: Path, out_directory_path: Path) -> List[Path]:
+        with span(name="extract", category="tar", archive=archive_path), tarfile.open(archive_path, "r") as archive:
+            archive.extractall(path=out_directory_path)
+
+            return [out_directory_path / name for name in archive.getnames() if self._is_image(name)]
+
+    def extract_stream(
+        self,
+        write_archive: Callable[[BinaryIO], None],
+        out_directory_path: Path,
+        archive_copy_path: Optional[Path] = None,
+    ) -> List[Path]:
+        # the archive written by write_archive goes through a pipe into a tar stream reader, so it is unpacked while
+        # it is being written and never stored on the disk, unless a copy of it is asked for
+        read_fd, write_fd = os.pipe()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tar_stream_extractor") as executor:
+            frames = executor.submit(
+                self._extract_pipe,
+                read_fd=read_fd,
+                out_directory_path=out_directory_path,
+                archive_copy_path=archive_copy_path,
+            )
+            try:
+                with open(write_fd, "wb") as writer:
+                    write_archive(writer)
+            except BrokenPipeError:
+                # the reader has stopped on a broken archive, its error is raised below
+                pass
+
+            return frames.result()
+
+    def _extract_pipe(self, read_fd: int, out_directory_path: Path, archive_copy_path: Optional[Path]) -> List[Path]:
+        # the read end is closed on an error, so the writer gets a broken pipe instead of blocking on a full one
+        with open(read_fd, "rb") as reader, span(name="extract", category="tar", archive=archive_copy_path or "pipe"):
+            if archive_copy_path is None:
+                return self._extract_fileobj(fileobj=reader, out_directory_path=out_directory_path)
+
+            with archive_copy_path.open("wb") as archive_copy:
+                return self._extract_fileobj(
+                    fileobj=_CopyingReader(reader=reader, copy=archive_copy), out_directory_path=out_directory_path
+                )
+
+    def _extract_fileobj(self, fileobj: BinaryIO, out_directory_path: Path) -> List[Path]:
+        with tarfile.open(fileobj=fileobj, mode="r|") as archive:
+            archive.extractall(path=out_directory_path)
+            names = archive.getnames()
+
+        # the padding after the end of the archive is read too, so the whole archive gets written
+        while fileobj.read(CHUNK_SIZE):
+            pass
+
+        return [out_directory_path / name for name in names if self._is_image(name)]
+
+    def get_image_names(self, archive_path: Path) -> List[str]:
+        with tarfile.open(archive_path, "r") as archive:
+            return [name for name in archive.getnames() if self._is_image(name)]
+
+    def iterate_archive_files(self, archive_path: Path) -> Iterator[Tuple[str, bytes]]:
+        with tarfile.open(archive_path, "r") as archive:
+            for member in sorted(archive.getmembers(), key=lambda member: member.name):
+                if member.isfile() and self._is_image(member.name):
+                    yield member.name, archive.extractfile(member).read()
+
+    def read_archive_file(self, archive_path: Path, name: str) -> bytes:
+        with tarfile.open(archive_path, "r") as archive:
+            return archive.extractfile(name).read()
+
+    def _is_image(self, name: str) -> bool:
+        return self._image_extenstion is None or name.endswith(f".{self._image_extenstion}")
+
+
+class _CopyingReader:
+    def __init__(self, reader: BinaryIO, copy: BinaryIO) -> None:
+        self._reader = reader
+        self._copy = copy
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._reader.read(size)
+        self._copy.write(data)
+
+        return data
+
+
+def _archive_segment_in_worker(
+    images_paths: List[Path], out_directory_path: Path, segment_idx: int
+) -> Tuple[Path, int, int, int]:
+    # the worker processes do not trace, so they hand the timings of the archives over to the process tracing the run
+    start_ns = time.time_ns()
+    segment_tar_file_path = TarExecutor.archive_segment(
+        images_paths=images_paths, out_directory_path=out_directory_path, segment_idx=segment_idx
+    )
+
+    return segment_tar_file_path, start_ns, time.time_ns(), os.getpid()
+
+
+def _get_archive(future: Future, images_paths: List[Path]) -> Tuple[List[Path], Path]:
+    segment_tar_file_path, start_ns, end_ns, worker_pid = future.result()
+    # every worker process gets a track of its own, showing how the concurrent archives overlap
+    add_span(
+        name="archive",
+        category="tar",
+        start_ns=start_ns,
+        end_ns=end_ns,
+        track=worker_pid,
+        track_name=f"tar worker {worker_pid}",
+        archive=segment_tar_file_path,
+        files=len(images_paths),
+    )
+
+    return images_paths, segment_tar_file_path
+
+
+def _get_header(name: str, frame_stat: os.stat_result) -> bytes:
+    fields = {
+        "uid": frame_stat.st_uid,
+        "gid": frame_stat.st_gid,
+        "size": frame_stat.st_size,
+        "mtime": int(frame_stat.st_mtime),
+    }
+    # the owner names are looked up like tarfile does, and left empty for the unknown users and groups
+    uname, gname = _get_user_name(uid=frame_stat.st_uid), _get_group_name(gid=frame_stat.st_gid)
+    encoded_name, encoded_uname, encoded_gname = name.encode("utf-8"), uname.encode("utf-8"), gname.encode("utf-8")
+    if (
+        not (encoded_name + encoded_uname + encoded_gname).isascii()
+        or len(encoded_name) > USTAR_NAME_LENGTH
+        or max(len(encoded_uname), len(encoded_gname)) > USTAR_OWNER_NAME_LENGTH
+        or any(not 0 <= value < USTAR_MAX_NUMBER[field] for field, value in fields.items())
+    ):
+        # the members ustar cannot hold get the pax headers of tarfile
+        frame_info = tarfile.TarInfo(name=name)
+        frame_info.mode = frame_stat.st_mode & 0o7777
+        frame_info.uname, frame_info.gname = uname, gname
+        for field, value in fields.items():
+            setattr(frame_info, field, value)
+
+        return frame_info.tobuf(format=tarfile.PAX_FORMAT, encoding=tarfile.ENCODING, errors="surrogateescape")
+
+    header = bytearray(
+        USTAR_HEADER.pack(
+            encoded_name,
+            b"%07o\0" % (frame_stat.st_mode & 0o7777),
+            b"%07o\0" % fields["uid"],
+            b"%07o\0" % fields["gid"],
+            b"%011o\0" % fields["size"],
+            b"%011o\0" % fields["mtime"],
+            b" " * 8,
+            tarfile.REGTYPE,
+            b"",
+            tarfile.POSIX_MAGIC,
+            encoded_uname,
+            encoded_gname,
+            USTAR_DEVICE_FIELDS,
+        )
+    )
+    # the checksum is the sum of the header bytes with its own field taken for spaces
+    header[148:155] = b"%06o\0" % sum(header)
+
+    return bytes(header)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_user_name(uid: int) -> str:
+    with contextlib.suppress(KeyError):
+        if pwd is not None:
+            return pwd.getpwuid(uid).pw_name
+
+    return ""
+
+
+@functools.lru_cache(maxsize=None)
+def _get_group_name(gid: int) -> str:
+    with contextlib.suppress(KeyError):
+        if grp is not None:
+            return grp.getgrgid(gid).gr_name
+
+    return ""
+
+
+def _write(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]  # noqa E203
+
+
+def _read_write(in_fd: int, out_fd: int, count: int) -> int:
+    data = os.read(in_fd, min(count, CHUNK_SIZE))
+    _write(fd=out_fd, data=data)
+
+    return len(data)
+
+
+def _copy_file_range(in_fd: int, out_fd: int, count: int) -> int:
+    return os.copy_file_range(in_fd, out_fd, count)
+
+
+def _sendfile(in_fd: int, out_fd: int, count: int) -> int:
+    return os.sendfile(out_fd, in_fd, None, count)
+
+
+# the copies tried in turn, the ones refused by the kernel are dropped for the following files. The list is shared by
+# the archiving threads, so it is only read and changed under the lock
+_copies = [
+    copy for copy, name in ((_copy_file_range, "copy_file_range"), (_sendfile, "sendfile")) if hasattr(os, name)
+]
+_copies.append(_read_write)
+_copies_lock = threading.Lock()
+
+
+def _copy_data(in_fd: int, out_fd: int, size: int) -> None:
+    remaining = size
+    while remaining > 0:
+        with _copies_lock:
+            copy = _copies[0]
+
+        try:
+            copied = copy(in_fd=in_fd, out_fd=out_fd, count=remaining)
+        except OSError as e:
+            if copy is _read_write or e.errno not in KERNEL_COPY_UNSUPPORTED_ERRORS:
+                raise
+
+            # another thread may have dropped the copy already
+            with _copies_lock:
+                if copy in _copies:
+                    _copies.remove(copy)
+            continue
+
+        if copied == 0:
+            raise EOFError(f"The file ended {remaining} bytes before its size of {size} bytes")
+
+        remaining -= copied
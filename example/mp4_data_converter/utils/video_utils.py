@@ -1,8 +1,9 @@
 import contextlib
 import json
 import subprocess
+from fractions import Fraction
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 
 def retrieve_video_metadata_from_video_file(video_file_path: Path) -> Dict[str, Any]:
@@ -34,6 +35,68 @@ def retrieve_video_metadata_from_video_file(video_file_path: Path) -> Dict[str,
     }
 
 
+def estimate_frames_count(video_metadata: Dict[str, Any]) -> Optional[int]:
+    # the duration of the video stream is not always known, e.g. for some streams remuxed without an index
+    duration = float(video_metadata.get("duration", -1))
+    if duration < 0 or "avg_frame_rate" not in video_metadata:
+        return None
+
+    return round(duration * Fraction(video_metadata["avg_frame_rate"]))
+
+
+def retrieve_frame_timestamps_from_video_file(video_file_path: Path) -> Tuple[List[float], List[int]]:
+    cmd = [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-print_format",
+        "json",
+        str(video_file_path),
+    ]
+
+    ffprobe_output = json.loads(subprocess.check_output(cmd).decode("utf-8"))
+
+    # packets are listed in the decoding order, frames are numbered in the presentation one
+    packets = sorted(
+        (float(packet["pts_time"]), "K" in packet.get("flags", ""))
+        for packet in ffprobe_output.get("packets", [])
+        if packet.get("pts_time", "N/A") != "N/A"
+    )
+
+    frame_timestamps = [pts_time for pts_time, _ in packets]
+    keyframes = [idx for idx, (_, is_keyframe) in enumerate(packets) if is_keyframe]
+
+    return frame_timestamps, keyframes
+
+
+def retrieve_frames_count_from_video_file(video_file_path: Path) -> Optional[int]:
+    # the number of frames the container records for the video stream, not known for every container, e.g. Matroska
+    cmd = [
+        "ffprobe",
+        "-v",
+        "quiet",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=nb_frames",
+        "-print_format",
+        "json",
+        str(video_file_path),
+    ]
+
+    ffprobe_output = json.loads(subprocess.check_output(cmd).decode("utf-8"))
+
+    streams = ffprobe_output.get("streams", [])
+    with contextlib.suppress(KeyError, IndexError, ValueError):
+        return int(streams[0]["nb_frames"])
+
+    return None
+
+
 def _get_video_metadata(video_path: Path) -> Dict[str, Any]:
     cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_streams", "-show_format", str(video_path)]
 
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional
 
+from src.integration_pipeline.base.work_units import WorkUnits
+
 
 class PipelineElement(ABC):
     def __init__(self, settings: Optional[Dict[str, Any]] = None) -> None:
         self._settings = settings
+        self._work_units = None
 
     @abstractmethod
     def run(self, inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -13,3 +16,17 @@ class PipelineElement(ABC):
     @abstractmethod
     def cleanup(self, outputs: Optional[Dict[str, Any]]) -> None:
         raise NotImplementedError
+
+    def close(self) -> None:
+        # releases the resources kept between the runs, e.g. the clients of the services, once the element is discarded
+        pass
+
+    def attach_work_units(self, work_units: Optional[WorkUnits]) -> None:
+        self._work_units = work_units
+
+    def _is_work_unit_finished(self, work_unit: str) -> bool:
+        return self._work_units is not None and self._work_units.is_finished(work_unit=work_unit)
+
+    def _finish_work_unit(self, work_unit: str) -> None:
+        if self._work_units is not None:
+            self._work_units.finish(work_unit=work_unit)
@@ -0,0 +1,19 @@
+from typing import Any, Callable, Dict, Optional
+
+REGISTER_DECORATOR = "register_pipeline_element"
+
+_registered_pipeline_elements: Dict[str, Any] = {}
+
+
+def register_pipeline_element(name: Optional[str] = None) -> Callable[[Any], Any]:
+    # the pipeline definition refers to the element by the given name, or by its class name without one
+    def _register(element_class: Any) -> Any:
+        _registered_pipeline_elements[name or element_class.__name__] = element_class
+
+        return element_class
+
+    return _register
+
+
+def get_registered_pipeline_element(name: str) -> Optional[Any]:
+    return _registered_pipeline_elements.get(name)
@@ -0,0 +1,13 @@
+from abc import abstractmethod
+from typing import Any, Dict, Mapping, Optional
+
+from src.integration_pipeline.base.pipeline_element import PipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+
+
+class StreamingPipelineElement(PipelineElement):
+    @abstractmethod
+    def run_stream(
+        self, inputs: Mapping[str, Any], outputs: Optional[Dict[str, Any]], stream: WorkStream
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
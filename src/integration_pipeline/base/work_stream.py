@@ -0,0 +1,87 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.utils.metrics import STREAM_WAIT_SECONDS
+
+END_OF_STREAM = object()
+
+
+class StreamCancelledError(Exception):
+    pass
+
+
+class WorkStream:
+    def __init__(
+        self,
+        source: Optional[queue.Queue],
+        sink: Optional[queue.Queue],
+        publish: Callable[[Dict[str, Any]], None],
+        cancelled: threading.Event,
+        poll_interval: float = 0.1,
+        name: str = "",
+    ) -> None:
+        self._source = source
+        self._sink = sink
+        self._publish = publish
+        self._cancelled = cancelled
+        self._poll_interval = poll_interval
+        self._receive_wait_seconds = STREAM_WAIT_SECONDS.labels(element=name, direction="receive")
+        self._send_wait_seconds = STREAM_WAIT_SECONDS.labels(element=name, direction="send")
+
+        self._source_exhausted = source is None
+
+    def receive(self) -> Iterator[Any]:
+        while not self._source_exhausted:
+            unit = self._get()
+            if unit is END_OF_STREAM:
+                self._source_exhausted = True
+                return
+
+            yield unit
+
+    def send(self, unit: Any) -> None:
+        if self._sink is None:
+            return
+
+        self._put(unit)
+
+    def publish(self, outputs: Dict[str, Any]) -> None:
+        self._publish(outputs)
+
+    def drain(self) -> None:
+        for _ in self.receive():
+            pass
+
+    def close(self) -> None:
+        if self._sink is not None:
+            self._put(END_OF_STREAM)
+
+    def _get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            while True:
+                self._raise_if_cancelled()
+                try:
+                    return self._source.get(timeout=self._poll_interval)
+                except queue.Empty:
+                    continue
+        finally:
+            self._receive_wait_seconds.inc(time.perf_counter() - start)
+
+    def _put(self, unit: Any) -> None:
+        start = time.perf_counter()
+        try:
+            while True:
+                self._raise_if_cancelled()
+                try:
+                    return self._sink.put(unit, timeout=self._poll_interval)
+                except queue.Full:
+                    continue
+        finally:
+            self._send_wait_seconds.inc(time.perf_counter() - start)
+
+    def _raise_if_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise StreamCancelledError("the stream was cancelled because another pipeline element failed")
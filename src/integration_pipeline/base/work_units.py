@@ -0,0 +1,10 @@
+from typing import Protocol
+
+
+class WorkUnits(Protocol):
+    # the work units of an element finished by earlier runs, e.g. kept in the journal of the orchestrator
+    def is_finished(self, work_unit: str) -> bool:
+        ...
+
+    def finish(self, work_unit: str) -> None:
+        ...
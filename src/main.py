@@ -1,12 +1,22 @@
 import logging
+import signal
 import sys
+import threading
+from datetime import datetime
 from pathlib import Path
 
+from src.orchestrator.artifact_store import ArtifactStore
+from src.orchestrator.batch_runner import BatchRunner
+from src.orchestrator.job_server import JobPool, JobServer
 from src.orchestrator.orchestrator import Orchestrator
 from src.orchestrator.pipeline_modules import PipelineModules
+from src.orchestrator.profiler import ElementProfiler
+from src.orchestrator.watch_runner import WatchRunner
 from src.orchestrator.yaml_parser import YAMLParser
 from src.utils.logger import configure_logging
+from src.utils.metrics import start_metrics_server, write_metrics_textfile
 from src.utils.settings import Settings
+from src.utils.tracing import enable_tracing, write_trace
 
 if __name__ == "__main__":
     configure_logging()
@@ -17,12 +27,101 @@ if __name__ == "__main__":
     working_directory = Path.cwd()
 
     pipeline_modules_path = working_directory / "example" / "mp4_data_converter" / "integration_pipeline"
-    pipeline_definition_file = pipeline_modules_path / "pipeline_definition.yml"
+    pipeline_definition_file = settings.pipeline_definition_file or pipeline_modules_path / "pipeline_definition.yml"
 
     yaml_parser = YAMLParser()
 
+    if settings.metrics_port is not None:
+        logging.info(f"serving metrics on port {settings.metrics_port}")
+        start_metrics_server(port=settings.metrics_port)
+
+    if settings.trace_file is not None:
+        enable_tracing(process_name="orchestrator")
+
+    if settings.batch_mode:
+        batch_runner = BatchRunner(
+            yaml_parser=yaml_parser,
+            pipeline_definition_file=pipeline_definition_file,
+            modules_path=pipeline_modules_path,
+            working_directory=working_directory,
+            settings=settings,
+        )
+
+        logging.info("running pipeline in batch mode")
+        if failed_input_files := batch_runner.run():
+            sys.exit(f"Failed to process {len(failed_input_files)} input files: {failed_input_files}")
+
+        sys.exit()
+
+    if settings.watch_mode:
+        watch_runner = WatchRunner(
+            yaml_parser=yaml_parser,
+            pipeline_definition_file=pipeline_definition_file,
+            modules_path=pipeline_modules_path,
+            working_directory=working_directory,
+            settings=settings,
+        )
+
+        logging.info("running pipeline in watch mode")
+        watch_runner.run()
+
+        sys.exit()
+
+    if settings.job_server_mode:
+        job_pool = JobPool(
+            yaml_parser=yaml_parser,
+            pipeline_definition_file=pipeline_definition_file,
+            modules_path=pipeline_modules_path,
+            working_directory=working_directory,
+            settings=settings,
+        )
+        job_pool.start()
+
+        job_server = JobServer(server_address=(settings.job_server_host, settings.job_server_port), job_pool=job_pool)
+
+        # the server is shut down from another thread, as shutdown waits for serve_forever to return
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, lambda *_: threading.Thread(target=job_server.shutdown).start())
+
+        logging.info(f"serving the job API on {settings.job_server_host}:{settings.job_server_port}")
+        try:
+            job_server.serve_forever()
+        finally:
+            job_server.server_close()
+            job_pool.stop()
+
+            if settings.trace_file is not None:
+                logging.info(f"writing the trace of the jobs into the {settings.trace_file}")
+                write_trace(trace_file=settings.trace_file)
+
+        sys.exit()
+
+    artifact_store = None
+    if settings.memoization_directory is not None:
+        artifact_store = ArtifactStore(
+            directory=settings.memoization_directory,
+            max_size_bytes=settings.memoization_max_size_mb * 2**20,
+            fingerprint_mode=settings.memoization_fingerprint,
+        )
+
+    profiler = None
+    if settings.profile:
+        profiler = ElementProfiler(
+            directory=settings.profiles_directory / datetime.utcnow().strftime("%Y_%m_%d_%H_%M_%S"),
+            modes=ElementProfiler.parse_modes(profile=settings.profile),
+        )
+
     pipeline_modules = PipelineModules(modules_path=pipeline_modules_path, working_directory=working_directory)
-    orchestrator = Orchestrator(yaml_parser=yaml_parser, pipeline_modules=pipeline_modules)
+    orchestrator = Orchestrator(
+        yaml_parser=yaml_parser,
+        pipeline_modules=pipeline_modules,
+        execution_mode=settings.execution_mode,
+        stream_queue_size=settings.stream_queue_size,
+        dag_workers=settings.dag_workers,
+        journal_file=settings.journal_file if settings.resume else None,
+        artifact_store=artifact_store,
+        profiler=profiler,
+    )
 
     try:
         logging.info("initializing  pipeline elements")
@@ -37,3 +136,11 @@ if __name__ == "__main__":
 
     finally:
         orchestrator.cleanup()
+        orchestrator.close_pipeline_elements()
+
+        if settings.metrics_textfile is not None:
+            write_metrics_textfile(textfile=settings.metrics_textfile)
+
+        if settings.trace_file is not None:
+            logging.info(f"writing the trace of the run into the {settings.trace_file}")
+            write_trace(trace_file=settings.trace_file)
@@ -0,0 +1,228 @@
+import contextlib
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.utils.settings import IN_MEMORY_VARIABLE, FingerprintMode
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CHUNK_SIZE = 1 << 20
+# the ioctl cloning a whole file on the copy-on-write file systems of Linux, e.g. btrfs and xfs
+FICLONE = 0x40049409
+OUTPUTS_FILE = "outputs.json"
+ARTIFACTS_DIRECTORY = "artifacts"
+
+
+class ArtifactStore:
+    def __init__(
+        self, directory: Path, max_size_bytes: int, fingerprint_mode: FingerprintMode = FingerprintMode.stat
+    ) -> None:
+        self._directory = directory
+        self._max_size_bytes = max_size_bytes
+        self._fingerprint_mode = fingerprint_mode
+        self._eviction_lock = threading.Lock()
+        self._source_digests = {}
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._evict()
+
+    def get_key(
+        self,
+        element_object: Any,
+        settings: Optional[Dict[str, Any]],
+        inputs: Dict[str, Any],
+        outputs: Optional[Dict[str, Any]],
+    ) -> str:
+        element_class = type(element_object)
+        key = hashlib.sha256(
+            json.dumps(
+                {
+                    "class": f"{element_class.__module__}.{element_class.__qualname__}",
+                    "settings": settings,
+                    "outputs": outputs,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        )
+
+        # a change of the element's module or of the modules it imports from the same package, e.g. the helpers which
+        # produce its artifacts, invalidates its results as well; the code of other packages and external tools, e.g.
+        # ffmpeg, is not covered
+        key.update(self._get_source_digest(element_class=element_class).encode("utf-8"))
+
+        for input_key, value in sorted(inputs.items()):
+            key.update(f"{input_key}\0".encode("utf-8"))
+            if self._is_path(value=value):
+                self._update_with_path(key=key, path=Path(value))
+            else:
+                key.update(json.dumps(value, sort_keys=True, default=str).encode("utf-8"))
+
+        return key.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._directory / key
+        try:
+            recorded_outputs = json.loads((entry / OUTPUTS_FILE).read_text())
+            # the modification time tracks the recent use, as the access time is not reliable on noatime mounts
+            os.utime(entry / OUTPUTS_FILE)
+        except FileNotFoundError:
+            return None
+
+        outputs = {}
+        for output_key, recorded_output in recorded_outputs.items():
+            if "path" not in recorded_output:
+                outputs[output_key] = recorded_output["value"]
+                continue
+
+            destination = Path(recorded_output["path"])
+            self._copy_tree(source=entry / ARTIFACTS_DIRECTORY / output_key, destination=destination)
+            outputs[output_key] = destination
+
+        return outputs
+
+    def put(self, key: str, outputs: Dict[str, Any], outputs_definition: Optional[Dict[str, Any]]) -> None:
+        recorded_outputs = {}
+        artifacts = {}
+        for output_key, value in outputs.items():
+            declared_value = (outputs_definition or {}).get(output_key)
+            if declared_value not in (None, IN_MEMORY_VARIABLE) and self._is_path(value=value):
+                recorded_outputs[output_key] = {"path": str(value)}
+                artifacts[output_key] = Path(value)
+                continue
+
+            try:
+                recorded_outputs[output_key] = {"value": json.loads(json.dumps(value))}
+            except (TypeError, ValueError):
+                logging.debug(f"the output '{output_key}' can not be serialized, so the outputs are not memoized")
+                return
+
+        # entries are assembled aside and renamed into place, so concurrent runs never see a partial entry
+        temporary_entry = Path(tempfile.mkdtemp(dir=self._directory, prefix=f".{key}."))
+        try:
+            for output_key, path in artifacts.items():
+                self._copy_tree(source=path, destination=temporary_entry / ARTIFACTS_DIRECTORY / output_key)
+
+            (temporary_entry / OUTPUTS_FILE).write_text(json.dumps(recorded_outputs))
+            os.rename(temporary_entry, self._directory / key)
+        except OSError:
+            # the entry already exists, e.g. stored by a concurrent run of the same element
+            shutil.rmtree(temporary_entry, ignore_errors=True)
+            return
+
+        self._evict()
+
+    @staticmethod
+    def _is_path(value: Any) -> bool:
+        return isinstance(value, (str, Path)) and value != IN_MEMORY_VARIABLE and Path(value).exists()
+
+    def _update_with_path(self, key: Any, path: Path) -> None:
+        files = sorted(file for file in path.rglob("*") if file.is_file()) if path.is_dir() else [path]
+        for file in files:
+            key.update(f"{file.relative_to(path)}\0".encode("utf-8"))
+            if self._fingerprint_mode == FingerprintMode.content:
+                self._update_with_file(key=key, file_path=file)
+            else:
+                file_stat = file.stat()
+                key.update(f"{file_stat.st_size}\0{file_stat.st_mtime_ns}\0".encode("utf-8"))
+
+    def _get_source_digest(self, element_class: type) -> str:
+        # the code of a loaded class does not change, so its sources are hashed once per process
+        if element_class not in self._source_digests:
+            key = hashlib.sha256()
+            for source_file in self._get_source_files(element_class=element_class):
+                key.update(f"{source_file.name}\0".encode("utf-8"))
+                self._update_with_file(key=key, file_path=source_file)
+
+            self._source_digests[element_class] = key.hexdigest()
+
+        return self._source_digests[element_class]
+
+    @staticmethod
+    def _get_source_files(element_class: type) -> List[Path]:
+        # the modules imported by the element's module and, in turn, by them, as far as they are in its top-level
+        # package
+        package = element_class.__module__.partition(".")[0]
+        modules = {}
+        pending = [sys.modules.get(element_class.__module__)]
+        while pending:
+            module = pending.pop()
+            if module is None or module.__name__ in modules:
+                continue
+
+            modules[module.__name__] = module
+            for value in vars(module).values():
+                module_name = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+                if isinstance(module_name, str) and module_name.partition(".")[0] == package:
+                    pending.append(sys.modules.get(module_name))
+
+        source_files = []
+        for _, module in sorted(modules.items()):
+            with contextlib.suppress(TypeError, OSError):
+                source_files.append(Path(inspect.getfile(module)))
+
+        return source_files
+
+    @staticmethod
+    def _update_with_file(key: Any, file_path: Path) -> None:
+        with file_path.open("rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                key.update(chunk)
+
+    @staticmethod
+    def _copy_tree(source: Path, destination: Path) -> None:
+        if source.is_dir():
+            destination.mkdir(parents=True, exist_ok=True)
+            files = [(file, destination / file.relative_to(source)) for file in source.rglob("*") if file.is_file()]
+        else:
+            files = [(source, destination)]
+
+        for source_file, destination_file in files:
+            destination_file.parent.mkdir(parents=True, exist_ok=True)
+            destination_file.unlink(missing_ok=True)
+            ArtifactStore._copy_file(source=source_file, destination=destination_file)
+
+    @staticmethod
+    def _copy_file(source: Path, destination: Path) -> None:
+        # the entries never share an inode with the working files, which the elements may rewrite in place on a later
+        # run, so the files are cloned where the file system supports it and copied otherwise
+        with source.open("rb") as source_file, destination.open("wb") as destination_file:
+            try:
+                if fcntl is None:
+                    raise OSError("cloning files is not supported")
+
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+            except OSError:
+                shutil.copyfileobj(source_file, destination_file, CHUNK_SIZE)
+
+        # the modification times are kept, so the fingerprints of the restored files stay the same
+        shutil.copystat(source, destination)
+
+    def _evict(self) -> None:
+        with self._eviction_lock:
+            entries = []
+            for entry in self._directory.iterdir():
+                with contextlib.suppress(FileNotFoundError, NotADirectoryError):
+                    entry_size = sum(file.stat().st_size for file in entry.rglob("*") if file.is_file())
+                    entries.append(((entry / OUTPUTS_FILE).stat().st_mtime, entry_size, entry))
+
+            store_size = sum(size for _, size, _ in entries)
+            for _, size, entry in sorted(entries):
+                if store_size <= self._max_size_bytes:
+                    break
+
+                logging.debug(f"evicting the least recently used {entry} from the artifact store")
+                shutil.rmtree(entry, ignore_errors=True)
+                store_size -= size
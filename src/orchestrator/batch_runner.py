@@ -0,0 +1,163 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import yaml
+
+from src.orchestrator.artifact_store import ArtifactStore
+from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.pipeline_modules import PipelineModules
+from src.orchestrator.profiler import ElementProfiler
+from src.orchestrator.workspace import RunWorkspace, get_input_directory
+from src.orchestrator.yaml_parser import YAMLParser
+from src.utils.metrics import write_metrics_textfile
+from src.utils.settings import Settings
+from src.utils.tracing import enable_tracing, write_trace, write_trace_part
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        yaml_parser: YAMLParser,
+        pipeline_definition_file: Path,
+        modules_path: Path,
+        working_directory: Path,
+        settings: Settings,
+    ) -> None:
+        self._yaml_parser = yaml_parser
+        self._pipeline_definition_file = pipeline_definition_file
+        self._modules_path = modules_path
+        self._working_directory = working_directory
+        self._settings = settings
+
+    def run(self) -> List[Path]:
+        jobs = self._prepare_jobs()
+        if not jobs:
+            logging.warning(f"no input files matching '{self._settings.batch_input_pattern}' were found")
+            return []
+
+        logging.info(f"started to process {len(jobs)} input files with {self._settings.batch_workers} workers")
+
+        failed_input_files = []
+        with ProcessPoolExecutor(max_workers=self._settings.batch_workers) as executor:
+            futures = {
+                executor.submit(
+                    _run_batch_job,
+                    pipeline_definition_file=pipeline_definition_file,
+                    modules_path=self._modules_path,
+                    working_directory=self._working_directory,
+                    settings=self._settings,
+                ): (input_file, workspace)
+                for input_file, (workspace, pipeline_definition_file) in jobs.items()
+            }
+
+            for future in as_completed(futures):
+                input_file, workspace = futures[future]
+                try:
+                    succeeded = future.result()
+                except Exception as e:
+                    logging.exception(f"the batch worker processing {input_file} crashed: {e}")
+                    succeeded = False
+
+                # with resuming enabled the workspace of a failed run is kept for the next run to continue from
+                if succeeded or not self._settings.resume:
+                    workspace.cleanup()
+
+                if succeeded:
+                    logging.info(f"finished processing {input_file}")
+                else:
+                    logging.error(f"failed to process {input_file}")
+                    failed_input_files.append(input_file)
+
+                # the metrics of the worker processes are exported only with PROMETHEUS_MULTIPROC_DIR set
+                if self._settings.metrics_textfile is not None:
+                    write_metrics_textfile(textfile=self._settings.metrics_textfile)
+
+        logging.info(f"processed {len(jobs) - len(failed_input_files)} of {len(jobs)} input files")
+
+        if self._settings.trace_file is not None:
+            logging.info(f"writing the trace of the batch into the {self._settings.trace_file}")
+            write_trace(trace_file=self._settings.trace_file)
+
+        return sorted(failed_input_files)
+
+    def _prepare_jobs(self) -> Dict[Path, Tuple[RunWorkspace, Path]]:
+        pipeline_definition = self._yaml_parser.get_pipeline_definition(
+            pipeline_definition_file=self._pipeline_definition_file
+        )
+        input_directory = get_input_directory(
+            pipeline_definition=pipeline_definition, input_key=self._settings.batch_input_key
+        )
+
+        jobs = {}
+        for input_file in sorted(input_directory.glob(self._settings.batch_input_pattern)):
+            # every input file gets its own workspace and output directories, named after the whole file name as the
+            # pattern may match files differing in the extension alone, so parallel runs never overlap
+            workspace = RunWorkspace(root_directory=self._settings.workspaces_directory, run_id=input_file.name)
+            workspace.create()
+
+            scoped_pipeline_definition = workspace.scope_pipeline_definition(
+                pipeline_definition=pipeline_definition,
+                inputs={self._settings.batch_input_key: str(workspace.stage_input_file(input_file=input_file))},
+                outputs_subdirectory=input_file.name,
+            )
+
+            pipeline_definition_file = workspace.directory / "pipeline_definition.yml"
+            with pipeline_definition_file.open("w") as f:
+                yaml.safe_dump({"elements": scoped_pipeline_definition}, f, sort_keys=False)
+
+            jobs[input_file] = (workspace, pipeline_definition_file)
+
+        return jobs
+
+
+def _run_batch_job(
+    pipeline_definition_file: Path, modules_path: Path, working_directory: Path, settings: Settings
+) -> bool:
+    if settings.trace_file is not None:
+        enable_tracing(process_name="batch worker")
+
+    # every worker process opens the shared store, its entries appear atomically and are safe to use concurrently
+    artifact_store = None
+    if settings.memoization_directory is not None:
+        artifact_store = ArtifactStore(
+            directory=settings.memoization_directory,
+            max_size_bytes=settings.memoization_max_size_mb * 2**20,
+            fingerprint_mode=settings.memoization_fingerprint,
+        )
+
+    # the profiles of every batch run are kept apart, in a directory named after its workspace
+    profiler = None
+    if settings.profile:
+        profiler = ElementProfiler(
+            directory=settings.profiles_directory / pipeline_definition_file.parent.name,
+            modes=ElementProfiler.parse_modes(profile=settings.profile),
+        )
+
+    pipeline_modules = PipelineModules(modules_path=modules_path, working_directory=working_directory)
+    orchestrator = Orchestrator(
+        yaml_parser=YAMLParser(),
+        pipeline_modules=pipeline_modules,
+        execution_mode=settings.execution_mode,
+        stream_queue_size=settings.stream_queue_size,
+        dag_workers=settings.dag_workers,
+        journal_file=pipeline_definition_file.with_name("journal.json") if settings.resume else None,
+        artifact_store=artifact_store,
+        profiler=profiler,
+    )
+
+    try:
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=pipeline_definition_file)
+        orchestrator.run_pipeline_element()
+    except (Exception, SystemExit) as e:
+        logging.exception(f"Unexpected error occurred while running {pipeline_definition_file}: {e}")
+        return False
+    finally:
+        orchestrator.cleanup()
+        orchestrator.close_pipeline_elements()
+
+        if settings.trace_file is not None:
+            write_trace_part(trace_file=settings.trace_file)
+
+    return True
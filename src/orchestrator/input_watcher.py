@@ -0,0 +1,161 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+
+class Inotify:
+    def __init__(self, directory: Path) -> None:
+        # the libc functions are called directly, so watching needs no extra dependency, and it raises OSError where
+        # inotify is not available (other platforms, exhausted watches), which makes the watcher poll instead
+        try:
+            self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_init1, inotify_add_watch = self._libc.inotify_init1, self._libc.inotify_add_watch
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify is not available: {e}")
+
+        self._fd = inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        if inotify_add_watch(self._fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"watching {directory} failed")
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        # returns the names of the files written or moved into the directory and whether some events were lost
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return [], False
+
+        try:
+            buffer = os.read(self._fd, INOTIFY_BUFFER_SIZE)
+        except BlockingIOError:
+            return [], False
+
+        names = []
+        overflowed = False
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif length:
+                names.append(os.fsdecode(buffer[offset : offset + length].rstrip(b"\0")))  # noqa E203
+            offset += length
+
+        return names, overflowed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class InputWatcher:
+    def __init__(self, directory: Path, pattern: str, poll_interval: float = 1.0, polling: bool = False) -> None:
+        self._directory = directory
+        self._pattern = pattern
+        self._poll_interval = poll_interval
+        self._polling = polling
+
+        self._pending: Dict[Path, Optional[Tuple[int, int]]] = {}
+        self._seen: Dict[Path, Tuple[int, int]] = {}
+        self._checked_at = 0.0
+
+    def watch(self, stop: threading.Event) -> Iterator[Path]:
+        # yields every input file once it is completely written: right after inotify reports it closed or moved in,
+        # or, for the files found by scanning the directory, once it has not changed for a poll interval
+        inotify = self._open_inotify()
+        self._scan()
+        try:
+            while not stop.is_set():
+                if inotify is None:
+                    stop.wait(timeout=self._poll_interval)
+                    self._scan()
+                else:
+                    names, overflowed = inotify.read(timeout=self._poll_interval)
+                    if overflowed:
+                        logging.warning(f"missed some changes of the {self._directory}, scanning it again")
+                        self._scan()
+
+                    # a file reported by inotify has just been written, so it is processed even if seen before
+                    for name in names:
+                        if fnmatch.fnmatch(name, self._pattern):
+                            self._pending.pop(self._directory / name, None)
+                            self._seen.pop(self._directory / name, None)
+                            yield from self._get_unseen(input_files=[self._directory / name])
+
+                yield from self._get_unseen(input_files=self._get_settled_files())
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+    def _open_inotify(self) -> Optional[Inotify]:
+        if self._polling:
+            logging.info(f"polling the {self._directory} every {self._poll_interval} seconds")
+            return None
+
+        try:
+            return Inotify(directory=self._directory)
+        except OSError as e:
+            logging.warning(f"polling the {self._directory} every {self._poll_interval} seconds, {e}")
+            return None
+
+    def _scan(self) -> None:
+        input_files = set(self._directory.glob(self._pattern))
+        for input_file in input_files:
+            if input_file not in self._pending and self._seen.get(input_file) != self._get_signature(input_file):
+                self._pending[input_file] = None
+
+        # the inputs moved away or removed are forgotten, so an input added again under the same name is processed
+        for input_file in set(self._seen) - input_files:
+            del self._seen[input_file]
+
+    def _get_settled_files(self) -> List[Path]:
+        # inotify events wake the watcher up at any time, while a file has to stay unchanged for about an interval
+        if time.monotonic() - self._checked_at < self._poll_interval / 2:
+            return []
+
+        self._checked_at = time.monotonic()
+        settled_files = []
+        for input_file, signature in list(self._pending.items()):
+            current_signature = self._get_signature(input_file=input_file)
+            if current_signature is None:
+                del self._pending[input_file]
+            elif current_signature == signature:
+                del self._pending[input_file]
+                settled_files.append(input_file)
+            else:
+                self._pending[input_file] = current_signature
+
+        return sorted(settled_files)
+
+    def _get_unseen(self, input_files: List[Path]) -> Iterator[Path]:
+        for input_file in input_files:
+            signature = self._get_signature(input_file=input_file)
+            if signature is not None and self._seen.get(input_file) != signature:
+                self._seen[input_file] = signature
+                yield input_file
+
+    @staticmethod
+    def _get_signature(input_file: Path) -> Optional[Tuple[int, int]]:
+        try:
+            file_stat = input_file.stat()
+        except OSError:
+            return None
+
+        return file_stat.st_size, file_stat.st_mtime_ns
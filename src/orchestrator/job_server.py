@@ -0,0 +1,334 @@
+import collections
+import copy
+import json
+import logging
+import queue
+import re
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel, ValidationError
+from strenum import StrEnum
+
+from src.orchestrator.pipeline_worker import PipelineWorker
+from src.orchestrator.yaml_parser import YAMLParser
+from src.utils.metrics import write_metrics_textfile
+from src.utils.progress import RunProgress
+from src.utils.settings import ELEMENT_KEY, NAME, OBJECT, SETTINGS, Settings
+
+JOB_PATH_PATTERN = re.compile(r"^/jobs(?:/(?P<job_id>[0-9a-f]+))?$")
+MAX_FINISHED_JOBS = 1000
+RETRY_AFTER_SECONDS = 5
+
+
+class JobState(StrEnum):
+    queued: str = "queued"
+    running: str = "running"
+    succeeded: str = "succeeded"
+    failed: str = "failed"
+    cancelled: str = "cancelled"
+
+
+class JobRequest(BaseModel):
+    input_file: Path
+    # the settings of the pipeline elements overridden for the job, by the element name
+    settings: Dict[str, Dict[str, Any]] = {}
+
+
+class JobPoolFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, input_file: Path, settings: Dict[str, Dict[str, Any]], elements: List[str]) -> None:
+        self.job_id = uuid.uuid4().hex
+        self.input_file = input_file
+        self.settings = settings
+        self.progress = RunProgress(elements=elements)
+        self.state = JobState.queued
+        self.outputs = None
+        self.error = None
+        self.submitted_at = datetime.now(tz=timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "state": self.state,
+            "input_file": str(self.input_file),
+            "settings": self.settings,
+            "progress": self.progress.to_dict(),
+            "outputs": json.loads(json.dumps(self.outputs, default=str)),
+            "error": self.error,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at is not None else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at is not None else None,
+        }
+
+
+class JobPool:
+    def __init__(
+        self,
+        yaml_parser: YAMLParser,
+        pipeline_definition_file: Path,
+        modules_path: Path,
+        working_directory: Path,
+        settings: Settings,
+    ) -> None:
+        self._yaml_parser = yaml_parser
+        self._pipeline_definition_file = pipeline_definition_file
+        self._modules_path = modules_path
+        self._working_directory = working_directory
+        self._settings = settings
+
+        # only the jobs waiting for a worker are queued, so the pool holds at most job_workers + job_queue_size jobs
+        self._queue = queue.Queue(maxsize=settings.job_queue_size)
+        self._jobs: Dict[str, Job] = collections.OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._workers = []
+        self._threads = []
+        self._stopped = False
+
+    def start(self) -> None:
+        # the workers are initialized up front, so an invalid pipeline definition fails the start instead of the jobs
+        for _ in range(self._settings.job_workers):
+            pipeline_worker = self._create_pipeline_worker(pipeline_definition_file=self._pipeline_definition_file)
+            pipeline_worker.initialize()
+            self._workers.append(pipeline_worker)
+
+        for idx, pipeline_worker in enumerate(self._workers):
+            thread = threading.Thread(target=self._work, args=(pipeline_worker,), name=f"job_worker_{idx}")
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, input_file: Path, settings: Dict[str, Dict[str, Any]]) -> Job:
+        elements = [element[NAME] for element in self._workers[0].pipeline_definition]
+        if unknown_elements := settings.keys() - set(elements):
+            raise ValueError(f"The pipeline has no {', '.join(sorted(unknown_elements))} elements.")
+
+        fixed_settings = [
+            f"{element}.{key}"
+            for element, element_settings in settings.items()
+            for key in element_settings
+            if key not in self._settings.job_overridable_settings
+        ]
+        if fixed_settings:
+            raise ValueError(f"The settings {', '.join(sorted(fixed_settings))} cannot be overridden by a job.")
+
+        job = Job(input_file=input_file, settings=settings, elements=elements)
+        with self._jobs_lock:
+            if self._stopped:
+                raise JobPoolFullError("The job pool is stopping.")
+
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobPoolFullError(f"All {self._settings.job_queue_size} places in the job queue are taken.")
+
+            self._jobs[job.job_id] = job
+            self._forget_finished_jobs()
+
+        logging.info(f"queued job {job.job_id} processing {input_file}")
+
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self) -> List[Job]:
+        with self._jobs_lock:
+            return list(self._jobs.values())
+
+    def get_status(self) -> Dict[str, Any]:
+        jobs = self.get_jobs()
+
+        return {
+            "workers": len(self._workers),
+            "queue_size": self._settings.job_queue_size,
+            "queued": sum(job.state == JobState.queued for job in jobs),
+            "running": sum(job.state == JobState.running for job in jobs),
+        }
+
+    def stop(self) -> None:
+        # the running jobs are finished, while the queued ones are cancelled
+        with self._jobs_lock:
+            self._stopped = True
+
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            job.state = JobState.cancelled
+            job.finished_at = datetime.now(tz=timezone.utc)
+
+        for _ in self._threads:
+            self._queue.put(None)
+
+        for thread in self._threads:
+            thread.join()
+
+        for pipeline_worker in self._workers:
+            pipeline_worker.close()
+
+    def _work(self, pipeline_worker: PipelineWorker) -> None:
+        while (job := self._queue.get()) is not None:
+            job.state = JobState.running
+            job.started_at = datetime.now(tz=timezone.utc)
+            logging.info(f"started job {job.job_id} processing {job.input_file}")
+
+            try:
+                job_pipeline_worker = pipeline_worker
+                if job.settings:
+                    job_pipeline_worker = self._create_job_pipeline_worker(job=job)
+
+                try:
+                    # the results of every job go into a directory of its own, named after the job
+                    job.outputs = job_pipeline_worker.run(
+                        input_file=job.input_file, run_id=job.job_id, progress=job.progress, isolate_outputs=True
+                    )
+                finally:
+                    # the elements initialized for the job alone are not reused, so their clients are released at once
+                    if job.settings:
+                        job_pipeline_worker.close()
+
+                job.state = JobState.succeeded
+                logging.info(f"finished job {job.job_id}")
+            except (Exception, SystemExit) as e:
+                job.error = str(e)
+                job.state = JobState.failed
+                logging.error(f"job {job.job_id} failed: {e}")
+
+            job.finished_at = datetime.now(tz=timezone.utc)
+
+            if self._settings.metrics_textfile is not None:
+                write_metrics_textfile(textfile=self._settings.metrics_textfile)
+
+    def _create_job_pipeline_worker(self, job: Job) -> PipelineWorker:
+        # the elements with overridden settings are initialized for the job alone
+        pipeline_definition = []
+        for element in self._workers[0].pipeline_definition:
+            job_element = copy.deepcopy(
+                {key: value for key, value in element.items() if key not in (OBJECT, ELEMENT_KEY)}
+            )
+            if element[NAME] in job.settings:
+                job_element[SETTINGS] = {**(job_element.get(SETTINGS) or {}), **job.settings[element[NAME]]}
+
+            pipeline_definition.append(job_element)
+
+        with tempfile.TemporaryDirectory(prefix=f"job_{job.job_id}_") as directory:
+            pipeline_definition_file = Path(directory) / "pipeline_definition.yml"
+            with pipeline_definition_file.open("w") as f:
+                yaml.safe_dump({"elements": pipeline_definition}, f, sort_keys=False)
+
+            pipeline_worker = self._create_pipeline_worker(pipeline_definition_file=pipeline_definition_file)
+            pipeline_worker.initialize()
+
+        return pipeline_worker
+
+    def _create_pipeline_worker(self, pipeline_definition_file: Path) -> PipelineWorker:
+        return PipelineWorker(
+            yaml_parser=self._yaml_parser,
+            pipeline_definition_file=pipeline_definition_file,
+            modules_path=self._modules_path,
+            working_directory=self._working_directory,
+            settings=self._settings,
+        )
+
+    def _forget_finished_jobs(self) -> None:
+        finished_jobs = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.state in (JobState.succeeded, JobState.failed, JobState.cancelled)
+        ]
+        for job_id in finished_jobs[: max(len(finished_jobs) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "JobServer"
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(status=HTTPStatus.OK, body=self.server.job_pool.get_status())
+            return
+
+        match = JOB_PATH_PATTERN.match(path)
+        if match is None:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": "Not Found"})
+        elif match["job_id"] is None:
+            self._send_json(
+                status=HTTPStatus.OK, body={"jobs": [job.to_dict() for job in self.server.job_pool.get_jobs()]}
+            )
+        elif (job := self.server.job_pool.get_job(job_id=match["job_id"])) is not None:
+            self._send_json(status=HTTPStatus.OK, body=job.to_dict())
+        else:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": f"Job {match['job_id']} not found"})
+
+    def do_POST(self) -> None:
+        match = JOB_PATH_PATTERN.match(self.path.split("?", 1)[0])
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if match is None or match["job_id"] is not None:
+            self._send_json(status=HTTPStatus.NOT_FOUND, body={"detail": "Not Found"})
+            return
+
+        try:
+            job_request = JobRequest.parse_raw(body)
+        except ValidationError as e:
+            self._send_json(status=HTTPStatus.BAD_REQUEST, body={"detail": e.errors()})
+            return
+
+        if not job_request.input_file.is_file():
+            self._send_json(
+                status=HTTPStatus.UNPROCESSABLE_ENTITY,
+                body={"detail": f"The input file {job_request.input_file} does not exist"},
+            )
+            return
+
+        try:
+            job = self.server.job_pool.submit(input_file=job_request.input_file, settings=job_request.settings)
+        except ValueError as e:
+            self._send_json(status=HTTPStatus.UNPROCESSABLE_ENTITY, body={"detail": str(e)})
+        except JobPoolFullError as e:
+            self._send_json(
+                status=HTTPStatus.TOO_MANY_REQUESTS,
+                body={"detail": str(e)},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        else:
+            self._send_json(
+                status=HTTPStatus.ACCEPTED, body=job.to_dict(), headers={"Location": f"/jobs/{job.job_id}"}
+            )
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status: HTTPStatus, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class JobServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], job_pool: JobPool) -> None:
+        super().__init__(server_address, JobRequestHandler)
+        self.job_pool = job_pool
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.integration_pipeline.base.work_units import WorkUnits
+
+
+class RunJournal:
+    def __init__(self, journal_file: Path, pipeline_definition: List[Dict[str, Any]]) -> None:
+        self._journal_file = journal_file
+        self._lock = threading.Lock()
+
+        # the journal of a changed pipeline definition describes other work, so it is not resumed from
+        self._fingerprint = hashlib.sha256(
+            json.dumps(pipeline_definition, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        self._journal = {"fingerprint": self._fingerprint, "elements": {}, "work_units": {}}
+
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            journal = json.loads(self._journal_file.read_text())
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            logging.warning(f"the run journal {self._journal_file} is corrupted, so the run starts over: {e}")
+            return
+
+        if journal.get("fingerprint") != self._fingerprint:
+            logging.warning(
+                f"the run journal {self._journal_file} belongs to another pipeline definition, ignoring it"
+            )
+            return
+
+        self._journal = journal
+        logging.info(
+            f"resuming the run from {self._journal_file}: {len(self._journal['elements'])} pipeline elements and "
+            f"{sum(len(units) for units in self._journal['work_units'].values())} work units are already finished"
+        )
+
+    def get_element_outputs(self, element_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._journal["elements"].get(element_key)
+
+    def finish_element(self, element_key: str, outputs: Dict[str, Any]) -> None:
+        with self._lock:
+            # the outputs go through json, so paths come back as strings and the in-memory outputs have to be
+            # serializable to be resumed from
+            self._journal["elements"][element_key] = json.loads(json.dumps(outputs, default=str))
+            self._save()
+
+    def is_work_unit_finished(self, element_key: str, work_unit: str) -> bool:
+        with self._lock:
+            return work_unit in self._journal["work_units"].get(element_key, [])
+
+    def finish_work_unit(self, element_key: str, work_unit: str) -> None:
+        with self._lock:
+            self._journal["work_units"].setdefault(element_key, []).append(work_unit)
+            self._save()
+
+    def get_work_units(self, element_key: str) -> "WorkUnitJournal":
+        return WorkUnitJournal(run_journal=self, element_key=element_key)
+
+    def _save(self) -> None:
+        # the journal is replaced atomically, so a run killed while writing it leaves the previous version behind
+        self._journal_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            mode="w", dir=self._journal_file.parent, prefix=f".{self._journal_file.name}", delete=False
+        ) as f:
+            json.dump(self._journal, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(f.name, self._journal_file)
+
+    def remove(self) -> None:
+        logging.debug(f"removing the run journal {self._journal_file}")
+        self._journal_file.unlink(missing_ok=True)
+
+
+class WorkUnitJournal(WorkUnits):
+    def __init__(self, run_journal: RunJournal, element_key: str) -> None:
+        self._run_journal = run_journal
+        self._element_key = element_key
+
+    def is_finished(self, work_unit: str) -> bool:
+        return self._run_journal.is_work_unit_finished(element_key=self._element_key, work_unit=work_unit)
+
+    def finish(self, work_unit: str) -> None:
+        self._run_journal.finish_work_unit(element_key=self._element_key, work_unit=work_unit)
@@ -1,20 +1,56 @@
+import contextlib
+import contextvars
 import logging
+import queue
 import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Set
 
+from src.integration_pipeline.base.pipeline_element import PipelineElement
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import StreamCancelledError, WorkStream
+from src.orchestrator.artifact_store import ArtifactStore
 from src.orchestrator.exceptions import run_exception
+from src.orchestrator.journal import RunJournal
+from src.orchestrator.pipeline_graph import PipelineGraph
 from src.orchestrator.pipeline_modules import PipelineModules
+from src.orchestrator.profiler import ElementProfiler
+from src.orchestrator.streaming import StreamInputs, StreamOutputs
 from src.orchestrator.yaml_parser import YAMLParser
-from src.utils.settings import INPUTS, NAME, OBJECT, OUTPUTS
+from src.utils.metrics import ELEMENT_RESTORED, measure_element
+from src.utils.progress import record_element_finished
+from src.utils.settings import ELEMENT_KEY, INPUTS, MEMOIZE, NAME, OBJECT, OUTPUTS, SETTINGS, ExecutionMode
+from src.utils.tracing import span
 
 
 class Orchestrator:
-    def __init__(self, yaml_parser: YAMLParser, pipeline_modules: PipelineModules) -> None:
+    def __init__(
+        self,
+        yaml_parser: YAMLParser,
+        pipeline_modules: PipelineModules,
+        execution_mode: ExecutionMode = ExecutionMode.sequential,
+        stream_queue_size: int = 8,
+        dag_workers: int = 4,
+        journal_file: Optional[Path] = None,
+        artifact_store: Optional[ArtifactStore] = None,
+        profiler: Optional[ElementProfiler] = None,
+    ) -> None:
         self._yaml_parser = yaml_parser
         self._pipeline_modules = pipeline_modules
+        self._execution_mode = execution_mode
+        self._stream_queue_size = stream_queue_size
+        self._dag_workers = dag_workers
+        self._journal_file = journal_file
+        self._artifact_store = artifact_store
+        self._profiler = profiler
 
         self._pipeline_elements = []
+        self._pipeline_graph = None
+        self._journal = None
+        self._memoization_keys = {}
+        self._finished = False
         self._outputs = {}
 
     def initialize_pipeline_elements(self, pipeline_definition_file: Path) -> None:
@@ -23,27 +59,384 @@ class Orchestrator:
                 pipeline_definition_file=pipeline_definition_file
             )
 
+            if self._journal_file is not None:
+                self._journal = RunJournal(journal_file=self._journal_file, pipeline_definition=pipeline_definition)
+
             pipeline_elements_modules = self._pipeline_modules.get_all_pipeline_element_modules()
 
-            for element in pipeline_definition:
+            for idx, element in enumerate(pipeline_definition):
                 element_class = self._pipeline_modules.get_pipeline_element_class(
                     modules=pipeline_elements_modules, class_name=element[NAME]
                 )
                 element[OBJECT] = element_class(settings=element.get("settings", None))
-        except (KeyError, ModuleNotFoundError, ImportError) as e:
+
+                element[ELEMENT_KEY] = f"{idx}:{element[NAME]}"
+                if self._journal is not None and isinstance(element[OBJECT], PipelineElement):
+                    element[OBJECT].attach_work_units(work_units=self._journal.get_work_units(element[ELEMENT_KEY]))
+        except (KeyError, ValueError, ModuleNotFoundError, ImportError) as e:
             message = f"Pipeline elements modules discovery failed {e}"
             logging.exception(message)
             sys.exit(message)
         else:
             self._pipeline_elements = pipeline_definition
 
-    @run_exception
+        if self._execution_mode == ExecutionMode.dag:
+            try:
+                self._pipeline_graph = PipelineGraph(pipeline_elements=self._pipeline_elements)
+            except ValueError as e:
+                message = f"Pipeline elements dependency graph is invalid: {e}"
+                logging.exception(message)
+                sys.exit(message)
+
+    @property
+    def pipeline_elements(self) -> List[Dict[str, Any]]:
+        return self._pipeline_elements
+
+    @property
+    def outputs(self) -> Dict[str, Any]:
+        return self._outputs
+
+    def start_run(
+        self,
+        pipeline_elements: List[Dict[str, Any]],
+        journal_file: Optional[Path] = None,
+        profiler: Optional[ElementProfiler] = None,
+    ) -> None:
+        # a long running service initializes the elements once and runs them again and again, every run with the
+        # pipeline definition scoped to it (e.g. by a RunWorkspace) and a state of its own
+        self._journal_file = journal_file
+        self._journal = None
+        if journal_file is not None:
+            self._journal = RunJournal(
+                journal_file=journal_file,
+                pipeline_definition=[
+                    {key: value for key, value in element.items() if key not in (OBJECT, ELEMENT_KEY)}
+                    for element in pipeline_elements
+                ],
+            )
+
+        # the work units of the previous run are detached from the reused elements
+        for element in pipeline_elements:
+            if isinstance(element[OBJECT], PipelineElement):
+                work_units = None
+                if self._journal is not None:
+                    work_units = self._journal.get_work_units(element[ELEMENT_KEY])
+
+                element[OBJECT].attach_work_units(work_units=work_units)
+
+        self._pipeline_elements = pipeline_elements
+        if self._execution_mode == ExecutionMode.dag:
+            self._pipeline_graph = PipelineGraph(pipeline_elements=self._pipeline_elements)
+
+        self._profiler = profiler
+        self._memoization_keys = {}
+        self._finished = False
+        self._outputs = {}
+
     def run_pipeline_element(self) -> None:
+        # a minor error is logged and the run still counts as completed, while a major one exits before it is marked
+        self._run_pipeline()
+        self._finished = True
+
+    @run_exception
+    def _run_pipeline(self) -> None:
+        with span(name="pipeline", category="orchestrator", execution_mode=self._execution_mode), self._profile_run():
+            match self._execution_mode:
+                case ExecutionMode.streaming:
+                    self._run_streaming()
+
+                case ExecutionMode.dag:
+                    self._run_dag()
+
+                case _:
+                    self._run_sequentially()
+
+    def _run_sequentially(self) -> None:
         for element in self._pipeline_elements:
-            element[INPUTS].update(self._outputs)
+            self._run_element(element=element)
+
+    def _run_element(self, element: Dict[str, Any]) -> None:
+        element[INPUTS].update(self._outputs)
+
+        outputs = self._get_finished_outputs(element=element)
+        if outputs is None:
+            outputs = self._execute_element(element=element)
+
+        self._outputs.update(outputs)
+
+    def _execute_element(self, element: Dict[str, Any]) -> Dict[str, Any]:
+        with self._instrument(element=element):
             outputs = element[OBJECT].run(inputs=element[INPUTS], outputs=element.get(OUTPUTS))
-            self._validate_pipeline_element(element=element, outputs=outputs)
+
+        self._validate_pipeline_element(element=element, outputs=outputs)
+        self._finish_element(element=element, outputs=outputs)
+        self._memoize_element(element=element, inputs=element[INPUTS], outputs=outputs)
+
+        return outputs
+
+    def _run_dag(self) -> None:
+        remaining = self._pipeline_graph.dependencies
+        outputs = {}
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=self._dag_workers, thread_name_prefix="orchestrator") as executor:
+            running = {}
+            while remaining or running:
+                # once an element has failed, no new elements are scheduled and only the running ones are awaited
+                if not errors:
+                    for idx in sorted(idx for idx, dependencies in remaining.items() if not dependencies):
+                        del remaining[idx]
+
+                        element = self._pipeline_elements[idx]
+                        for ancestor in self._pipeline_graph.get_ancestors(idx):
+                            element[INPUTS].update(outputs[ancestor])
+
+                        logging.info(f"scheduling pipeline element {element[NAME]}")
+                        future = executor.submit(
+                            contextvars.copy_context().run, self._run_dag_element, element=element
+                        )
+                        running[future] = idx
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = running.pop(future)
+                    try:
+                        outputs[idx] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+
+                    for dependencies in remaining.values():
+                        dependencies.discard(idx)
+
+        if errors:
+            raise errors[0]
+
+        for idx in sorted(outputs):
+            self._outputs.update(outputs[idx])
+
+    def _run_dag_element(self, element: Dict[str, Any]) -> Dict[str, Any]:
+        outputs = self._get_finished_outputs(element=element)
+        if outputs is None:
+            outputs = self._execute_element(element=element)
+
+        return outputs
+
+    def _run_streaming(self) -> None:
+        for group in self._get_streaming_groups():
+            if len(group) == 1:
+                self._run_element(element=group[0])
+            else:
+                self._run_stream_group(group=group)
+
+    def _get_streaming_groups(self) -> List[List[Dict[str, Any]]]:
+        groups = []
+
+        for element in self._pipeline_elements:
+            if (
+                groups
+                and isinstance(element[OBJECT], StreamingPipelineElement)
+                and isinstance(groups[-1][-1][OBJECT], StreamingPipelineElement)
+            ):
+                groups[-1].append(element)
+            else:
+                groups.append([element])
+
+        return groups
+
+    def _run_stream_group(self, group: List[Dict[str, Any]]) -> None:
+        # the elements finished by an interrupted run or restored from the artifact store have their outputs in place,
+        # but do not stream them, so the rest of the group reads these outputs as a whole, one element at a time
+        for idx, element in enumerate(group):
+            element[INPUTS].update(self._outputs)
+            outputs = self._get_finished_outputs(element=element)
+            if outputs is None:
+                break
+
             self._outputs.update(outputs)
+        else:
+            return
+
+        if idx == 0:
+            self._stream_elements(group=group)
+            return
+
+        self._outputs.update(self._execute_element(element=group[idx]))
+        for element in group[idx + 1 :]:  # noqa E203
+            self._run_element(element=element)
+
+    def _stream_elements(self, group: List[Dict[str, Any]]) -> None:
+        logging.info(f"streaming pipeline elements {', '.join(element[NAME] for element in group)}")
+
+        cancelled = threading.Event()
+        stream_outputs = StreamOutputs()
+        queues = [queue.Queue(maxsize=self._stream_queue_size) for _ in group[1:]]
+        elements_outputs = {}
+        errors = []
+
+        threads = []
+        for idx, element in enumerate(group):
+            stream = WorkStream(
+                source=queues[idx - 1] if idx > 0 else None,
+                sink=queues[idx] if idx < len(queues) else None,
+                publish=stream_outputs.publish,
+                cancelled=cancelled,
+                name=element[NAME],
+            )
+            inputs = StreamInputs(
+                static_inputs={**element[INPUTS], **self._outputs},
+                producers=self._get_stream_producers(elements=group[:idx]),
+                outputs=stream_outputs,
+                cancelled=cancelled,
+            )
+            # the threads run in a copy of the current context, which tracks the progress of the run
+            threads.append(
+                threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._run_stream_element,),
+                    kwargs={
+                        "element": element,
+                        "producer": idx,
+                        "inputs": inputs,
+                        "stream": stream,
+                        "stream_outputs": stream_outputs,
+                        "elements_outputs": elements_outputs,
+                        "cancelled": cancelled,
+                        "errors": errors,
+                    },
+                    name=element[NAME],
+                )
+            )
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            root_causes = [e for e in errors if not isinstance(e, StreamCancelledError)]
+            raise (root_causes or errors)[0]
+
+        # the inputs of a streamed element are complete only once its upstream elements have finished
+        upstream_outputs = dict(self._outputs)
+        for idx, element in enumerate(group):
+            self._memoize_element(
+                element=element, inputs={**element[INPUTS], **upstream_outputs}, outputs=elements_outputs[idx]
+            )
+            upstream_outputs.update(elements_outputs[idx])
+
+        self._outputs.update(stream_outputs.values())
+
+    def _run_stream_element(
+        self,
+        element: Dict[str, Any],
+        producer: int,
+        inputs: StreamInputs,
+        stream: WorkStream,
+        stream_outputs: StreamOutputs,
+        elements_outputs: Dict[int, Dict[str, Any]],
+        cancelled: threading.Event,
+        errors: List[Exception],
+    ) -> None:
+        try:
+            with self._instrument(element=element):
+                outputs = element[OBJECT].run_stream(inputs=inputs, outputs=element.get(OUTPUTS), stream=stream)
+
+            self._validate_pipeline_element(element=element, outputs=outputs)
+            stream_outputs.publish(outputs)
+            self._finish_element(element=element, outputs=outputs)
+            elements_outputs[producer] = outputs
+
+            stream.drain()
+            stream.close()
+        except Exception as e:
+            errors.append(e)
+            cancelled.set()
+        finally:
+            stream_outputs.finish(producer)
+
+    def _get_finished_outputs(self, element: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self._journal is not None:
+            outputs = self._journal.get_element_outputs(element_key=element[ELEMENT_KEY])
+            if outputs is not None:
+                logging.info(f"skipping pipeline element {element[NAME]} finished by the interrupted run")
+                ELEMENT_RESTORED.labels(element=element[NAME], source="journal").inc()
+                record_element_finished()
+                return outputs
+
+        if not self._is_memoized(element=element):
+            return None
+
+        with span(name=f"restore {element[NAME]}", category="artifact_store"):
+            key = self._artifact_store.get_key(
+                element_object=element[OBJECT],
+                settings=element.get(SETTINGS),
+                inputs=element[INPUTS],
+                outputs=element.get(OUTPUTS),
+            )
+            outputs = self._artifact_store.get(key=key)
+
+        if outputs is None:
+            self._memoization_keys[element[ELEMENT_KEY]] = key
+            return None
+
+        logging.info(f"restored the outputs of pipeline element {element[NAME]} from the artifact store")
+        ELEMENT_RESTORED.labels(element=element[NAME], source="artifact_store").inc()
+        self._finish_element(element=element, outputs=outputs)
+
+        return outputs
+
+    def _finish_element(self, element: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        record_element_finished()
+        if self._journal is not None:
+            self._journal.finish_element(element_key=element[ELEMENT_KEY], outputs=outputs)
+
+    def _memoize_element(self, element: Dict[str, Any], inputs: Dict[str, Any], outputs: Dict[str, Any]) -> None:
+        if not self._is_memoized(element=element):
+            return
+
+        with span(name=f"memoize {element[NAME]}", category="artifact_store"):
+            key = self._memoization_keys.pop(element[ELEMENT_KEY], None) or self._artifact_store.get_key(
+                element_object=element[OBJECT],
+                settings=element.get(SETTINGS),
+                inputs=inputs,
+                outputs=element.get(OUTPUTS),
+            )
+            self._artifact_store.put(key=key, outputs=outputs, outputs_definition=element.get(OUTPUTS))
+
+    def _profile_run(self) -> ContextManager[None]:
+        # the elements of the STREAMING and DAG modes run at the same time, so they are profiled together
+        if self._profiler is None or self._execution_mode == ExecutionMode.sequential:
+            return contextlib.nullcontext()
+
+        return self._profiler.profile_run(execution_mode=self._execution_mode)
+
+    @contextlib.contextmanager
+    def _instrument(self, element: Dict[str, Any]) -> Iterator[None]:
+        with measure_element(element=element[NAME]), span(name=element[NAME], category="element"):
+            if self._profiler is None or self._execution_mode != ExecutionMode.sequential:
+                yield
+                return
+
+            with self._profiler.profile(element_key=element[ELEMENT_KEY]):
+                yield
+
+    def _is_memoized(self, element: Dict[str, Any]) -> bool:
+        return self._artifact_store is not None and element.get(MEMOIZE) is True and element.get(OUTPUTS) is not None
+
+    @staticmethod
+    def _get_stream_producers(elements: List[Dict[str, Any]]) -> Dict[str, Set[int]]:
+        producers = {}
+
+        for idx, element in enumerate(elements):
+            for key in element.get(OUTPUTS) or {}:
+                producers.setdefault(key, set()).add(idx)
+
+        return producers
 
     @staticmethod
     def _validate_pipeline_element(element: Dict[str, Any], outputs: Any) -> None:
@@ -55,6 +448,19 @@ class Orchestrator:
                 f"Please check that {OUTPUTS} added to the definition or they are returned from the run method."
             )
 
+    def close_pipeline_elements(self) -> None:
+        for element in self._pipeline_elements:
+            if isinstance(element[OBJECT], PipelineElement):
+                element[OBJECT].close()
+
     def cleanup(self) -> None:
+        # an unfinished run keeps its intermediate results next to the journal, so the next run can resume from them
+        if self._journal is not None:
+            if not self._finished:
+                logging.info(f"keeping the intermediate results to resume the run from {self._journal_file}")
+                return
+
+            self._journal.remove()
+
         for element in self._pipeline_elements:
             element[OBJECT].cleanup(outputs=element.get(OUTPUTS))
@@ -0,0 +1,76 @@
+from typing import Any, Dict, List, Set
+
+from src.utils.settings import IN_MEMORY_VARIABLE, INPUTS, NAME, OUTPUTS
+
+
+class PipelineGraph:
+    def __init__(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        self._pipeline_elements = pipeline_elements
+
+        self._dependencies = self._build_dependencies()
+        self._order = self._sort_topologically()
+
+    @property
+    def dependencies(self) -> Dict[int, Set[int]]:
+        return {idx: set(dependencies) for idx, dependencies in self._dependencies.items()}
+
+    @property
+    def order(self) -> List[int]:
+        return list(self._order)
+
+    def get_ancestors(self, idx: int) -> List[int]:
+        ancestors = set()
+        not_visited = list(self._dependencies[idx])
+
+        while not_visited:
+            ancestor = not_visited.pop()
+            if ancestor not in ancestors:
+                ancestors.add(ancestor)
+                not_visited.extend(self._dependencies[ancestor])
+
+        return sorted(ancestors)
+
+    def _build_dependencies(self) -> Dict[int, Set[int]]:
+        producers = {}
+        for idx, element in enumerate(self._pipeline_elements):
+            for key in element.get(OUTPUTS) or {}:
+                if key in producers:
+                    raise ValueError(
+                        f"The output '{key}' is produced by both "
+                        f"'{self._pipeline_elements[producers[key]][NAME]}' and '{element[NAME]}' elements."
+                    )
+
+                producers[key] = idx
+
+        dependencies = {}
+        for idx, element in enumerate(self._pipeline_elements):
+            dependencies[idx] = set()
+
+            for key, value in element[INPUTS].items():
+                if key in producers and producers[key] != idx:
+                    dependencies[idx].add(producers[key])
+                elif value == IN_MEMORY_VARIABLE:
+                    raise ValueError(
+                        f"The input '{key}' of the '{element[NAME]}' element is an {IN_MEMORY_VARIABLE}, "
+                        f"but no pipeline element produces it."
+                    )
+
+        return dependencies
+
+    def _sort_topologically(self) -> List[int]:
+        remaining = self.dependencies
+        order = []
+
+        while ready := sorted(idx for idx, dependencies in remaining.items() if not dependencies):
+            for idx in ready:
+                del remaining[idx]
+                order.append(idx)
+
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+
+        if remaining:
+            cycle = ", ".join(self._pipeline_elements[idx][NAME] for idx in sorted(remaining))
+            raise ValueError(f"The pipeline elements {cycle} depend on each other in a cycle.")
+
+        return order
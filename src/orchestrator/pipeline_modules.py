@@ -1,24 +1,63 @@
+import ast
+import contextlib
 import importlib
 import inspect
+import json
+import logging
+import os
+import tempfile
+from importlib.metadata import entry_points
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+
+from src.integration_pipeline.base.pipeline_element_registry import REGISTER_DECORATOR, get_registered_pipeline_element
 
 PY = ".py"
 DUNDER = "__"
+PYCACHE = "__pycache__"
+INDEX_FILE_NAME = "pipeline_elements_index.json"
+INDEX_VERSION = 1
+ENTRY_POINT_GROUP = "custom_integration_platform.pipeline_elements"
 
 
 class PipelineModules:
-    def __init__(self, modules_path: Path, working_directory: Path) -> None:
+    def __init__(self, modules_path: Path, working_directory: Path, index_file: Optional[Path] = None) -> None:
         self._modules_path = modules_path
         self._working_directory = working_directory
+        self._index_file = index_file or modules_path / PYCACHE / INDEX_FILE_NAME
 
     def get_all_pipeline_element_modules(self) -> Dict[str, str]:
+        # the classes are found by parsing the modules instead of importing them, and the parsed modules are indexed
+        # by their modification times, so a start imports nothing but the elements the pipeline definition names
+        index = self._read_index()
+        updated_index = {}
         modules = {}
 
-        for item in self._modules_path.rglob("*"):
-            if item.is_file() and item.suffix == PY and DUNDER not in item.stem:
-                module_relative_path = str(item.relative_to(self._working_directory))
-                modules[item.stem.replace("_", "")] = module_relative_path.replace("/", ".").replace(PY, "")
+        for module_file in self._find_module_files():
+            relative_path = str(module_file.relative_to(self._modules_path))
+            module_stat = module_file.stat()
+            entry = index.get(relative_path)
+            if entry is None or entry["mtime_ns"] != module_stat.st_mtime_ns or entry["size"] != module_stat.st_size:
+                entry = {
+                    "mtime_ns": module_stat.st_mtime_ns,
+                    "size": module_stat.st_size,
+                    "module": str(module_file.relative_to(self._working_directory).with_suffix("")).replace("/", "."),
+                    "classes": self._parse_class_names(module_file=module_file),
+                }
+
+            updated_index[relative_path] = entry
+            for class_name in entry["classes"]:
+                if class_name in modules and modules[class_name] != entry["module"]:
+                    logging.warning(
+                        f"the pipeline element '{class_name}' is defined in both {modules[class_name]} and "
+                        f"{entry['module']}, the former is used"
+                    )
+                    continue
+
+                modules[class_name] = entry["module"]
+
+        if updated_index != index:
+            self._write_index(index=updated_index)
 
         if modules == {}:
             raise ModuleNotFoundError(
@@ -30,13 +69,92 @@ class PipelineModules:
 
     @staticmethod
     def get_pipeline_element_class(modules: Dict[str, str], class_name: str) -> Any:
-        if not (module := modules.get(class_name.lower(), None)):
+        if (element_class := get_registered_pipeline_element(name=class_name)) is not None:
+            return element_class
+
+        module = modules.get(class_name) or PipelineModules._get_entry_point(name=class_name)
+        if module is None:
             raise KeyError(f"Class name '{class_name}' is not found in the pipeline elements modules.")
 
-        element_module = importlib.import_module(module)
+        module_name, _, attribute = module.partition(":")
+        element_module = importlib.import_module(module_name)
+
+        # an element registered under a name of its own is known once its module is imported
+        if (element_class := get_registered_pipeline_element(name=class_name)) is not None:
+            return element_class
+
+        element_class = getattr(element_module, attribute or class_name, None)
+        if not inspect.isclass(element_class):
+            raise ImportError("Class is not found in the module", name=class_name, path=module_name)
+
+        return element_class
+
+    @staticmethod
+    def _get_entry_point(name: str) -> Optional[str]:
+        # installed packages expose their elements as "<name> = <module>:<class>" entry points, which are only looked
+        # up for the names missing from the modules path, as reading them scans every installed distribution
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name == name:
+                return entry_point.value
+
+        return None
+
+    def _find_module_files(self) -> List[Path]:
+        module_files = []
+        for root, directories, files in os.walk(self._modules_path):
+            directories[:] = sorted(directory for directory in directories if directory != PYCACHE)
+            module_files += [Path(root) / file for file in sorted(files) if file.endswith(PY) and DUNDER not in file]
+
+        return module_files
+
+    @staticmethod
+    def _parse_class_names(module_file: Path) -> List[str]:
+        try:
+            module = ast.parse(module_file.read_bytes(), filename=str(module_file))
+        except SyntaxError as e:
+            logging.warning(f"skipping the pipeline elements module {module_file}, which can not be parsed: {e}")
+            return []
+
+        class_names = []
+        for node in module.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+
+            class_names.append(node.name)
+            for decorator in node.decorator_list:
+                if (
+                    isinstance(decorator, ast.Call)
+                    and getattr(decorator.func, "id", getattr(decorator.func, "attr", None)) == REGISTER_DECORATOR
+                ):
+                    arguments = decorator.args + [keyword.value for keyword in decorator.keywords]
+                    class_names += [
+                        argument.value
+                        for argument in arguments
+                        if isinstance(argument, ast.Constant) and isinstance(argument.value, str)
+                    ]
+
+        return class_names
+
+    def _read_index(self) -> Dict[str, Any]:
+        try:
+            index = json.loads(self._index_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+        if index.get("version") != INDEX_VERSION or index.get("working_directory") != str(self._working_directory):
+            return {}
+
+        return index["modules"]
 
-        for name, _ in inspect.getmembers(element_module, inspect.isclass):
-            if name == class_name:
-                return getattr(element_module, name)
+    def _write_index(self, index: Dict[str, Any]) -> None:
+        # the index is only a cache, so a read-only modules path just means parsing the modules on every start
+        with contextlib.suppress(OSError):
+            self._index_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                mode="w", dir=self._index_file.parent, prefix=f".{self._index_file.name}.", delete=False
+            ) as f:
+                json.dump(
+                    {"version": INDEX_VERSION, "working_directory": str(self._working_directory), "modules": index}, f
+                )
 
-        raise ImportError("Class is not found in the module", name=class_name, path=module)
+            os.replace(f.name, self._index_file)
@@ -0,0 +1,111 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.orchestrator.artifact_store import ArtifactStore
+from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.pipeline_modules import PipelineModules
+from src.orchestrator.profiler import ElementProfiler
+from src.orchestrator.workspace import RunWorkspace
+from src.orchestrator.yaml_parser import YAMLParser
+from src.utils.progress import RunProgress, track_progress
+from src.utils.settings import NAME, Settings
+
+
+class PipelineRunError(Exception):
+    pass
+
+
+class PipelineWorker:
+    def __init__(
+        self,
+        yaml_parser: YAMLParser,
+        pipeline_definition_file: Path,
+        modules_path: Path,
+        working_directory: Path,
+        settings: Settings,
+    ) -> None:
+        self._pipeline_definition_file = pipeline_definition_file
+        self._settings = settings
+        self._pipeline_definition = []
+
+        artifact_store = None
+        if settings.memoization_directory is not None:
+            artifact_store = ArtifactStore(
+                directory=settings.memoization_directory,
+                max_size_bytes=settings.memoization_max_size_mb * 2**20,
+                fingerprint_mode=settings.memoization_fingerprint,
+            )
+
+        self._orchestrator = Orchestrator(
+            yaml_parser=yaml_parser,
+            pipeline_modules=PipelineModules(modules_path=modules_path, working_directory=working_directory),
+            execution_mode=settings.execution_mode,
+            stream_queue_size=settings.stream_queue_size,
+            dag_workers=settings.dag_workers,
+            artifact_store=artifact_store,
+        )
+
+    @property
+    def pipeline_definition(self) -> List[Dict[str, Any]]:
+        return self._pipeline_definition
+
+    def initialize(self) -> None:
+        # the elements are initialized once and reused by every run, so an input file costs no interpreter start,
+        # no imports and no new connections to the services the elements keep clients of
+        self._orchestrator.initialize_pipeline_elements(pipeline_definition_file=self._pipeline_definition_file)
+        self._pipeline_definition = self._orchestrator.pipeline_elements
+
+    def close(self) -> None:
+        self._orchestrator.close_pipeline_elements()
+
+    def run(
+        self, input_file: Path, run_id: str, progress: Optional[RunProgress] = None, isolate_outputs: bool = False
+    ) -> Dict[str, Any]:
+        # with isolate_outputs the final outputs of the run go into a run_id subdirectory of the defined ones
+        workspace = RunWorkspace(root_directory=self._settings.workspaces_directory, run_id=run_id)
+        workspace.create()
+        scoped_pipeline_definition = workspace.scope_pipeline_definition(
+            pipeline_definition=self._pipeline_definition,
+            inputs={self._settings.batch_input_key: str(workspace.stage_input_file(input_file=input_file))},
+            outputs_subdirectory=run_id if isolate_outputs else None,
+        )
+
+        profiler = None
+        if self._settings.profile:
+            profiler = ElementProfiler(
+                directory=self._settings.profiles_directory / run_id,
+                modes=ElementProfiler.parse_modes(profile=self._settings.profile),
+            )
+
+        self._orchestrator.start_run(
+            pipeline_elements=scoped_pipeline_definition,
+            journal_file=workspace.directory / "journal.json" if self._settings.resume else None,
+            profiler=profiler,
+        )
+
+        if progress is None:
+            progress = RunProgress(elements=[element[NAME] for element in scoped_pipeline_definition])
+
+        error = None
+        try:
+            with track_progress(progress=progress):
+                self._orchestrator.run_pipeline_element()
+
+            # the outputs no element consumes are the results of the run, the other ones are cleaned up below
+            intermediate_keys = workspace.get_intermediate_keys(pipeline_definition=scoped_pipeline_definition)
+            outputs = {key: value for key, value in self._orchestrator.outputs.items() if key not in intermediate_keys}
+        except (Exception, SystemExit) as e:
+            logging.exception(f"Unexpected error occurred while processing {input_file}: {e}")
+            error = e
+        finally:
+            self._orchestrator.cleanup()
+
+        # with resuming enabled the workspace of a failed run is kept for the next start to continue from
+        if error is None or not self._settings.resume:
+            workspace.cleanup()
+
+        if error is not None:
+            raise PipelineRunError(f"Failed to process {input_file}: {error}") from error
+
+        return outputs
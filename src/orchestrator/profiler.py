@@ -0,0 +1,133 @@
+import contextlib
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Set
+
+from src.utils.settings import ProfileMode
+
+TOP_ENTRIES = 30
+RUN_FILE_STEM = "run"
+# cProfile is built on sys.monitoring since Python 3.12, so a single profiler sees every thread and only one can be
+# enabled at a time
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+
+class ElementProfiler:
+    def __init__(self, directory: Path, modes: Set[ProfileMode]) -> None:
+        self._directory = directory
+        self._modes = modes
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        if ProfileMode.memory in self._modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @staticmethod
+    def parse_modes(profile: str) -> Set[ProfileMode]:
+        return {ProfileMode(mode.strip().lower()) for mode in profile.split(",") if mode.strip()}
+
+    @contextlib.contextmanager
+    def profile(self, element_key: str) -> Iterator[None]:
+        # the elements run one after another, so the profile of an element holds nothing else
+        with self._profile(
+            file_stem=re.sub(r"[^\w.-]", "_", element_key), title=f"the pipeline element {element_key}"
+        ):
+            yield
+
+    @contextlib.contextmanager
+    def profile_run(self, execution_mode: str) -> Iterator[None]:
+        # the elements running at the same time share the profilers and tracemalloc, which are process-wide, and hand
+        # their work to each other's threads, so a single profile covers the whole run with all of its threads
+        with self._profile(
+            file_stem=RUN_FILE_STEM,
+            title=f"the whole {execution_mode} run, all of its elements together",
+            all_threads=True,
+        ):
+            yield
+
+    @contextlib.contextmanager
+    def _profile(self, file_stem: str, title: str, all_threads: bool = False) -> Iterator[None]:
+        profiles = []
+        if ProfileMode.cpu in self._modes:
+            profiles.append(cProfile.Profile())
+
+        snapshot = None
+        if ProfileMode.memory in self._modes:
+            tracemalloc.reset_peak()
+            snapshot = tracemalloc.take_snapshot()
+
+        # before Python 3.12 a profiler sees a single thread, so the threads started during the run get their own
+        hook_threads = bool(profiles) and all_threads and not PROCESS_WIDE_CPROFILE
+        if profiles:
+            profiles[0].enable()
+        if hook_threads:
+            threading.setprofile(functools.partial(_enable_thread_profile, profiles=profiles))
+        try:
+            yield
+        finally:
+            if hook_threads:
+                threading.setprofile(None)
+
+            if profiles:
+                profiles[0].disable()
+                self._write_cpu_profile(profiles=profiles, file_stem=file_stem, title=title)
+
+            if snapshot is not None:
+                self._write_memory_report(snapshot=snapshot, file_stem=file_stem, title=title)
+
+    def _write_cpu_profile(self, profiles: List[cProfile.Profile], file_stem: str, title: str) -> None:
+        statistics = pstats.Stats(profiles[0])
+        if len(profiles) > 1:
+            statistics.add(*profiles[1:])
+
+        profile_file = self._directory / f"{file_stem}.prof"
+        statistics.dump_stats(profile_file)
+
+        report = io.StringIO()
+        report.write(f"CPU profile of {title}\n")
+        statistics.stream = report
+        statistics.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_ENTRIES)
+        profile_file.with_suffix(".prof.txt").write_text(report.getvalue())
+
+        logging.info(f"wrote the CPU profile of {title} into the {profile_file}")
+
+    def _write_memory_report(self, snapshot: tracemalloc.Snapshot, file_stem: str, title: str) -> None:
+        _, peak = tracemalloc.get_traced_memory()
+        # the allocations of the profiler itself are left out of the report
+        filters = [
+            tracemalloc.Filter(inclusive=False, filename_pattern=module.__file__)
+            for module in (tracemalloc, cProfile, pstats)
+        ]
+        statistics = (
+            tracemalloc.take_snapshot()
+            .filter_traces(filters)
+            .compare_to(snapshot.filter_traces(filters), key_type="lineno")
+        )
+
+        report_file = self._directory / f"{file_stem}.memory.txt"
+        lines = [
+            f"memory report of {title}",
+            f"peak traced memory: {peak / 2**20:.1f} MiB",
+            f"top {TOP_ENTRIES} allocations retained by the run:",
+        ]
+        lines += [str(statistic) for statistic in statistics[:TOP_ENTRIES]]
+        report_file.write_text("\n".join(lines) + "\n")
+
+        logging.info(f"wrote the memory report of {title} into the {report_file}")
+
+
+def _enable_thread_profile(*_: Any, profiles: List[cProfile.Profile]) -> Optional[Any]:
+    # called on the first event of a thread started during the run, whose events go to a profiler of its own from then
+    # on, the profilers of all threads being merged into the report
+    profile = cProfile.Profile()
+    profiles.append(profile)
+    profile.enable()
+
+    return None
@@ -0,0 +1,69 @@
+import threading
+from typing import Any, Dict, Iterator, Mapping, Set
+
+from src.integration_pipeline.base.work_stream import StreamCancelledError
+
+
+class StreamOutputs:
+    def __init__(self, poll_interval: float = 0.1) -> None:
+        self._poll_interval = poll_interval
+
+        self._values = {}
+        self._finished_producers = set()
+        self._condition = threading.Condition()
+
+    def publish(self, outputs: Dict[str, Any]) -> None:
+        with self._condition:
+            self._values.update(outputs)
+            self._condition.notify_all()
+
+    def finish(self, producer: int) -> None:
+        with self._condition:
+            self._finished_producers.add(producer)
+            self._condition.notify_all()
+
+    def wait_for(self, key: str, producers: Set[int], cancelled: threading.Event) -> bool:
+        with self._condition:
+            while key not in self._values and not producers.issubset(self._finished_producers):
+                if cancelled.is_set():
+                    raise StreamCancelledError(f"the stream was cancelled while waiting for '{key}'")
+
+                self._condition.wait(timeout=self._poll_interval)
+
+            return key in self._values
+
+    def get(self, key: str) -> Any:
+        with self._condition:
+            return self._values[key]
+
+    def values(self) -> Dict[str, Any]:
+        with self._condition:
+            return dict(self._values)
+
+
+class StreamInputs(Mapping):
+    def __init__(
+        self,
+        static_inputs: Dict[str, Any],
+        producers: Dict[str, Set[int]],
+        outputs: StreamOutputs,
+        cancelled: threading.Event,
+    ) -> None:
+        self._static_inputs = static_inputs
+        self._producers = producers
+        self._outputs = outputs
+        self._cancelled = cancelled
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._producers and self._outputs.wait_for(
+            key=key, producers=self._producers[key], cancelled=self._cancelled
+        ):
+            return self._outputs.get(key)
+
+        return self._static_inputs[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(set(self._static_inputs) | set(self._outputs.values()))
+
+    def __len__(self) -> int:
+        return len(set(self._static_inputs) | set(self._outputs.values()))
@@ -0,0 +1,89 @@
+import logging
+import shutil
+import signal
+import threading
+from pathlib import Path
+
+from src.orchestrator.input_watcher import InputWatcher
+from src.orchestrator.pipeline_worker import PipelineRunError, PipelineWorker
+from src.orchestrator.workspace import get_input_directory
+from src.orchestrator.yaml_parser import YAMLParser
+from src.utils.metrics import write_metrics_textfile
+from src.utils.settings import Settings
+from src.utils.tracing import write_trace
+
+
+class WatchRunner:
+    def __init__(
+        self,
+        yaml_parser: YAMLParser,
+        pipeline_definition_file: Path,
+        modules_path: Path,
+        working_directory: Path,
+        settings: Settings,
+    ) -> None:
+        self._settings = settings
+        self._stop = threading.Event()
+        self._pipeline_worker = PipelineWorker(
+            yaml_parser=yaml_parser,
+            pipeline_definition_file=pipeline_definition_file,
+            modules_path=modules_path,
+            working_directory=working_directory,
+            settings=settings,
+        )
+
+    def run(self) -> None:
+        self._pipeline_worker.initialize()
+
+        watch_directory = self._settings.watch_directory or get_input_directory(
+            pipeline_definition=self._pipeline_worker.pipeline_definition, input_key=self._settings.batch_input_key
+        )
+        watcher = InputWatcher(
+            directory=watch_directory,
+            pattern=self._settings.batch_input_pattern,
+            poll_interval=self._settings.watch_poll_interval,
+            polling=self._settings.watch_polling,
+        )
+
+        # the run of the current input file is finished before stopping
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, lambda *_: self._stop.set())
+
+        logging.info(f"watching {watch_directory} for '{self._settings.batch_input_pattern}' input files")
+        try:
+            for input_file in watcher.watch(stop=self._stop):
+                self._run_input_file(input_file=input_file)
+        finally:
+            # the clients the elements kept between the runs are released once the service stops
+            self._pipeline_worker.close()
+
+        logging.info("stopped watching")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run_input_file(self, input_file: Path) -> bool:
+        logging.info(f"started processing {input_file}")
+
+        try:
+            self._pipeline_worker.run(input_file=input_file, run_id=input_file.name)
+            succeeded = True
+        except PipelineRunError as e:
+            logging.error(e)
+            succeeded = False
+
+        if succeeded:
+            logging.info(f"finished processing {input_file}")
+            if self._settings.watch_processed_directory is not None:
+                self._settings.watch_processed_directory.mkdir(parents=True, exist_ok=True)
+                shutil.move(input_file, self._settings.watch_processed_directory / input_file.name)
+
+        if self._settings.metrics_textfile is not None:
+            write_metrics_textfile(textfile=self._settings.metrics_textfile)
+
+        # every run gets a trace file of its own, named after its input file
+        if self._settings.trace_file is not None:
+            trace_file = self._settings.trace_file
+            write_trace(trace_file=trace_file.with_name(f"{trace_file.stem}_{input_file.name}.json"))
+
+        return succeeded
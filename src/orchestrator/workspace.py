@@ -0,0 +1,84 @@
+import copy
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from src.utils.settings import IN_MEMORY_VARIABLE, INPUTS, OBJECT, OUTPUTS
+
+
+class RunWorkspace:
+    def __init__(self, root_directory: Path, run_id: str) -> None:
+        self._directory = root_directory / run_id
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def create(self) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def stage_input_file(self, input_file: Path) -> Path:
+        # the run reads its input file through a symlink in a directory of its own
+        input_directory = self._directory / "input"
+        input_directory.mkdir(exist_ok=True)
+        run_input_file = input_directory / input_file.name
+        if not run_input_file.exists():
+            run_input_file.symlink_to(input_file.absolute())
+
+        return input_directory
+
+    def scope_pipeline_definition(
+        self,
+        pipeline_definition: List[Dict[str, Any]],
+        inputs: Dict[str, Any],
+        outputs_subdirectory: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        # intermediate results (produced and consumed inside the pipeline) are moved into the workspace, while the
+        # pipeline inputs are replaced by the run ones and the final outputs stay where the definition puts them, or
+        # go into an outputs_subdirectory of those directories, so concurrent runs never overwrite each other's results
+        intermediate_keys = self.get_intermediate_keys(pipeline_definition=pipeline_definition)
+
+        scoped_pipeline_definition = []
+        for element in pipeline_definition:
+            scoped_element = copy.deepcopy({key: value for key, value in element.items() if key != OBJECT})
+            if OBJECT in element:
+                scoped_element[OBJECT] = element[OBJECT]
+
+            for key in scoped_element[INPUTS].keys() & inputs.keys():
+                scoped_element[INPUTS][key] = inputs[key]
+
+            for params in (scoped_element[INPUTS], scoped_element.get(OUTPUTS) or {}):
+                for key in params.keys() & intermediate_keys:
+                    if params[key] != IN_MEMORY_VARIABLE:
+                        params[key] = str(self._directory / key)
+
+            if outputs_subdirectory is not None:
+                outputs = scoped_element.get(OUTPUTS) or {}
+                for key in outputs.keys() - intermediate_keys:
+                    if outputs[key] != IN_MEMORY_VARIABLE:
+                        outputs[key] = str(Path(outputs[key]) / outputs_subdirectory)
+
+            scoped_pipeline_definition.append(scoped_element)
+
+        return scoped_pipeline_definition
+
+    @staticmethod
+    def get_intermediate_keys(pipeline_definition: List[Dict[str, Any]]) -> Set[str]:
+        produced_keys = {key for element in pipeline_definition for key in element.get(OUTPUTS) or {}}
+        consumed_keys = {key for element in pipeline_definition for key in element[INPUTS]}
+
+        return produced_keys & consumed_keys
+
+    def cleanup(self) -> None:
+        if self._directory.is_dir():
+            logging.debug(f"cleaning up {self._directory}")
+            shutil.rmtree(path=self._directory, ignore_errors=True)
+
+
+def get_input_directory(pipeline_definition: List[Dict[str, Any]], input_key: str) -> Path:
+    for element in pipeline_definition:
+        if input_key in element[INPUTS]:
+            return Path(element[INPUTS][input_key])
+
+    raise KeyError(f"No pipeline element has the '{input_key}' batch input.")
@@ -0,0 +1,104 @@
+import contextlib
+import os
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, TypeVar, Union
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess, start_http_server, write_to_textfile
+
+from src.utils.progress import record_frames
+
+T = TypeVar("T")
+
+# the platform's own registry keeps the process and garbage collector metrics of the default one out of the export
+REGISTRY = CollectorRegistry()
+
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200)
+
+ELEMENT_DURATION_SECONDS = Histogram(
+    "cip_element_duration_seconds",
+    "Wall time of the pipeline element runs",
+    ["element", "outcome"],
+    buckets=DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+ELEMENT_RESTORED = Counter(
+    "cip_element_restored",
+    "Pipeline element runs skipped, as their outputs were restored from the journal or the artifact store",
+    ["element", "source"],
+    registry=REGISTRY,
+)
+ELEMENT_FRAMES = Counter(
+    "cip_element_frames", "Frames processed by the pipeline elements", ["element"], registry=REGISTRY
+)
+ELEMENT_READ_BYTES = Counter(
+    "cip_element_read_bytes", "Bytes read by the pipeline elements", ["element"], registry=REGISTRY
+)
+ELEMENT_WRITTEN_BYTES = Counter(
+    "cip_element_written_bytes", "Bytes written by the pipeline elements", ["element"], registry=REGISTRY
+)
+STREAM_WAIT_SECONDS = Counter(
+    "cip_stream_wait_seconds",
+    "Time the streamed pipeline elements waited to receive from the upstream or to send to the downstream queue",
+    ["element", "direction"],
+    registry=REGISTRY,
+)
+
+
+@contextlib.contextmanager
+def measure_element(element: str) -> Iterator[None]:
+    start = time.perf_counter()
+    outcome = "failed"
+    try:
+        yield
+        outcome = "succeeded"
+    finally:
+        ELEMENT_DURATION_SECONDS.labels(element=element, outcome=outcome).observe(time.perf_counter() - start)
+
+
+def record_element_io(element: str, frames: int = 0, read_bytes: int = 0, written_bytes: int = 0) -> None:
+    ELEMENT_FRAMES.labels(element=element).inc(frames)
+    record_frames(element=element, frames=frames)
+    ELEMENT_READ_BYTES.labels(element=element).inc(read_bytes)
+    ELEMENT_WRITTEN_BYTES.labels(element=element).inc(written_bytes)
+
+
+def count_frames(element: str, frames: Iterable[T]) -> Iterator[T]:
+    frames_counter = ELEMENT_FRAMES.labels(element=element)
+    for frame in frames:
+        frames_counter.inc()
+        record_frames(element=element, frames=1)
+        yield frame
+
+
+def get_size(path: Union[str, Path]) -> int:
+    # recording the metrics never fails a run, a path which is gone counts as empty
+    path = Path(path)
+    with contextlib.suppress(OSError):
+        if path.is_dir():
+            return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+        return path.stat().st_size
+
+    return 0
+
+
+def _get_exposition_registry() -> CollectorRegistry:
+    # with PROMETHEUS_MULTIPROC_DIR set, e.g. in the batch mode, the metrics of every worker process are collected
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+
+    return registry
+
+
+def start_metrics_server(port: int) -> None:
+    start_http_server(port=port, registry=_get_exposition_registry())
+
+
+def write_metrics_textfile(textfile: Path) -> None:
+    # the file is written aside and renamed into place, so the node-exporter never reads a partial one
+    textfile.parent.mkdir(parents=True, exist_ok=True)
+    write_to_textfile(path=str(textfile), registry=_get_exposition_registry())
@@ -0,0 +1,70 @@
+import contextlib
+import contextvars
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class RunProgress:
+    def __init__(self, elements: List[str]) -> None:
+        self._elements = elements
+        self._lock = threading.Lock()
+
+        self._finished_elements = 0
+        self._frames: Dict[str, int] = {}
+        self._frames_total: Optional[int] = None
+
+    def finish_element(self) -> None:
+        with self._lock:
+            self._finished_elements += 1
+
+    def add_frames(self, element: str, frames: int) -> None:
+        with self._lock:
+            self._frames[element] = self._frames.get(element, 0) + frames
+
+    def set_frames_total(self, frames: int) -> None:
+        with self._lock:
+            self._frames_total = frames
+
+    def to_dict(self) -> Dict[str, Any]:
+        # the frames done are the ones processed by the furthest pipeline element which has processed any frames
+        with self._lock:
+            frames_done = next((self._frames[name] for name in reversed(self._elements) if name in self._frames), 0)
+
+            return {
+                "elements_finished": self._finished_elements,
+                "elements_total": len(self._elements),
+                "frames_done": frames_done,
+                "frames_total": self._frames_total,
+                "frames": dict(self._frames),
+            }
+
+
+# the progress of the run in the current context, the orchestrator copies the context into the threads it starts
+_run_progress: contextvars.ContextVar[Optional[RunProgress]] = contextvars.ContextVar("run_progress", default=None)
+
+
+@contextlib.contextmanager
+def track_progress(progress: RunProgress) -> Iterator[None]:
+    token = _run_progress.set(progress)
+    try:
+        yield
+    finally:
+        _run_progress.reset(token)
+
+
+def record_element_finished() -> None:
+    progress = _run_progress.get()
+    if progress is not None:
+        progress.finish_element()
+
+
+def record_frames(element: str, frames: int) -> None:
+    progress = _run_progress.get()
+    if progress is not None and frames:
+        progress.add_frames(element=element, frames=frames)
+
+
+def record_frames_total(frames: Optional[int]) -> None:
+    progress = _run_progress.get()
+    if progress is not None and frames is not None:
+        progress.set_frames_total(frames=frames)
@@ -1,6 +1,8 @@
+import os
 from pathlib import Path
+from typing import Optional, Set
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, Field
 from strenum import StrEnum
 
 NAME = "name"
@@ -8,6 +10,9 @@ SETTINGS = "settings"
 INPUTS = "inputs"
 OUTPUTS = "outputs"
 OBJECT = "object"
+MEMOIZE = "memoize"
+ELEMENT_KEY = "element_key"
+IN_MEMORY_VARIABLE = "IN_MEMORY_VARIABLE"
 
 
 class LogLevel(StrEnum):
@@ -19,8 +24,79 @@ class LogLevel(StrEnum):
     CRITICAL: str = "CRITICAL"
 
 
+class ExecutionMode(StrEnum):
+    sequential: str = "SEQUENTIAL"
+    streaming: str = "STREAMING"
+    dag: str = "DAG"
+
+
+class FingerprintMode(StrEnum):
+    stat: str = "STAT"
+    content: str = "CONTENT"
+
+
+class ProfileMode(StrEnum):
+    cpu: str = "cpu"
+    memory: str = "memory"
+
+
 class Settings(BaseSettings):
     log_level: LogLevel = LogLevel.INFO
     logs_directory: Path = Path.cwd() / "logs"
 
+    pipeline_definition_file: Optional[Path] = None
+
     redaction_retry: int = 2
+
+    execution_mode: ExecutionMode = ExecutionMode.sequential
+    stream_queue_size: int = 8
+    dag_workers: int = 4
+
+    batch_mode: bool = False
+    batch_workers: int = os.cpu_count() or 1
+    batch_input_key: str = "directory_data_video"
+    batch_input_pattern: str = "*.mp4"
+    workspaces_directory: Path = Path.cwd() / "data" / "workspaces"
+
+    watch_mode: bool = False
+    watch_directory: Optional[Path] = None
+    watch_poll_interval: float = 1.0
+    # polling instead of inotify, e.g. for network file systems not reporting the changes made by other hosts
+    watch_polling: bool = False
+    watch_processed_directory: Optional[Path] = None
+
+    job_server_mode: bool = False
+    # the job API has no authentication, so it only listens on the loopback interface unless told otherwise
+    job_server_host: str = "127.0.0.1"
+    job_server_port: int = 8080
+    job_workers: int = 2
+    job_queue_size: int = 8
+    # the element settings a job may override; the other ones, e.g. the service URLs and paths, are fixed by the
+    # pipeline definition, so a job cannot send the frames or write the results elsewhere; the settings of the
+    # FrameDeduplicator are left out, as the default pipeline runs without it
+    job_overridable_settings: Set[str] = {
+        "parallel_segments",
+        "number_of_files_in_tar",
+        "tar_size_mb",
+        "archiving_workers",
+        "extraction_workers",
+        "max_concurrent_jobs",
+        "face_determination_threshold",
+        "lp_determination_threshold",
+    }
+
+    resume: bool = False
+    journal_file: Path = Path.cwd() / "data" / "journal.json"
+
+    memoization_directory: Optional[Path] = None
+    memoization_max_size_mb: int = 51200
+    memoization_fingerprint: FingerprintMode = FingerprintMode.stat
+
+    metrics_port: Optional[int] = None
+    metrics_textfile: Optional[Path] = None
+
+    trace_file: Optional[Path] = None
+
+    # comma separated profile modes, e.g. CIP_PROFILE=cpu,memory
+    profile: str = Field("", env="CIP_PROFILE")
+    profiles_directory: Path = Path.cwd() / "logs" / "profiles"
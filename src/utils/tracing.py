@@ -0,0 +1,130 @@
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, ContextManager, Dict, Iterator, List, Optional
+
+
+class Tracer:
+    def __init__(self, process_name: str) -> None:
+        self.pid = os.getpid()
+        self._events: List[Dict[str, Any]] = [self._get_metadata_event("process_name", self.pid, process_name)]
+        self._named_tracks = set()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[None]:
+        start_ns = time.time_ns()
+        try:
+            yield
+        finally:
+            thread = threading.current_thread()
+            self.add_span(
+                name=name,
+                category=category,
+                start_ns=start_ns,
+                end_ns=time.time_ns(),
+                track=threading.get_native_id(),
+                track_name=thread.name,
+                **args,
+            )
+
+    def add_span(
+        self, name: str, category: str, start_ns: int, end_ns: int, track: int, track_name: str, **args: Any
+    ) -> None:
+        # the timestamps are wall clock ones, so the spans of the batch worker processes line up with each other
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_ns / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": self.pid,
+            "tid": track,
+            "args": {key: str(value) for key, value in args.items()},
+        }
+
+        with self._lock:
+            if track not in self._named_tracks:
+                self._named_tracks.add(track)
+                self._events.append(self._get_metadata_event("thread_name", track, track_name))
+
+            self._events.append(event)
+
+    def pop_events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            events, self._events = self._events, []
+            self._named_tracks = set()
+
+        return events
+
+    def _get_metadata_event(self, name: str, track: int, track_name: str) -> Dict[str, Any]:
+        return {"name": name, "ph": "M", "pid": self.pid, "tid": track, "args": {"name": track_name}}
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable_tracing(process_name: str) -> None:
+    global _tracer
+
+    # a forked worker process starts its own trace instead of carrying over the events of its parent
+    if _tracer is None or _tracer.pid != os.getpid():
+        _tracer = Tracer(process_name=process_name)
+
+
+def _get_tracer() -> Optional[Tracer]:
+    if _tracer is None or _tracer.pid != os.getpid():
+        return None
+
+    return _tracer
+
+
+def span(name: str, category: str, **args: Any) -> ContextManager[None]:
+    tracer = _get_tracer()
+    if tracer is None:
+        return contextlib.nullcontext()
+
+    return tracer.span(name, category, **args)
+
+
+def add_span(name: str, category: str, start_ns: int, end_ns: int, track: int, track_name: str, **args: Any) -> None:
+    tracer = _get_tracer()
+    if tracer is not None:
+        tracer.add_span(name, category, start_ns, end_ns, track, track_name, **args)
+
+
+def _get_parts_directory(trace_file: Path) -> Path:
+    return trace_file.with_name(f"{trace_file.name}.parts")
+
+
+def write_trace_part(trace_file: Path) -> None:
+    # worker processes hand their events over to the process writing the trace file through the parts directory
+    tracer = _get_tracer()
+    if tracer is None:
+        return
+
+    parts_directory = _get_parts_directory(trace_file=trace_file)
+    parts_directory.mkdir(parents=True, exist_ok=True)
+    part_file = parts_directory / f"{os.getpid()}-{uuid.uuid4().hex}.json"
+    temporary_part_file = part_file.with_suffix(".tmp")
+    temporary_part_file.write_text(json.dumps(tracer.pop_events()))
+    os.replace(temporary_part_file, part_file)
+
+
+def write_trace(trace_file: Path) -> None:
+    tracer = _get_tracer()
+    events = tracer.pop_events() if tracer is not None else []
+
+    parts_directory = _get_parts_directory(trace_file=trace_file)
+    if parts_directory.is_dir():
+        for part_file in sorted(parts_directory.glob("*.json")):
+            events.extend(json.loads(part_file.read_text()))
+
+    trace_file.parent.mkdir(parents=True, exist_ok=True)
+    trace_file.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    shutil.rmtree(parts_directory, ignore_errors=True)
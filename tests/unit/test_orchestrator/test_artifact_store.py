@@ -0,0 +1,137 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.orchestrator.artifact_store import ArtifactStore
+from src.utils.settings import FingerprintMode
+
+
+class Element:
+    pass
+
+
+class TestArtifactStore:
+    def test_get_key(self, tmp_path: Path) -> None:
+        (tmp_path / "frames").mkdir()
+        (tmp_path / "frames" / "00000001.png").write_bytes(b"frame")
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+
+        def get_key(**kwargs) -> str:
+            arguments = {
+                "element_object": Element(),
+                "settings": {"frame_format": "png"},
+                "inputs": {"frames": tmp_path / "frames", "video_metadata": {"fps": 25}},
+                "outputs": {"tar_files": "./tar_files"},
+                **kwargs,
+            }
+            return artifact_store.get_key(**arguments)
+
+        key = get_key()
+
+        assert key == get_key(inputs={"frames": str(tmp_path / "frames"), "video_metadata": {"fps": 25}})
+        assert key != get_key(settings={"frame_format": "jpg"})
+        assert key != get_key(inputs={"frames": tmp_path / "frames", "video_metadata": {"fps": 30}})
+
+        os.utime(tmp_path / "frames" / "00000001.png", ns=(0, 0))
+
+        assert key != get_key()
+
+    def test_get_key_covers_the_imported_modules(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        (tmp_path / "elements_package").mkdir()
+        (tmp_path / "elements_package" / "__init__.py").touch()
+        (tmp_path / "elements_package" / "helpers.py").write_text("def archive():\n    return 1\n")
+        (tmp_path / "elements_package" / "element.py").write_text(
+            "from elements_package.helpers import archive\n\n\nclass Element:\n    pass\n"
+        )
+        monkeypatch.syspath_prepend(str(tmp_path))
+        element_class = importlib.import_module("elements_package.element").Element
+
+        def get_key() -> str:
+            artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+            return artifact_store.get_key(element_object=element_class(), settings=None, inputs={}, outputs=None)
+
+        try:
+            key = get_key()
+            (tmp_path / "elements_package" / "helpers.py").write_text("def archive():\n    return 2\n")
+
+            assert key != get_key()
+        finally:
+            for module_name in ("elements_package", "elements_package.element", "elements_package.helpers"):
+                sys.modules.pop(module_name, None)
+
+    def test_get_key_by_content(self, tmp_path: Path) -> None:
+        (tmp_path / "frames").mkdir()
+        (tmp_path / "frames" / "00000001.png").write_bytes(b"frame")
+        artifact_store = ArtifactStore(
+            directory=tmp_path / "store", max_size_bytes=2**20, fingerprint_mode=FingerprintMode.content
+        )
+        inputs = {"frames": tmp_path / "frames"}
+
+        key = artifact_store.get_key(element_object=Element(), settings=None, inputs=inputs, outputs=None)
+        os.utime(tmp_path / "frames" / "00000001.png", ns=(0, 0))
+
+        assert key == artifact_store.get_key(element_object=Element(), settings=None, inputs=inputs, outputs=None)
+
+    def test_put_and_get(self, tmp_path: Path) -> None:
+        (tmp_path / "tar_files" / "nested").mkdir(parents=True)
+        (tmp_path / "tar_files" / "nested" / "1.tar").write_bytes(b"archive")
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+
+        assert artifact_store.get(key="key") is None
+
+        artifact_store.put(
+            key="key",
+            outputs={"tar_files": tmp_path / "tar_files", "video_metadata": {"fps": 25}},
+            outputs_definition={"tar_files": str(tmp_path / "tar_files"), "video_metadata": "IN_MEMORY_VARIABLE"},
+        )
+        (tmp_path / "tar_files" / "nested" / "1.tar").unlink()
+
+        assert artifact_store.get(key="key") == {"tar_files": tmp_path / "tar_files", "video_metadata": {"fps": 25}}
+        assert (tmp_path / "tar_files" / "nested" / "1.tar").read_bytes() == b"archive"
+
+    def test_entries_do_not_share_the_working_files(self, tmp_path: Path) -> None:
+        (tmp_path / "tar_files").mkdir()
+        (tmp_path / "tar_files" / "1.tar").write_bytes(b"archive")
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+        outputs = {"tar_files": tmp_path / "tar_files"}
+
+        artifact_store.put(key="key", outputs=outputs, outputs_definition={"tar_files": "./tar_files"})
+        # the elements rewrite their outputs in place, e.g. a re-run with other settings in a kept working directory
+        with (tmp_path / "tar_files" / "1.tar").open("wb") as f:
+            f.write(b"rewritten")
+
+        assert artifact_store.get(key="key") == outputs
+        assert (tmp_path / "tar_files" / "1.tar").read_bytes() == b"archive"
+
+        with (tmp_path / "tar_files" / "1.tar").open("wb") as f:
+            f.write(b"rewritten")
+
+        assert (tmp_path / "store" / "key" / "artifacts" / "tar_files" / "1.tar").read_bytes() == b"archive"
+
+    def test_put_skips_outputs_which_can_not_be_serialized(self, tmp_path: Path) -> None:
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+
+        artifact_store.put(key="key", outputs={"element": Element()}, outputs_definition={"element": "./element"})
+
+        assert list((tmp_path / "store").iterdir()) == []
+
+    def test_put_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        (tmp_path / "output.tar").write_bytes(b"a" * 100)
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=500)
+
+        for mtime, key in enumerate(("first", "second")):
+            artifact_store.put(
+                key=key, outputs={"output": tmp_path / "output.tar"}, outputs_definition={"output": "./output.tar"}
+            )
+            os.utime(tmp_path / "store" / key / "outputs.json", times=(mtime, mtime))
+
+        assert artifact_store.get(key="first") is not None
+
+        artifact_store.put(
+            key="third", outputs={"output": tmp_path / "output.tar"}, outputs_definition={"output": "./output.tar"}
+        )
+
+        assert sorted(entry.name for entry in (tmp_path / "store").iterdir()) == ["first", "third"]
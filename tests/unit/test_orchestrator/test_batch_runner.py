@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from src.orchestrator.batch_runner import BatchRunner
+from src.utils.settings import Settings
+
+
+class TestBatchRunner:
+    @pytest.fixture
+    def pipeline_definition(self, tmp_path: Path) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": "DataReader",
+                "inputs": {"directory_data_video": str(tmp_path / "input")},
+                "outputs": {"directory_extracted_frames": "./data/frames"},
+            },
+            {
+                "name": "DataWriter",
+                "inputs": {"directory_extracted_frames": "./data/frames"},
+                "outputs": {"directory_anonymized_data_video": "./data/output/"},
+            },
+        ]
+
+    @pytest.fixture
+    def batch_runner(self, mocker: MockerFixture, pipeline_definition: List[Dict[str, Any]], tmp_path: Path) -> Any:
+        yaml_parser = mocker.MagicMock()
+        yaml_parser.get_pipeline_definition = mocker.Mock(return_value=pipeline_definition)
+
+        input_directory = tmp_path / "input"
+        input_directory.mkdir()
+        for name in ("first.mp4", "second.mp4", "second.mov", "notes.txt"):
+            (input_directory / name).touch()
+
+        return BatchRunner(
+            yaml_parser=yaml_parser,
+            pipeline_definition_file=Path(),
+            modules_path=Path(),
+            working_directory=Path(),
+            settings=Settings(
+                workspaces_directory=tmp_path / "workspaces", batch_workers=2, batch_input_pattern="*.m[op][4v]"
+            ),
+        )
+
+    def test_prepare_jobs(self, batch_runner: BatchRunner, tmp_path: Path) -> None:
+        jobs = batch_runner._prepare_jobs()
+
+        assert list(jobs) == [
+            tmp_path / "input" / "first.mp4",
+            tmp_path / "input" / "second.mov",
+            tmp_path / "input" / "second.mp4",
+        ]
+
+        workspace, pipeline_definition_file = jobs[tmp_path / "input" / "second.mp4"]
+        with pipeline_definition_file.open() as f:
+            elements = yaml.safe_load(f)["elements"]
+
+        run_input_directory = workspace.directory / "input"
+        # the input files with the same name apart from the extension get workspaces of their own
+        assert workspace.directory == tmp_path / "workspaces" / "second.mp4"
+        assert jobs[tmp_path / "input" / "second.mov"][0].directory == tmp_path / "workspaces" / "second.mov"
+        assert list(run_input_directory.iterdir()) == [run_input_directory / "second.mp4"]
+        assert elements[0]["inputs"] == {"directory_data_video": str(run_input_directory)}
+        assert elements[0]["outputs"] == {
+            "directory_extracted_frames": str(workspace.directory / "directory_extracted_frames")
+        }
+        assert elements[1]["outputs"] == {"directory_anonymized_data_video": str(Path("./data/output/second.mp4"))}
+
+    def test_run_reports_failed_input_files(
+        self, mocker: MockerFixture, batch_runner: BatchRunner, tmp_path: Path
+    ) -> None:
+        mocker.patch(target="src.orchestrator.batch_runner.ProcessPoolExecutor", new=_ImmediateExecutor)
+        mocker.patch(
+            target="src.orchestrator.batch_runner._run_batch_job",
+            side_effect=lambda pipeline_definition_file, **kwargs: "first" not in str(pipeline_definition_file),
+        )
+
+        assert batch_runner.run() == [tmp_path / "input" / "first.mp4"]
+        assert list((tmp_path / "workspaces").iterdir()) == []
+
+    def test_run_raises_without_batch_input(self, batch_runner: BatchRunner) -> None:
+        batch_runner._settings = Settings(batch_input_key="unknown")
+
+        with pytest.raises(KeyError):
+            batch_runner.run()
+
+
+class _ImmediateExecutor:
+    def __init__(self, max_workers: int) -> None:
+        pass
+
+    def __enter__(self) -> "_ImmediateExecutor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def submit(self, function: Any, **kwargs) -> Future:
+        future = Future()
+        future.set_result(function(**kwargs))
+
+        return future
@@ -0,0 +1,50 @@
+import threading
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from src.orchestrator.input_watcher import InputWatcher
+
+
+class TestInputWatcher:
+    @pytest.fixture
+    def stop(self) -> Iterator[threading.Event]:
+        stop = threading.Event()
+        yield stop
+        stop.set()
+
+    @staticmethod
+    def _next_input_files(input_files: Iterator[Path], count: int) -> List[Path]:
+        return [next(input_files) for _ in range(count)]
+
+    @pytest.mark.parametrize("polling", [True, False])
+    def test_watch_yields_written_input_files(self, tmp_path: Path, stop: threading.Event, polling: bool) -> None:
+        (tmp_path / "existing.mp4").write_bytes(b"video")
+        (tmp_path / "notes.txt").write_bytes(b"notes")
+
+        watcher = InputWatcher(directory=tmp_path, pattern="*.mp4", poll_interval=0.05, polling=polling)
+        input_files = watcher.watch(stop=stop)
+
+        assert self._next_input_files(input_files=input_files, count=1) == [tmp_path / "existing.mp4"]
+
+        threading.Timer(interval=0.1, function=(tmp_path / "new.mp4").write_bytes, args=(b"video",)).start()
+
+        assert self._next_input_files(input_files=input_files, count=1) == [tmp_path / "new.mp4"]
+
+    def test_watch_skips_seen_input_files(self, tmp_path: Path, stop: threading.Event) -> None:
+        (tmp_path / "existing.mp4").write_bytes(b"video")
+
+        watcher = InputWatcher(directory=tmp_path, pattern="*.mp4", poll_interval=0.05, polling=True)
+        input_files = watcher.watch(stop=stop)
+        next(input_files)
+
+        threading.Timer(interval=0.2, function=(tmp_path / "new.mp4").write_bytes, args=(b"video",)).start()
+
+        assert next(input_files) == tmp_path / "new.mp4"
+
+    def test_watch_stops(self, tmp_path: Path, stop: threading.Event) -> None:
+        watcher = InputWatcher(directory=tmp_path, pattern="*.mp4", poll_interval=0.05)
+        threading.Timer(interval=0.1, function=stop.set).start()
+
+        assert list(watcher.watch(stop=stop)) == []
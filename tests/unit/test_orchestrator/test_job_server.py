@@ -0,0 +1,218 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import httpx
+import pytest
+import yaml
+from pytest_mock import MockerFixture
+
+from src.orchestrator.job_server import JobPool, JobServer, JobState
+from src.utils.settings import Settings
+
+
+class FakeOrchestrator:
+    # copies the input files into the final output directory, as the DataWriter writes the anonymized videos there
+    def __init__(self, pipeline_definition: List[Dict[str, Any]]) -> None:
+        self.pipeline_elements = pipeline_definition
+        self.outputs = {}
+        self._pipeline_elements = []
+
+    def initialize_pipeline_elements(self, pipeline_definition_file: Path) -> None:
+        pass
+
+    def start_run(self, pipeline_elements: List[Dict[str, Any]], **kwargs: Any) -> None:
+        self._pipeline_elements = pipeline_elements
+
+    def run_pipeline_element(self) -> None:
+        input_directory = Path(self._pipeline_elements[0]["inputs"]["directory_data_video"])
+        output_directory = Path(self._pipeline_elements[0]["outputs"]["directory_anonymized_data_video"])
+        output_directory.mkdir(parents=True, exist_ok=True)
+        for input_file in input_directory.iterdir():
+            (output_directory / input_file.name).write_bytes(input_file.read_bytes())
+
+        self.outputs = {"directory_anonymized_data_video": output_directory}
+
+    def cleanup(self) -> None:
+        pass
+
+    def close_pipeline_elements(self) -> None:
+        pass
+
+
+class TestJobServer:
+    @pytest.fixture
+    def release_jobs(self) -> Iterator[threading.Event]:
+        release_jobs = threading.Event()
+        yield release_jobs
+        release_jobs.set()
+
+    @pytest.fixture
+    def mock_pipeline_worker(self, mocker: MockerFixture, release_jobs: threading.Event) -> Any:
+        def run(input_file: Path, run_id: str, progress: Any, isolate_outputs: bool) -> Any:
+            release_jobs.wait(timeout=10)
+            if input_file.name == "broken.mp4":
+                raise RuntimeError("broken video")
+
+            return {"directory_anonymized_data_video": Path("/data/output")}
+
+        mock_pipeline_worker_class = mocker.patch(target="src.orchestrator.job_server.PipelineWorker")
+        mock_pipeline_worker_class.return_value.pipeline_definition = [
+            {"name": "DataReader", "inputs": {}, "settings": {"parallel_segments": 1}, "object": None},
+            {"name": "DataWriter", "inputs": {}, "object": None},
+        ]
+        mock_pipeline_worker_class.return_value.run.side_effect = run
+
+        return mock_pipeline_worker_class
+
+    @pytest.fixture
+    def job_server(self, mocker: MockerFixture, mock_pipeline_worker: Any, tmp_path: Path) -> Iterator[str]:
+        for name in ("first.mp4", "second.mp4", "broken.mp4"):
+            (tmp_path / name).touch()
+
+        job_pool = JobPool(
+            yaml_parser=mocker.MagicMock(),
+            pipeline_definition_file=Path(),
+            modules_path=Path(),
+            working_directory=Path(),
+            settings=Settings(job_workers=1, job_queue_size=1),
+        )
+        job_pool.start()
+        job_server = JobServer(server_address=("127.0.0.1", 0), job_pool=job_pool)
+        threading.Thread(target=job_server.serve_forever, daemon=True).start()
+
+        yield f"http://127.0.0.1:{job_server.server_address[1]}"
+
+        job_server.shutdown()
+        job_server.server_close()
+        job_pool.stop()
+
+    @staticmethod
+    def _wait_for_state(client: httpx.Client, job_id: str, state: JobState) -> Any:
+        for _ in range(100):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["state"] == state:
+                return job
+            time.sleep(0.05)
+
+        raise TimeoutError(f"job {job_id} did not become {state}")
+
+    def test_submit_jobs_with_backpressure(
+        self, job_server: str, release_jobs: threading.Event, tmp_path: Path
+    ) -> None:
+        with httpx.Client(base_url=job_server) as client:
+            running = client.post("/jobs", json={"input_file": str(tmp_path / "first.mp4")})
+            self._wait_for_state(client=client, job_id=running.json()["id"], state=JobState.running)
+            queued = client.post("/jobs", json={"input_file": str(tmp_path / "broken.mp4")})
+            rejected = client.post("/jobs", json={"input_file": str(tmp_path / "second.mp4")})
+
+            assert running.status_code == queued.status_code == 202
+            assert running.headers["Location"] == f"/jobs/{running.json()['id']}"
+            assert rejected.status_code == 429
+            assert rejected.headers["Retry-After"] == "5"
+            assert client.get("/health").json() == {"workers": 1, "queue_size": 1, "queued": 1, "running": 1}
+
+            release_jobs.set()
+
+            succeeded = self._wait_for_state(client=client, job_id=running.json()["id"], state=JobState.succeeded)
+            failed = self._wait_for_state(client=client, job_id=queued.json()["id"], state=JobState.failed)
+
+        assert succeeded["outputs"] == {"directory_anonymized_data_video": "/data/output"}
+        assert succeeded["progress"]["elements_total"] == 2
+        assert failed["error"] == "broken video"
+
+    def test_submit_job_with_settings(
+        self,
+        mocker: MockerFixture,
+        job_server: str,
+        mock_pipeline_worker: Any,
+        release_jobs: threading.Event,
+        tmp_path: Path,
+    ) -> None:
+        release_jobs.set()
+        spy_safe_dump = mocker.spy(yaml, "safe_dump")
+
+        with httpx.Client(base_url=job_server) as client:
+            job = client.post(
+                "/jobs",
+                json={"input_file": str(tmp_path / "first.mp4"), "settings": {"DataReader": {"parallel_segments": 4}}},
+            )
+            self._wait_for_state(client=client, job_id=job.json()["id"], state=JobState.succeeded)
+
+        job_pipeline_definition_file = mock_pipeline_worker.call_args.kwargs["pipeline_definition_file"]
+        assert job_pipeline_definition_file.name == "pipeline_definition.yml"
+        assert not job_pipeline_definition_file.exists()
+        assert mock_pipeline_worker.call_count == 2
+        # the elements initialized for the job are released once it has finished
+        mock_pipeline_worker.return_value.close.assert_called_once()
+        assert spy_safe_dump.call_args.args[0] == {
+            "elements": [
+                {"name": "DataReader", "inputs": {}, "settings": {"parallel_segments": 4}},
+                {"name": "DataWriter", "inputs": {}},
+            ]
+        }
+
+    @pytest.mark.parametrize(
+        "body, status_code",
+        [
+            [{"settings": {}}, 400],
+            [{"input_file": "/missing.mp4"}, 422],
+            [{"input_file": "first.mp4", "settings": {"Unknown": {"key": "value"}}}, 422],
+            [{"input_file": "first.mp4", "settings": {"DataReader": {"redact_url": "http://elsewhere"}}}, 422],
+            [{"input_file": "first.mp4", "settings": {"DataWriter": {"cache_directory": "/tmp/cache"}}}, 422],
+            [{"input_file": "first.mp4", "settings": {"DataReader": {"perceptual_threshold": 2}}}, 422],
+        ],
+    )
+    def test_submit_job_rejects_invalid_requests(
+        self, job_server: str, tmp_path: Path, body: Any, status_code: int
+    ) -> None:
+        if body.get("input_file") == "first.mp4":
+            body["input_file"] = str(tmp_path / "first.mp4")
+
+        with httpx.Client(base_url=job_server) as client:
+            assert client.post("/jobs", json=body).status_code == status_code
+            assert client.get("/jobs/0123").status_code == 404
+
+    def test_jobs_on_input_files_with_the_same_name_keep_their_outputs(
+        self, mocker: MockerFixture, tmp_path: Path
+    ) -> None:
+        pipeline_definition = [
+            {
+                "name": "DataWriter",
+                "inputs": {"directory_data_video": str(tmp_path / "input")},
+                "outputs": {"directory_anonymized_data_video": str(tmp_path / "output")},
+                "object": None,
+            }
+        ]
+        mocker.patch(
+            target="src.orchestrator.pipeline_worker.Orchestrator",
+            side_effect=lambda **kwargs: FakeOrchestrator(pipeline_definition=pipeline_definition),
+        )
+        input_files = []
+        for directory in ("first", "second"):
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / "video.mp4").write_text(directory)
+            input_files.append(tmp_path / directory / "video.mp4")
+
+        job_pool = JobPool(
+            yaml_parser=mocker.MagicMock(),
+            pipeline_definition_file=Path(),
+            modules_path=Path(),
+            working_directory=Path(),
+            settings=Settings(job_workers=2, job_queue_size=2, workspaces_directory=tmp_path / "workspaces"),
+        )
+        job_pool.start()
+        try:
+            jobs = [job_pool.submit(input_file=input_file, settings={}) for input_file in input_files]
+            for _ in range(100):
+                if all(job.state == JobState.succeeded for job in jobs):
+                    break
+                time.sleep(0.05)
+        finally:
+            job_pool.stop()
+
+        for job, content in zip(jobs, ("first", "second")):
+            output_directory = tmp_path / "output" / job.job_id
+            assert job.to_dict()["outputs"] == {"directory_anonymized_data_video": str(output_directory)}
+            assert (output_directory / "video.mp4").read_text() == content
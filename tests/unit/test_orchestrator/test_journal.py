@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from src.orchestrator.journal import RunJournal
+
+
+class TestRunJournal:
+    pipeline_definition = [{"name": "Reader", "inputs": {"source": "./input"}, "outputs": {"frames": "./frames"}}]
+
+    def test_resumes_finished_work(self, tmp_path: Path) -> None:
+        journal_file = tmp_path / "journal.json"
+        journal = RunJournal(journal_file=journal_file, pipeline_definition=self.pipeline_definition)
+
+        journal.finish_element(
+            element_key="0:Reader", outputs={"frames": tmp_path / "frames", "metadata": {"fps": 25}}
+        )
+        journal.get_work_units(element_key="1:Redactor").finish(work_unit="00000001.tar")
+
+        resumed_journal = RunJournal(journal_file=journal_file, pipeline_definition=self.pipeline_definition)
+        work_units = resumed_journal.get_work_units(element_key="1:Redactor")
+
+        assert resumed_journal.get_element_outputs(element_key="0:Reader") == {
+            "frames": str(tmp_path / "frames"),
+            "metadata": {"fps": 25},
+        }
+        assert resumed_journal.get_element_outputs(element_key="1:Redactor") is None
+        assert work_units.is_finished(work_unit="00000001.tar")
+        assert not work_units.is_finished(work_unit="00000002.tar")
+        assert [path.name for path in tmp_path.iterdir()] == ["journal.json"]
+
+    def test_ignores_journal_of_another_pipeline_definition(self, tmp_path: Path) -> None:
+        journal_file = tmp_path / "journal.json"
+        journal = RunJournal(journal_file=journal_file, pipeline_definition=self.pipeline_definition)
+        journal.finish_element(element_key="0:Reader", outputs={"frames": "./frames"})
+
+        changed_pipeline_definition = [{**self.pipeline_definition[0], "settings": {"frame_format": "jpg"}}]
+        resumed_journal = RunJournal(journal_file=journal_file, pipeline_definition=changed_pipeline_definition)
+
+        assert resumed_journal.get_element_outputs(element_key="0:Reader") is None
+
+    def test_ignores_corrupted_journal(self, tmp_path: Path) -> None:
+        journal_file = tmp_path / "journal.json"
+        journal_file.write_text('{"fingerprint": ')
+
+        journal = RunJournal(journal_file=journal_file, pipeline_definition=self.pipeline_definition)
+
+        assert journal.get_element_outputs(element_key="0:Reader") is None
+
+    def test_remove(self, tmp_path: Path) -> None:
+        journal_file = tmp_path / "journal.json"
+        journal = RunJournal(journal_file=journal_file, pipeline_definition=self.pipeline_definition)
+        journal.finish_element(element_key="0:Reader", outputs={"frames": "./frames"})
+
+        journal.remove()
+
+        assert not journal_file.exists()
@@ -1,11 +1,21 @@
+import copy
+import pstats
+import shutil
 from pathlib import Path
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Mapping, Optional
 
 import pytest
 from pytest_mock import MockerFixture
 
 from src.integration_pipeline.base.pipeline_element_exceptions import PipelineElementError, Severity
+from src.integration_pipeline.base.streaming_pipeline_element import StreamingPipelineElement
+from src.integration_pipeline.base.work_stream import WorkStream
+from src.orchestrator.artifact_store import ArtifactStore
 from src.orchestrator.orchestrator import Orchestrator
+from src.orchestrator.profiler import ElementProfiler
+from src.orchestrator.workspace import RunWorkspace
+from src.utils.metrics import REGISTRY
+from src.utils.settings import ExecutionMode, ProfileMode
 
 
 class TestOrchestrator:
@@ -209,3 +219,435 @@ class TestOrchestrator:
         elif exception.severity == Severity.major:
             with pytest.raises(SystemExit):
                 orchestrator.run_pipeline_element()
+
+    @pytest.fixture
+    def streaming_elements(self) -> Callable:
+        def _streaming_elements(exception: Exception = None) -> Dict[str, Any]:
+            class Producer(StreamingPipelineElement):
+                def run(self, inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+                    raise NotImplementedError
+
+                def run_stream(
+                    self, inputs: Mapping[str, Any], outputs: Optional[Dict[str, Any]], stream: WorkStream
+                ) -> Dict[str, Any]:
+                    stream.publish({"numbers_source": "producer"})
+                    for number in range(1, 21):
+                        stream.send(number)
+
+                    return {"numbers_source": "producer"}
+
+                def cleanup(self, outputs: Optional[Dict[str, Any]]) -> None:
+                    pass
+
+            class Doubler(StreamingPipelineElement):
+                def run(self, inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+                    raise NotImplementedError
+
+                def run_stream(
+                    self, inputs: Mapping[str, Any], outputs: Optional[Dict[str, Any]], stream: WorkStream
+                ) -> Dict[str, Any]:
+                    for number in stream.receive():
+                        if exception is not None:
+                            raise exception
+
+                        stream.send(number * 2)
+
+                    return {}
+
+                def cleanup(self, outputs: Optional[Dict[str, Any]]) -> None:
+                    pass
+
+            class Collector(StreamingPipelineElement):
+                collected = []
+                source = None
+
+                def run(self, inputs: Dict[str, Any], outputs: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+                    raise NotImplementedError
+
+                def run_stream(
+                    self, inputs: Mapping[str, Any], outputs: Optional[Dict[str, Any]], stream: WorkStream
+                ) -> Dict[str, Any]:
+                    Collector.source = inputs["numbers_source"]
+                    Collector.collected = list(stream.receive())
+
+                    return {"collected": len(Collector.collected)}
+
+                def cleanup(self, outputs: Optional[Dict[str, Any]]) -> None:
+                    pass
+
+            return {"Producer": Producer, "Doubler": Doubler, "Collector": Collector}
+
+        return _streaming_elements
+
+    @pytest.fixture
+    def streaming_pipeline_definition(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": "Validator", "inputs": {"directory_data_video": "./data/input/"}},
+            {"name": "Producer", "inputs": {"key": "value"}, "outputs": {"numbers_source": "./data/numbers"}},
+            {"name": "Doubler", "inputs": {"key": "value"}},
+            {"name": "Collector", "inputs": {"numbers_source": "./data/numbers"}, "outputs": {"collected": 0}},
+        ]
+
+    def test_run_pipeline_elements_streaming(
+        self,
+        mocker: MockerFixture,
+        mock_yaml_parser: Callable,
+        validator: Callable,
+        streaming_elements: Callable,
+        streaming_pipeline_definition: List[Dict[str, Any]],
+    ) -> None:
+        yaml_parser = mock_yaml_parser(pipeline_definition=streaming_pipeline_definition)
+
+        elements = {"Validator": validator(run_output={}), **streaming_elements()}
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: elements[class_name]
+        )
+
+        orchestrator = Orchestrator(
+            yaml_parser=yaml_parser,
+            pipeline_modules=pipeline_modules,
+            execution_mode=ExecutionMode.streaming,
+            stream_queue_size=2,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+
+        assert [len(group) for group in orchestrator._get_streaming_groups()] == [1, 3]
+
+        orchestrator.run_pipeline_element()
+
+        elements["Validator"].run.assert_called_once()
+
+        assert elements["Collector"].collected == [number * 2 for number in range(1, 21)]
+        assert elements["Collector"].source == "producer"
+        assert orchestrator._outputs == {"numbers_source": "producer", "collected": 20}
+
+    def test_run_pipeline_elements_records_metrics(
+        self,
+        mocker: MockerFixture,
+        mock_yaml_parser: Callable,
+        validator: Callable,
+        streaming_elements: Callable,
+        streaming_pipeline_definition: List[Dict[str, Any]],
+    ) -> None:
+        def get_sample_value(name: str, **labels) -> float:
+            return REGISTRY.get_sample_value(name=name, labels=labels) or 0.0
+
+        runs = {
+            element: get_sample_value("cip_element_duration_seconds_count", element=element, outcome="succeeded")
+            for element in ("Validator", "Producer", "Doubler", "Collector")
+        }
+        collector_wait_seconds = get_sample_value(
+            "cip_stream_wait_seconds_total", element="Collector", direction="receive"
+        )
+
+        elements = {"Validator": validator(run_output={}), **streaming_elements()}
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: elements[class_name]
+        )
+        orchestrator = Orchestrator(
+            yaml_parser=mock_yaml_parser(pipeline_definition=streaming_pipeline_definition),
+            pipeline_modules=pipeline_modules,
+            execution_mode=ExecutionMode.streaming,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        orchestrator.run_pipeline_element()
+
+        for element, count in runs.items():
+            assert (
+                get_sample_value("cip_element_duration_seconds_count", element=element, outcome="succeeded")
+                == count + 1
+            )
+
+        assert (
+            get_sample_value("cip_stream_wait_seconds_total", element="Collector", direction="receive")
+            > collector_wait_seconds
+        )
+
+    @pytest.mark.parametrize(
+        "exception",
+        [
+            PipelineElementError(public_message="", severity=Severity.minor, log_message=""),
+            PipelineElementError(public_message="", severity=Severity.major, log_message=""),
+        ],
+    )
+    def test_run_pipeline_elements_streaming_handles_pipeline_element_exceptions(
+        self,
+        mocker: MockerFixture,
+        mock_yaml_parser: Callable,
+        validator: Callable,
+        streaming_elements: Callable,
+        streaming_pipeline_definition: List[Dict[str, Any]],
+        exception: Exception,
+    ) -> None:
+        yaml_parser = mock_yaml_parser(pipeline_definition=streaming_pipeline_definition)
+
+        elements = {"Validator": validator(run_output={}), **streaming_elements(exception=exception)}
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: elements[class_name]
+        )
+
+        orchestrator = Orchestrator(
+            yaml_parser=yaml_parser,
+            pipeline_modules=pipeline_modules,
+            execution_mode=ExecutionMode.streaming,
+            stream_queue_size=2,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+
+        if exception.severity == Severity.minor:
+            orchestrator.run_pipeline_element()
+
+            assert orchestrator._outputs == {}
+
+        elif exception.severity == Severity.major:
+            with pytest.raises(SystemExit):
+                orchestrator.run_pipeline_element()
+
+    def test_run_pipeline_elements_dag(
+        self, mocker: MockerFixture, mock_yaml_parser: Callable, mock_pipeline_modules: Callable
+    ) -> None:
+        yaml_parser = mock_yaml_parser(
+            pipeline_definition=[
+                {"name": "Reader", "inputs": {"source": "./data/input/"}, "outputs": {"frames": "./frames"}},
+                {"name": "Thumbnails", "inputs": {"frames": "./frames"}, "outputs": {"thumbnails": "./thumbnails"}},
+                {"name": "Writer", "inputs": {"frames": "./frames"}, "outputs": {"video": "./output"}},
+            ]
+        )
+
+        def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+            return {key: f"{value}_done" for key, value in outputs.items()}
+
+        element_class = type("Element", (), {"__init__": lambda self, settings: None, "run": run})
+        pipeline_modules = mock_pipeline_modules(pipeline_elements_modules={}, pipeline_element_class=element_class)
+
+        orchestrator = Orchestrator(
+            yaml_parser=yaml_parser, pipeline_modules=pipeline_modules, execution_mode=ExecutionMode.dag
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        orchestrator.run_pipeline_element()
+
+        assert orchestrator._pipeline_elements[2]["inputs"] == {"frames": "./frames_done"}
+        assert orchestrator._outputs == {
+            "frames": "./frames_done",
+            "thumbnails": "./thumbnails_done",
+            "video": "./output_done",
+        }
+
+    def test_run_pipeline_elements_dag_profiles_the_whole_run(
+        self, tmp_path: Path, mock_yaml_parser: Callable, mock_pipeline_modules: Callable
+    ) -> None:
+        yaml_parser = mock_yaml_parser(
+            pipeline_definition=[
+                {"name": "Reader", "inputs": {"source": "./data/input/"}, "outputs": {"frames": "./frames"}},
+                {"name": "Thumbnails", "inputs": {"frames": "./frames"}, "outputs": {"thumbnails": "./thumbnails"}},
+                {"name": "Writer", "inputs": {"frames": "./frames"}, "outputs": {"video": "./output"}},
+            ]
+        )
+
+        def run(self, inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+            return {key: f"{value}_done" for key, value in outputs.items()}
+
+        element_class = type("Element", (), {"__init__": lambda self, settings: None, "run": run})
+        pipeline_modules = mock_pipeline_modules(pipeline_elements_modules={}, pipeline_element_class=element_class)
+
+        orchestrator = Orchestrator(
+            yaml_parser=yaml_parser,
+            pipeline_modules=pipeline_modules,
+            execution_mode=ExecutionMode.dag,
+            profiler=ElementProfiler(directory=tmp_path, modes={ProfileMode.cpu}),
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        orchestrator.run_pipeline_element()
+
+        assert sorted(file.name for file in tmp_path.iterdir()) == ["run.prof", "run.prof.txt"]
+        functions = [function for _, _, function in pstats.Stats(str(tmp_path / "run.prof")).stats]
+        assert functions.count("run") >= 1
+
+    def test_initialize_pipeline_elements_dag_raises_system_exit(
+        self, mock_yaml_parser: Callable, mock_pipeline_modules: Callable, validator: Callable
+    ) -> None:
+        yaml_parser = mock_yaml_parser(
+            pipeline_definition=[{"name": "Validator", "inputs": {"video_metadata": "IN_MEMORY_VARIABLE"}}]
+        )
+        pipeline_modules = mock_pipeline_modules(
+            pipeline_elements_modules={}, pipeline_element_class=validator(run_output={})
+        )
+
+        orchestrator = Orchestrator(
+            yaml_parser=yaml_parser, pipeline_modules=pipeline_modules, execution_mode=ExecutionMode.dag
+        )
+
+        with pytest.raises(SystemExit):
+            orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+
+    def test_run_pipeline_elements_resumes_interrupted_run(
+        self, mocker: MockerFixture, mock_yaml_parser: Callable, tmp_path: Path
+    ) -> None:
+        pipeline_definition = [
+            {"name": "Reader", "inputs": {"source": "./data/input/"}, "outputs": {"frames": "./frames"}},
+            {"name": "Writer", "inputs": {"frames": "./frames"}, "outputs": {"video": "./output"}},
+        ]
+        elements = {
+            "Reader": mocker.Mock(**{"run.return_value": {"frames": "./frames_done"}}),
+            "Writer": mocker.Mock(
+                **{"run.side_effect": PipelineElementError(public_message="", severity=Severity.major, log_message="")}
+            ),
+        }
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: lambda settings: elements[class_name]
+        )
+        journal_file = tmp_path / "journal.json"
+
+        interrupted_orchestrator = Orchestrator(
+            yaml_parser=mock_yaml_parser(pipeline_definition=copy.deepcopy(pipeline_definition)),
+            pipeline_modules=pipeline_modules,
+            journal_file=journal_file,
+        )
+        interrupted_orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        with pytest.raises(SystemExit):
+            interrupted_orchestrator.run_pipeline_element()
+        interrupted_orchestrator.cleanup()
+
+        elements["Reader"].cleanup.assert_not_called()
+        assert journal_file.exists()
+
+        elements["Writer"].run.side_effect = None
+        elements["Writer"].run.return_value = {"video": "./output_done"}
+
+        orchestrator = Orchestrator(
+            yaml_parser=mock_yaml_parser(pipeline_definition=copy.deepcopy(pipeline_definition)),
+            pipeline_modules=pipeline_modules,
+            journal_file=journal_file,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        orchestrator.run_pipeline_element()
+        orchestrator.cleanup()
+
+        elements["Reader"].run.assert_called_once()
+        assert elements["Writer"].run.call_args.kwargs["inputs"]["frames"] == "./frames_done"
+        assert orchestrator._outputs == {"frames": "./frames_done", "video": "./output_done"}
+        elements["Reader"].cleanup.assert_called_once()
+        assert not journal_file.exists()
+
+    def test_run_pipeline_elements_minor_error_finishes_the_run(
+        self, mocker: MockerFixture, mock_yaml_parser: Callable, tmp_path: Path
+    ) -> None:
+        pipeline_definition = [
+            {"name": "Reader", "inputs": {"source": "./data/input/"}, "outputs": {"frames": "./frames"}},
+            {"name": "Writer", "inputs": {"frames": "./frames"}, "outputs": {"video": "./output"}},
+        ]
+        elements = {
+            "Reader": mocker.Mock(**{"run.return_value": {"frames": "./frames_done"}}),
+            "Writer": mocker.Mock(
+                **{"run.side_effect": PipelineElementError(public_message="", severity=Severity.minor, log_message="")}
+            ),
+        }
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: lambda settings: elements[class_name]
+        )
+        journal_file = tmp_path / "journal.json"
+
+        orchestrator = Orchestrator(
+            yaml_parser=mock_yaml_parser(pipeline_definition=pipeline_definition),
+            pipeline_modules=pipeline_modules,
+            journal_file=journal_file,
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        orchestrator.run_pipeline_element()
+
+        assert journal_file.exists()
+
+        orchestrator.cleanup()
+
+        elements["Reader"].cleanup.assert_called_once()
+        elements["Writer"].cleanup.assert_called_once()
+        assert not journal_file.exists()
+
+    def test_start_run_reuses_pipeline_elements(
+        self, mocker: MockerFixture, mock_yaml_parser: Callable, tmp_path: Path
+    ) -> None:
+        pipeline_definition = [
+            {"name": "Reader", "inputs": {"source": "./data/input/"}, "outputs": {"frames": "./frames"}},
+            {"name": "Writer", "inputs": {"frames": "./frames"}, "outputs": {"video": "./output"}},
+        ]
+        elements = {
+            "Reader": mocker.Mock(**{"run.side_effect": lambda inputs, outputs: {"frames": outputs["frames"]}}),
+            "Writer": mocker.Mock(**{"run.return_value": {"video": "./output"}}),
+        }
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: lambda settings: elements[class_name]
+        )
+
+        orchestrator = Orchestrator(
+            yaml_parser=mock_yaml_parser(pipeline_definition), pipeline_modules=pipeline_modules
+        )
+        orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+        initialized_pipeline_elements = orchestrator.pipeline_elements
+
+        for run_id in ("first", "second"):
+            workspace = RunWorkspace(root_directory=tmp_path, run_id=run_id)
+            orchestrator.start_run(
+                pipeline_elements=workspace.scope_pipeline_definition(
+                    pipeline_definition=initialized_pipeline_elements, inputs={"source": run_id}
+                )
+            )
+            orchestrator.run_pipeline_element()
+            orchestrator.cleanup()
+
+            assert elements["Reader"].run.call_args.kwargs["inputs"] == {"source": run_id}
+            assert orchestrator._outputs == {"frames": str(tmp_path / run_id / "frames"), "video": "./output"}
+
+        assert pipeline_modules.get_pipeline_element_class.call_count == 2
+        assert elements["Writer"].run.call_count == 2
+        assert elements["Writer"].cleanup.call_count == 2
+        assert initialized_pipeline_elements[1]["inputs"] == {"frames": "./frames"}
+
+    def test_run_pipeline_elements_restores_memoized_outputs(
+        self, mocker: MockerFixture, mock_yaml_parser: Callable, tmp_path: Path
+    ) -> None:
+        frames_directory = tmp_path / "frames"
+        pipeline_definition = [
+            {
+                "name": "Reader",
+                "memoize": True,
+                "inputs": {"source": "./data/input/"},
+                "outputs": {"frames": str(frames_directory), "metadata": "IN_MEMORY_VARIABLE"},
+            },
+            {"name": "Writer", "memoize": True, "inputs": {"frames": str(frames_directory)}},
+        ]
+
+        def read(inputs: Dict[str, Any], outputs: Dict[str, Any]) -> Dict[str, Any]:
+            frames_directory.mkdir(exist_ok=True)
+            (frames_directory / "00000001.png").write_bytes(b"frame")
+            return {"frames": frames_directory, "metadata": {"fps": 25}}
+
+        elements = {
+            "Reader": mocker.Mock(**{"run.side_effect": read}),
+            "Writer": mocker.Mock(**{"run.return_value": {}}),
+        }
+        pipeline_modules = mocker.MagicMock()
+        pipeline_modules.get_pipeline_element_class = mocker.Mock(
+            side_effect=lambda modules, class_name: lambda settings: elements[class_name]
+        )
+        artifact_store = ArtifactStore(directory=tmp_path / "store", max_size_bytes=2**20)
+
+        for _ in range(2):
+            orchestrator = Orchestrator(
+                yaml_parser=mock_yaml_parser(pipeline_definition=copy.deepcopy(pipeline_definition)),
+                pipeline_modules=pipeline_modules,
+                artifact_store=artifact_store,
+            )
+            orchestrator.initialize_pipeline_elements(pipeline_definition_file=Path())
+            orchestrator.run_pipeline_element()
+            shutil.rmtree(frames_directory)
+
+            assert orchestrator._outputs == {"frames": frames_directory, "metadata": {"fps": 25}}
+
+        elements["Reader"].run.assert_called_once()
+        assert elements["Writer"].run.call_count == 2
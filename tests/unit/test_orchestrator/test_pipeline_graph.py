@@ -0,0 +1,61 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from src.orchestrator.pipeline_graph import PipelineGraph
+
+
+class TestPipelineGraph:
+    @pytest.fixture
+    def pipeline_elements(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": "Validator", "inputs": {"directory_data_video": "./data/input/"}},
+            {
+                "name": "DataReader",
+                "inputs": {"directory_data_video": "./data/input/"},
+                "outputs": {"directory_extracted_frames": "./data/frames", "video_metadata": "IN_MEMORY_VARIABLE"},
+            },
+            {
+                "name": "Thumbnails",
+                "inputs": {"directory_extracted_frames": "./data/frames"},
+                "outputs": {"directory_thumbnails": "./data/thumbnails"},
+            },
+            {
+                "name": "DataWriter",
+                "inputs": {"directory_extracted_frames": "./data/frames", "video_metadata": "IN_MEMORY_VARIABLE"},
+                "outputs": {"directory_video": "./data/output"},
+            },
+        ]
+
+    def test_dependencies(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        pipeline_graph = PipelineGraph(pipeline_elements=pipeline_elements)
+
+        assert pipeline_graph.dependencies == {0: set(), 1: set(), 2: {1}, 3: {1}}
+        assert pipeline_graph.order == [0, 1, 2, 3]
+        assert pipeline_graph.get_ancestors(3) == [1]
+
+    def test_ancestors_are_transitive(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        pipeline_elements[3]["inputs"]["directory_thumbnails"] = "./data/thumbnails"
+
+        pipeline_graph = PipelineGraph(pipeline_elements=pipeline_elements)
+
+        assert pipeline_graph.dependencies[3] == {1, 2}
+        assert pipeline_graph.get_ancestors(3) == [1, 2]
+
+    def test_cycle_raises(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        pipeline_elements[1]["inputs"]["directory_video"] = "./data/output"
+
+        with pytest.raises(ValueError, match="cycle"):
+            PipelineGraph(pipeline_elements=pipeline_elements)
+
+    def test_missing_producer_raises(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        del pipeline_elements[1]["outputs"]["video_metadata"]
+
+        with pytest.raises(ValueError, match="no pipeline element produces it"):
+            PipelineGraph(pipeline_elements=pipeline_elements)
+
+    def test_ambiguous_producer_raises(self, pipeline_elements: List[Dict[str, Any]]) -> None:
+        pipeline_elements[2]["outputs"]["directory_extracted_frames"] = "./data/frames"
+
+        with pytest.raises(ValueError, match="is produced by both"):
+            PipelineGraph(pipeline_elements=pipeline_elements)
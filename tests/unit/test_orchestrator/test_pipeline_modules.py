@@ -1,3 +1,4 @@
+from importlib.metadata import EntryPoint
 from pathlib import Path
 from typing import Callable, List
 from unittest.mock import MagicMock
@@ -5,10 +6,17 @@ from unittest.mock import MagicMock
 import pytest
 from pytest_mock import MockerFixture
 
-from src.orchestrator.pipeline_modules import PipelineModules
+from src.integration_pipeline.base import pipeline_element_registry
+from src.integration_pipeline.base.pipeline_element_registry import register_pipeline_element
+from src.orchestrator.pipeline_modules import ENTRY_POINT_GROUP, PipelineModules
 
 
 class TestPipelineModules:
+    @pytest.fixture(autouse=True)
+    def registered_pipeline_elements(self, mocker: MockerFixture) -> None:
+        # the elements registered by a test are removed after it, so they do not leak into the other tests
+        mocker.patch.dict(pipeline_element_registry._registered_pipeline_elements)
+
     @pytest.fixture
     def mock_working_directory(self, mocker: MockerFixture) -> MagicMock:
         return mocker.MagicMock(spec=Path)
@@ -23,40 +31,56 @@ class TestPipelineModules:
 
         return _mock_modules_path
 
-    def test_get_all_pipeline_element_modules(
-        self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
-    ) -> None:
-        mock_modules_path = mock_modules_path(
-            mock_modules=[
-                Path("some_module.py"),
-                Path("some_package"),
-                Path("some_another_module.py"),
-                Path("__init__.py"),
-                Path("readme.md"),
-            ]
-        )
+    @pytest.fixture
+    def modules_path(self, tmp_path: Path) -> Path:
+        modules_path = tmp_path / "integration_pipeline"
+        (modules_path / "some_package").mkdir(parents=True)
+        (modules_path / "__init__.py").write_text("")
+        (modules_path / "readme.md").write_text("class NotAModule:\n    pass\n")
 
-        mocker.patch.object(target=Path, attribute="is_file", return_value=True)
+        return modules_path
 
-        pipeline_modules = PipelineModules(modules_path=mock_modules_path, working_directory=mock_working_directory)
+    def test_get_all_pipeline_element_modules(self, tmp_path: Path, modules_path: Path) -> None:
+        (modules_path / "some_module.py").write_text(
+            "class SomeClass:\n    pass\n\n\ndef some_function():\n    pass\n"
+        )
+        (modules_path / "some_package" / "some_another_module.py").write_text(
+            "@register_pipeline_element(name='SomeAlias')\nclass SomeAnotherClass:\n    pass\n"
+        )
+
+        pipeline_modules = PipelineModules(modules_path=modules_path, working_directory=tmp_path)
         result = pipeline_modules.get_all_pipeline_element_modules()
 
-        assert result == {"someanothermodule": "some_another_module", "somemodule": "some_module"}
+        assert result == {
+            "SomeClass": "integration_pipeline.some_module",
+            "SomeAnotherClass": "integration_pipeline.some_package.some_another_module",
+            "SomeAlias": "integration_pipeline.some_package.some_another_module",
+        }
 
-    def test_get_all_pipeline_element_modules_raises(
-        self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
+    def test_get_all_pipeline_element_modules_reparses_changed_modules(
+        self, mocker: MockerFixture, tmp_path: Path, modules_path: Path
     ) -> None:
-        mock_modules_path = mock_modules_path(
-            mock_modules=[
-                Path("some_package"),
-                Path("__init__.py"),
-                Path("readme.md"),
-            ]
-        )
+        (modules_path / "some_module.py").write_text("class SomeClass:\n    pass\n")
+        (modules_path / "some_another_module.py").write_text("class SomeAnotherClass:\n    pass\n")
 
-        mocker.patch.object(target=Path, attribute="is_file", return_value=True)
+        pipeline_modules = PipelineModules(modules_path=modules_path, working_directory=tmp_path)
+        pipeline_modules.get_all_pipeline_element_modules()
 
-        pipeline_modules = PipelineModules(modules_path=mock_modules_path, working_directory=mock_working_directory)
+        (modules_path / "some_module.py").write_text("class SomeRenamedClass:\n    pass\n")
+        spy_parse_class_names = mocker.spy(PipelineModules, "_parse_class_names")
+
+        result = PipelineModules(
+            modules_path=modules_path, working_directory=tmp_path
+        ).get_all_pipeline_element_modules()
+
+        assert result == {
+            "SomeAnotherClass": "integration_pipeline.some_another_module",
+            "SomeRenamedClass": "integration_pipeline.some_module",
+        }
+        spy_parse_class_names.assert_called_once_with(module_file=modules_path / "some_module.py")
+
+    def test_get_all_pipeline_element_modules_raises(self, tmp_path: Path, modules_path: Path) -> None:
+        pipeline_modules = PipelineModules(modules_path=modules_path, working_directory=tmp_path)
 
         with pytest.raises(ModuleNotFoundError):
             pipeline_modules.get_all_pipeline_element_modules()
@@ -65,7 +89,7 @@ class TestPipelineModules:
         self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
     ) -> None:
         mock_modules_path = mock_modules_path(mock_modules=[])
-        mock_modules = {"someclass": "some_class_path"}
+        mock_modules = {"SomeClass": "some_class_path"}
 
         class_name = "SomeClass"
         cls = type(class_name, (), {})
@@ -84,7 +108,7 @@ class TestPipelineModules:
         self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
     ) -> None:
         mock_modules_path = mock_modules_path(mock_modules=[])
-        mock_modules = {"someclass": "some_class_path"}
+        mock_modules = {"SomeClass": "some_class_path"}
 
         class_name = "WrongClass"
         cls = type(class_name, (), {})
@@ -102,7 +126,7 @@ class TestPipelineModules:
         self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
     ) -> None:
         mock_modules_path = mock_modules_path(mock_modules=[])
-        mock_modules = {"someclass": "some_class_path"}
+        mock_modules = {"SomeClass": "some_class_path"}
 
         class_name = "SomeClass"
         cls = type(class_name, (), {})
@@ -115,3 +139,46 @@ class TestPipelineModules:
         pipeline_modules = PipelineModules(modules_path=mock_modules_path, working_directory=mock_working_directory)
         with pytest.raises(ImportError):
             pipeline_modules.get_pipeline_element_class(modules=mock_modules, class_name=class_name)
+
+    def test_get_pipeline_element_class_registered_under_own_name(
+        self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
+    ) -> None:
+        mock_modules_path = mock_modules_path(mock_modules=[])
+        mock_modules = {"SomeAlias": "some_class_path"}
+
+        cls = register_pipeline_element(name="SomeAlias")(type("SomeClass", (), {}))
+
+        mock_import_module = mocker.patch(target="src.orchestrator.pipeline_modules.importlib.import_module")
+
+        pipeline_modules = PipelineModules(modules_path=mock_modules_path, working_directory=mock_working_directory)
+        result = pipeline_modules.get_pipeline_element_class(modules=mock_modules, class_name="SomeAlias")
+
+        assert result == cls
+        mock_import_module.assert_not_called()
+
+    def test_get_pipeline_element_class_from_entry_point(
+        self, mocker: MockerFixture, mock_working_directory: MagicMock, mock_modules_path: Callable
+    ) -> None:
+        mock_modules_path = mock_modules_path(mock_modules=[])
+        cls = type("SomeClass", (), {})
+
+        mock_module = mocker.MagicMock()
+        mock_module.SomeInstalledClass = cls
+
+        mock_entry_points = mocker.patch(
+            target="src.orchestrator.pipeline_modules.entry_points",
+            return_value=[
+                EntryPoint(name="OtherClass", value="other_package:OtherClass", group=ENTRY_POINT_GROUP),
+                EntryPoint(name="SomeClass", value="some_package:SomeInstalledClass", group=ENTRY_POINT_GROUP),
+            ],
+        )
+        mock_import_module = mocker.patch(
+            target="src.orchestrator.pipeline_modules.importlib.import_module", return_value=mock_module
+        )
+
+        pipeline_modules = PipelineModules(modules_path=mock_modules_path, working_directory=mock_working_directory)
+        result = pipeline_modules.get_pipeline_element_class(modules={}, class_name="SomeClass")
+
+        assert result == cls
+        mock_entry_points.assert_called_once_with(group=ENTRY_POINT_GROUP)
+        mock_import_module.assert_called_once_with("some_package")
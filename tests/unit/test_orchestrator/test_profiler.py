@@ -0,0 +1,58 @@
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.orchestrator.profiler import ElementProfiler
+from src.utils.settings import ProfileMode
+
+
+class TestElementProfiler:
+    def test_parse_modes(self) -> None:
+        assert ElementProfiler.parse_modes(profile="cpu, Memory") == {ProfileMode.cpu, ProfileMode.memory}
+        assert ElementProfiler.parse_modes(profile="") == set()
+
+        with pytest.raises(ValueError):
+            ElementProfiler.parse_modes(profile="disk")
+
+    def test_profile(self, tmp_path: Path) -> None:
+        profiler = ElementProfiler(directory=tmp_path, modes={ProfileMode.cpu, ProfileMode.memory})
+        try:
+            with profiler.profile(element_key="2:TarArchiver"):
+                frames = [bytearray(1024) for _ in range(1000)]
+        finally:
+            tracemalloc.stop()
+
+        assert len(frames) == 1000
+        assert pstats.Stats(str(tmp_path / "2_TarArchiver.prof")).total_calls > 0
+        assert "cumulative" in (tmp_path / "2_TarArchiver.prof.txt").read_text()
+        assert "test_profiler.py" in (tmp_path / "2_TarArchiver.memory.txt").read_text()
+
+    def test_profile_cpu_only(self, tmp_path: Path) -> None:
+        profiler = ElementProfiler(directory=tmp_path, modes={ProfileMode.cpu})
+
+        with profiler.profile(element_key="0:Validator"):
+            pass
+
+        assert sorted(file.name for file in tmp_path.iterdir()) == ["0_Validator.prof", "0_Validator.prof.txt"]
+        assert not tracemalloc.is_tracing()
+
+    def test_profile_run(self, tmp_path: Path) -> None:
+        def retain_frames() -> List[bytearray]:
+            return [bytearray(1024) for _ in range(1000)]
+
+        profiler = ElementProfiler(directory=tmp_path, modes={ProfileMode.cpu, ProfileMode.memory})
+        try:
+            with profiler.profile_run(execution_mode="DAG"), ThreadPoolExecutor(max_workers=2) as executor:
+                frames = [future.result() for future in [executor.submit(retain_frames) for _ in range(2)]]
+        finally:
+            tracemalloc.stop()
+
+        assert len(frames) == 2
+        functions = [function for _, _, function in pstats.Stats(str(tmp_path / "run.prof")).stats]
+        assert "retain_frames" in functions
+        assert (tmp_path / "run.prof.txt").read_text().startswith("CPU profile of the whole DAG run")
+        assert (tmp_path / "run.memory.txt").read_text().startswith("memory report of the whole DAG run")
@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from pytest_mock import MockerFixture
+
+from src.orchestrator.watch_runner import WatchRunner
+from src.utils.settings import Settings
+
+
+class TestWatchRunner:
+    @pytest.fixture
+    def pipeline_definition(self, tmp_path: Path) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": "DataReader",
+                "inputs": {"directory_data_video": str(tmp_path / "input")},
+                "outputs": {"directory_extracted_frames": "./data/frames"},
+                "object": None,
+                "element_key": "0:DataReader",
+            },
+            {
+                "name": "DataWriter",
+                "inputs": {"directory_extracted_frames": "./data/frames"},
+                "outputs": {"directory_anonymized_data_video": "./data/output/"},
+                "object": None,
+                "element_key": "1:DataWriter",
+            },
+        ]
+
+    @pytest.fixture
+    def watch_runner(self, mocker: MockerFixture, pipeline_definition: List[Dict[str, Any]], tmp_path: Path) -> Any:
+        (tmp_path / "input").mkdir()
+
+        mock_orchestrator = mocker.patch(target="src.orchestrator.pipeline_worker.Orchestrator").return_value
+        mock_orchestrator.pipeline_elements = pipeline_definition
+
+        return WatchRunner(
+            yaml_parser=mocker.MagicMock(),
+            pipeline_definition_file=Path(),
+            modules_path=Path(),
+            working_directory=Path(),
+            settings=Settings(
+                workspaces_directory=tmp_path / "workspaces",
+                watch_poll_interval=0.05,
+                watch_processed_directory=tmp_path / "processed",
+            ),
+        )
+
+    def test_run_processes_input_files_with_initialized_elements(
+        self, mocker: MockerFixture, watch_runner: WatchRunner, tmp_path: Path
+    ) -> None:
+        for name in ("first.mp4", "second.mp4"):
+            (tmp_path / "input" / name).write_bytes(b"video")
+
+        orchestrator = watch_runner._pipeline_worker._orchestrator
+        orchestrator.run_pipeline_element.side_effect = [None, SystemExit("failed")]
+        orchestrator.cleanup.side_effect = lambda: orchestrator.cleanup.call_count == 2 and watch_runner.stop()
+        mocker.patch(target="src.orchestrator.watch_runner.signal.signal")
+
+        watch_runner.run()
+
+        orchestrator.initialize_pipeline_elements.assert_called_once()
+        orchestrator.close_pipeline_elements.assert_called_once()
+        scoped_pipeline_definitions = [
+            call.kwargs["pipeline_elements"] for call in orchestrator.start_run.call_args_list
+        ]
+        assert [elements[0]["inputs"] for elements in scoped_pipeline_definitions] == [
+            {"directory_data_video": str(tmp_path / "workspaces" / "first.mp4" / "input")},
+            {"directory_data_video": str(tmp_path / "workspaces" / "second.mp4" / "input")},
+        ]
+        assert list((tmp_path / "processed").iterdir()) == [tmp_path / "processed" / "first.mp4"]
+        assert list((tmp_path / "input").iterdir()) == [tmp_path / "input" / "second.mp4"]
+        assert list((tmp_path / "workspaces").iterdir()) == []
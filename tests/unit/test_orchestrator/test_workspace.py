@@ -0,0 +1,73 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from src.orchestrator.workspace import RunWorkspace
+
+
+class TestRunWorkspace:
+    @pytest.fixture
+    def pipeline_definition(self) -> List[Dict[str, Any]]:
+        return [
+            {"name": "Validator", "inputs": {"directory_data_video": "./data/input/", "redact_url": "url"}},
+            {
+                "name": "DataReader",
+                "settings": {"frame_file_name_format": "%08d"},
+                "inputs": {"directory_data_video": "./data/input/"},
+                "outputs": {"directory_extracted_frames": "./data/frames", "video_metadata": "IN_MEMORY_VARIABLE"},
+            },
+            {
+                "name": "DataWriter",
+                "inputs": {"directory_extracted_frames": "./data/frames", "video_metadata": "IN_MEMORY_VARIABLE"},
+                "outputs": {"directory_anonymized_data_video": "./data/output/"},
+            },
+        ]
+
+    def test_get_intermediate_keys(self, pipeline_definition: List[Dict[str, Any]]) -> None:
+        assert RunWorkspace.get_intermediate_keys(pipeline_definition=pipeline_definition) == {
+            "directory_extracted_frames",
+            "video_metadata",
+        }
+
+    def test_scope_pipeline_definition(self, pipeline_definition: List[Dict[str, Any]], tmp_path: Path) -> None:
+        workspace = RunWorkspace(root_directory=tmp_path, run_id="video")
+
+        result = workspace.scope_pipeline_definition(
+            pipeline_definition=pipeline_definition, inputs={"directory_data_video": "./data/video/input"}
+        )
+
+        assert result[0]["inputs"] == {"directory_data_video": "./data/video/input", "redact_url": "url"}
+        assert result[1]["inputs"] == {"directory_data_video": "./data/video/input"}
+        assert result[1]["outputs"] == {
+            "directory_extracted_frames": str(tmp_path / "video" / "directory_extracted_frames"),
+            "video_metadata": "IN_MEMORY_VARIABLE",
+        }
+        assert result[2]["inputs"]["directory_extracted_frames"] == result[1]["outputs"]["directory_extracted_frames"]
+        assert result[2]["outputs"] == {"directory_anonymized_data_video": "./data/output/"}
+
+        assert pipeline_definition[1]["outputs"]["directory_extracted_frames"] == "./data/frames"
+
+    def test_scope_pipeline_definition_with_outputs_subdirectory(
+        self, pipeline_definition: List[Dict[str, Any]], tmp_path: Path
+    ) -> None:
+        workspace = RunWorkspace(root_directory=tmp_path, run_id="video")
+
+        result = workspace.scope_pipeline_definition(
+            pipeline_definition=pipeline_definition, inputs={}, outputs_subdirectory="video"
+        )
+
+        assert result[1]["outputs"] == {
+            "directory_extracted_frames": str(tmp_path / "video" / "directory_extracted_frames"),
+            "video_metadata": "IN_MEMORY_VARIABLE",
+        }
+        assert result[2]["outputs"] == {"directory_anonymized_data_video": str(Path("./data/output/video"))}
+
+    def test_cleanup(self, tmp_path: Path) -> None:
+        workspace = RunWorkspace(root_directory=tmp_path, run_id="video")
+        workspace.create()
+        (workspace.directory / "file").touch()
+
+        workspace.cleanup()
+
+        assert not workspace.directory.exists()
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from src.utils.metrics import get_size, record_element_io, write_metrics_textfile
+
+
+class TestMetrics:
+    def test_get_size(self, tmp_path: Path) -> None:
+        (tmp_path / "frames" / "nested").mkdir(parents=True)
+        (tmp_path / "frames" / "00000001.png").write_bytes(b"a" * 10)
+        (tmp_path / "frames" / "nested" / "00000002.png").write_bytes(b"a" * 5)
+
+        assert get_size(tmp_path / "frames") == 15
+        assert get_size(str(tmp_path / "frames" / "00000001.png")) == 10
+        assert get_size(tmp_path / "missing") == 0
+
+    def test_write_metrics_textfile(self, tmp_path: Path) -> None:
+        record_element_io(element="TestElement", frames=3, read_bytes=100, written_bytes=50)
+
+        write_metrics_textfile(textfile=tmp_path / "textfile" / "pipeline.prom")
+
+        metrics = (tmp_path / "textfile" / "pipeline.prom").read_text()
+        assert 'cip_element_frames_total{element="TestElement"} 3.0' in metrics
+        assert 'cip_element_read_bytes_total{element="TestElement"} 100.0' in metrics
+        assert "process_cpu_seconds_total" not in metrics
@@ -0,0 +1,40 @@
+import contextvars
+import threading
+
+from src.utils.metrics import count_frames, record_element_io
+from src.utils.progress import RunProgress, record_element_finished, record_frames_total, track_progress
+
+
+class TestProgress:
+    def test_track_progress(self) -> None:
+        progress = RunProgress(elements=["DataReader", "Redactor", "DataWriter"])
+
+        with track_progress(progress=progress):
+            record_frames_total(frames=10)
+            record_element_io(element="DataReader", frames=10)
+            record_element_finished()
+            list(count_frames(element="DataWriter", frames=range(4)))
+
+        record_element_io(element="DataWriter", frames=6)
+
+        assert progress.to_dict() == {
+            "elements_finished": 1,
+            "elements_total": 3,
+            "frames_done": 4,
+            "frames_total": 10,
+            "frames": {"DataReader": 10, "DataWriter": 4},
+        }
+
+    def test_track_progress_in_copied_context(self) -> None:
+        progress = RunProgress(elements=["DataReader"])
+
+        with track_progress(progress=progress):
+            thread = threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(record_element_io,),
+                kwargs={"element": "DataReader", "frames": 2},
+            )
+            thread.start()
+            thread.join()
+
+        assert progress.to_dict()["frames_done"] == 2
@@ -0,0 +1,62 @@
+import json
+import threading
+from pathlib import Path
+
+from src.utils import tracing
+from src.utils.tracing import Tracer, span, write_trace, write_trace_part
+
+
+class TestTracing:
+    def test_span(self) -> None:
+        tracer = Tracer(process_name="test")
+
+        with tracer.span(name="element", category="element"):
+            with tracer.span(name="archive", category="tar", archive=Path("1.tar")):
+                pass
+
+        def upload() -> None:
+            with tracer.span(name="upload", category="redact"):
+                pass
+
+        thread = threading.Thread(target=upload, name="redactor_0")
+        thread.start()
+        thread.join()
+
+        events = tracer.pop_events()
+        spans = {event["name"]: event for event in events if event["ph"] == "X"}
+        thread_names = {event["tid"]: event["args"]["name"] for event in events if event["name"] == "thread_name"}
+
+        assert events[0]["args"] == {"name": "test"}
+        assert spans["archive"]["args"] == {"archive": "1.tar"}
+        assert spans["element"]["ts"] <= spans["archive"]["ts"]
+        assert spans["element"]["dur"] >= spans["archive"]["dur"]
+        assert thread_names[spans["element"]["tid"]] == threading.current_thread().name
+        assert thread_names[spans["upload"]["tid"]] == "redactor_0"
+        assert tracer.pop_events() == []
+
+    def test_write_trace(self, tmp_path: Path) -> None:
+        trace_file = tmp_path / "trace.json"
+        tracing._tracer = Tracer(process_name="batch worker")
+        try:
+            with span(name="element", category="element"):
+                pass
+
+            write_trace_part(trace_file=trace_file)
+            tracing._tracer = Tracer(process_name="orchestrator")
+            with span(name="pipeline", category="orchestrator"):
+                pass
+
+            write_trace(trace_file=trace_file)
+        finally:
+            tracing._tracer = None
+
+        events = json.loads(trace_file.read_text())["traceEvents"]
+
+        assert sorted(event["name"] for event in events if event["ph"] == "X") == ["element", "pipeline"]
+        assert not (tmp_path / "trace.json.parts").exists()
+
+    def test_span_without_tracing(self) -> None:
+        with span(name="element", category="element"):
+            pass
+
+        assert tracing._get_tracer() is None